@@ -0,0 +1,37 @@
+import pytest
+import pytest_asyncio
+
+from bot.data.base_repository import BaseRepository
+from bot.models.class_models import ClassPin
+
+
+@pytest_asyncio.fixture
+async def repo(database):
+    repo = BaseRepository()
+    async with repo.write() as db:
+        await db.executemany('INSERT INTO ClassPin VALUES (?, ?, 1, 1, 1, FALSE)', [(i, i) for i in range(25)])
+    return repo
+
+
+class TestBaseRepository:
+
+    @pytest.mark.asyncio
+    async def test_fetch_all_as_maps_rows(self, repo):
+        async with repo.read() as db:
+            cursor = await db.execute('SELECT * FROM ClassPin WHERE sockbot_message_id < 2')
+            assert await repo.fetch_all_as(cursor, ClassPin) == [ClassPin(0, 0, 1, 1, 1), ClassPin(1, 1, 1, 1, 1)]
+
+    @pytest.mark.asyncio
+    async def test_fetch_first_as_no_rows_returns_none(self, repo):
+        async with repo.read() as db:
+            cursor = await db.execute('SELECT * FROM ClassPin WHERE sockbot_message_id = -1')
+            assert await repo.fetch_first_as(cursor, ClassPin) is None
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_every_row_in_batches(self, repo):
+        pins = [pin async for pin in repo.stream(ClassPin, 'SELECT * FROM ClassPin ORDER BY sockbot_message_id',
+                                                 batch_size=10)]
+
+        assert [pin.sockbot_message_id for pin in pins] == list(range(25))
+        # the reader is returned to the pool once the iteration finishes
+        assert BaseRepository.pool._idle.qsize() == len(BaseRepository.pool._readers)
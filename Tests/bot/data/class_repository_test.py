@@ -0,0 +1,136 @@
+from datetime import datetime
+
+import pytest
+
+from bot.data.class_cache import ClassCache
+from bot.data.class_repository import ClassRepository
+from bot.models.class_models import ClassChannel, ClassSemester, ClassTA
+
+
+def class_channel(channel_id: int, role_id: int) -> ClassChannel:
+    return ClassChannel('CPSC', 1000 + channel_id, 'Prof', 'Class', channel_id, 'sp2023', 1, role_id, None, None)
+
+
+def semester_cache() -> ClassCache:
+    cache = ClassCache()
+    cache.load([], [], [
+        ClassSemester('fa2023', 'Fall 2023', '2023-08-20 00:00:00', '2023-12-15 00:00:00'),
+        ClassSemester('sp2023', 'Spring 2023', '2023-01-05 00:00:00', '2023-05-10 00:00:00'),
+        ClassSemester('su2023', 'Summer 2023', '2023-05-15 00:00:00', '2023-08-10 00:00:00'),
+    ])
+    return cache
+
+
+@pytest.fixture
+def repo(database):
+    ClassRepository.cache = ClassCache()
+    yield ClassRepository()
+    ClassRepository.cache = ClassCache()
+
+
+class TestClassRepository:
+
+    @pytest.mark.asyncio
+    async def test_cold_cache_queries_database(self, repo):
+        await repo.insert_class(class_channel(1, 10))
+
+        assert (await repo.search_class_by_channel(1)).channel_id == 1
+        assert ClassRepository.cache.stats()['missed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_warm_cache_answers_lookups(self, repo):
+        await repo.insert_class(class_channel(1, 10))
+        await repo.insert_ta(ClassTA(1, 100, True, None))
+        await repo.warm_cache()
+
+        assert (await repo.search_class_by_channel(1)).class_number == 1001
+        assert (await repo.search_class_by_role(10)).channel_id == 1
+        assert await repo.search_class_by_channel(2) is None
+        assert (await repo.get_ta(100, 1)).ta_display_tag
+        assert (await repo.search_semester('sp2023')).semester_name == 'Spring 2023'
+
+        stats = ClassRepository.cache.stats()
+        assert stats['missed'] == 0
+        assert stats['found'] == 4
+        assert stats['absent'] == 1
+
+    @pytest.mark.asyncio
+    async def test_writes_go_through_the_cache(self, repo):
+        await repo.warm_cache()
+        await repo.insert_class(class_channel(1, 10))
+
+        channel = await repo.search_class_by_channel(1)
+        channel.class_ta_role_id = 20
+        await repo.update_class(channel)
+        assert await repo.is_ta_role(20)
+        assert not await repo.is_ta_role(10)
+
+        await repo.delete_class(channel)
+        assert await repo.search_class_by_channel(1) is None
+        assert await repo.search_class_by_role(10) is None
+
+    @pytest.mark.asyncio
+    async def test_archive_classes_commits_every_class_at_once(self, repo):
+        await repo.insert_class(class_channel(1, 10))
+        await repo.insert_class(class_channel(2, 20))
+        await repo.insert_ta(ClassTA(1, 100, True, None))
+        await repo.warm_cache()
+
+        channels = await repo.get_unarchived_classes()
+        for channel in channels:
+            channel.category_id = 99
+        await repo.archive_classes(channels)
+
+        assert await repo.get_unarchived_classes() == []
+        assert (await repo.search_class_by_channel(2)).category_id == 99
+        assert await repo.get_tas_by_channel(1) == []
+        # the database matches the cache
+        ClassRepository.cache = ClassCache()
+        assert await repo.get_unarchived_classes() == []
+        assert await repo.get_tas_by_channel(1) == []
+
+    @pytest.mark.asyncio
+    async def test_mutating_a_returned_model_does_not_change_the_cache(self, repo):
+        await repo.insert_class(class_channel(1, 10))
+        await repo.warm_cache()
+
+        channel = await repo.search_class_by_channel(1)
+        channel.class_archived = True
+
+        assert not (await repo.search_class_by_channel(1)).class_archived
+
+    @pytest.mark.asyncio
+    async def test_warm_current_semester_matches_the_database(self, repo):
+        cold = await repo.get_current_semester()
+        await repo.warm_cache()
+
+        assert await repo.get_current_semester() == cold
+
+    def test_current_semester_bisects_the_calendar(self):
+        cache = semester_cache()
+
+        assert cache.current_semester(datetime(2023, 3, 1)).semester_id == 'sp2023'
+        assert cache.current_semester(datetime(2023, 5, 15)).semester_id == 'su2023'
+        assert cache.current_semester(datetime(2023, 12, 15)).semester_id == 'fa2023'
+        assert cache.current_semester(datetime(2023, 5, 12)) is None
+        assert cache.current_semester(datetime(2022, 12, 1)) is None
+        assert cache.current_semester(datetime(2024, 1, 1)) is None
+
+    def test_next_semester_and_rollover(self):
+        cache = semester_cache()
+
+        assert cache.next_semester(datetime(2023, 3, 1)).semester_id == 'su2023'
+        assert cache.next_semester(datetime(2023, 9, 1)) is None
+        # the end date is inclusive, so the semester rolls over just after it
+        assert cache.next_rollover(datetime(2023, 3, 1)) == datetime(2023, 5, 10, 0, 0, 0, 1)
+        assert cache.next_rollover(datetime(2023, 5, 12)) == datetime(2023, 5, 15)
+        assert cache.next_rollover(datetime(2024, 1, 1)) is None
+
+    def test_current_semester_is_resolved_again_after_a_boundary(self):
+        cache = semester_cache()
+
+        assert cache.current_semester(datetime(2023, 5, 1)).semester_id == 'sp2023'
+        assert cache.current_semester(datetime(2023, 5, 10)).semester_id == 'sp2023'
+        assert cache.current_semester(datetime(2023, 5, 16)).semester_id == 'su2023'
+        # going back in time is resolved again as well
+        assert cache.current_semester(datetime(2023, 2, 1)).semester_id == 'sp2023'
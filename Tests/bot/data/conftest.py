@@ -0,0 +1,18 @@
+import aiosqlite
+import pytest_asyncio
+
+from bot.data.base_repository import BaseRepository
+from bot.data.database import Database
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    """Creates a migrated database in a temporary file and opens the repository pool on it"""
+    path = str(tmp_path / 'test.db')
+    async with aiosqlite.connect(path) as db:
+        with open('bot/data/CreateTables.sql') as f:
+            await db.executescript(f.read())
+        await Database().migrate(db)
+    await BaseRepository.open_pool(path)
+    yield path
+    await BaseRepository.close_pool()
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from bot.data.connection_pool import ConnectionPool
+
+
+class TestConnectionPool:
+
+    @pytest.mark.asyncio
+    async def test_write_commits_and_is_visible_to_readers(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / 'test.db'), readers=2)
+        async with pool.write() as db:
+            await db.execute('CREATE TABLE Test (value INTEGER)')
+            await db.execute('INSERT INTO Test VALUES (1)')
+
+        async with pool.read() as db:
+            cursor = await db.execute('SELECT value FROM Test')
+            assert await cursor.fetchall() == [(1,)]
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_write_rolls_back_on_error(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / 'test.db'))
+        async with pool.write() as db:
+            await db.execute('CREATE TABLE Test (value INTEGER)')
+
+        with pytest.raises(ValueError):
+            async with pool.write() as db:
+                await db.execute('INSERT INTO Test VALUES (1)')
+                raise ValueError()
+
+        async with pool.read() as db:
+            cursor = await db.execute('SELECT COUNT(*) FROM Test')
+            assert await cursor.fetchone() == (0,)
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_open_enables_wal(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / 'test.db'))
+        async with pool.read() as db:
+            cursor = await db.execute('PRAGMA journal_mode')
+            assert await cursor.fetchone() == ('wal',)
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_readers_are_bounded_and_reused(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / 'test.db'), readers=2)
+        borrowed = []
+
+        async def read():
+            async with pool.read() as db:
+                borrowed.append(db)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(read() for _ in range(6)))
+
+        assert len(pool._readers) == 2
+        assert set(map(id, borrowed)) == set(map(id, pool._readers))
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_closed_pool_raises(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / 'test.db'))
+        await pool.open()
+        await pool.close()
+
+        with pytest.raises(RuntimeError):
+            async with pool.read():
+                pass
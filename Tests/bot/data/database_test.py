@@ -0,0 +1,53 @@
+import aiosqlite
+import pytest
+
+from bot.data.database import Database
+
+
+async def create_tables(db: aiosqlite.Connection) -> None:
+    with open('bot/data/CreateTables.sql') as f:
+        await db.executescript(f.read())
+
+
+class TestDatabase:
+
+    def test_migrations_are_sorted_by_version(self):
+        versions = [migration.version for migration in Database.get_migrations()]
+        assert versions == sorted(versions)
+        assert len(versions) == len(set(versions))
+
+    @pytest.mark.asyncio
+    async def test_migrate_applies_every_migration_once(self, tmp_path):
+        async with aiosqlite.connect(tmp_path / 'test.db') as db:
+            await create_tables(db)
+            latest = Database.get_migrations()[-1].version
+
+            assert await Database().migrate(db) == latest
+            assert await Database().migrate(db) == latest
+
+            cursor = await db.execute('PRAGMA user_version')
+            assert (await cursor.fetchone())[0] == latest
+
+    @pytest.mark.asyncio
+    async def test_migrate_adds_ta_role_column_and_indexes(self, tmp_path):
+        async with aiosqlite.connect(tmp_path / 'test.db') as db:
+            await create_tables(db)
+            await Database().migrate(db)
+
+            cursor = await db.execute('PRAGMA table_info(ClassChannel)')
+            assert 'class_ta_role_id' in [row[1] for row in await cursor.fetchall()]
+
+            cursor = await db.execute('EXPLAIN QUERY PLAN SELECT * FROM ClassPin WHERE channel_id = ?', (1,))
+            assert 'ix_ClassPin_channel_id' in ' '.join(row[3] for row in await cursor.fetchall())
+
+    @pytest.mark.asyncio
+    async def test_migrate_keeps_existing_ta_role_column(self, tmp_path):
+        async with aiosqlite.connect(tmp_path / 'test.db') as db:
+            await create_tables(db)
+            await db.execute('ALTER TABLE ClassChannel ADD COLUMN class_ta_role_id INTEGER')
+            await db.commit()
+
+            await Database().migrate(db)
+
+            cursor = await db.execute('PRAGMA table_info(ClassChannel)')
+            assert [row[1] for row in await cursor.fetchall()].count('class_ta_role_id') == 1
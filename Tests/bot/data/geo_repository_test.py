@@ -0,0 +1,59 @@
+import pytest
+
+from bot.data.geo_repository import GeoRepository
+
+
+@pytest.fixture
+def repo(database):
+    yield GeoRepository()
+    GeoRepository.buffer_scores = False
+    GeoRepository._pending = {}
+    GeoRepository._leaderboard = None
+
+
+class TestGeoRepository:
+
+    @pytest.mark.asyncio
+    async def test_add_score_inserts_then_increments(self, repo):
+        await repo.add_score(1, 100)
+        await repo.add_score(1, 50)
+
+        assert await repo.get_existing_score(1) == 150
+        assert await repo.return_size() == 1
+
+    @pytest.mark.asyncio
+    async def test_buffered_scores_are_coalesced_until_flushed(self, repo):
+        GeoRepository.buffer_scores = True
+        await repo.add_score(1, 100)
+        await repo.add_score(1, 50)
+        await GeoRepository().add_score(2, 10)
+
+        assert GeoRepository._pending == {1: 150, 2: 10}
+        await repo.flush_scores()
+
+        assert GeoRepository._pending == {}
+        async with repo.read() as db:
+            cursor = await db.execute('SELECT user_id, score FROM GeoguessrLeaderboard ORDER BY user_id')
+            assert await cursor.fetchall() == [(1, 150), (2, 10)]
+
+    @pytest.mark.asyncio
+    async def test_reads_see_buffered_scores(self, repo):
+        GeoRepository.buffer_scores = True
+        await repo.add_score(1, 100)
+
+        assert await repo.get_existing_score(1) == 100
+
+    @pytest.mark.asyncio
+    async def test_leaderboard_loads_existing_scores_and_tracks_new_ones(self, repo):
+        async with repo.write() as db:
+            await db.executemany('INSERT INTO GeoguessrLeaderboard (user_id, score) VALUES (?, ?)',
+                                 [(1, 100), (2, 300), (3, 200)])
+
+        assert await repo.get_top(2) == [(2, 300), (3, 200)]
+        assert await repo.get_user_rank(1) == (3, 100)
+
+        GeoRepository.buffer_scores = True
+        await repo.add_score(1, 250)
+
+        assert await repo.get_user_rank(1) == (1, 350)
+        assert await repo.get_user_rank(4) is None
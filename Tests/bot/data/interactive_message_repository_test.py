@@ -0,0 +1,66 @@
+import pytest
+
+from bot.data.interactive_message_repository import InteractiveMessageRepository
+from bot.models.interactive_message_models import InteractiveMessage
+
+
+def interactive_message(message_id: int, kind: str = 'pageable', *, expires_at: str | None = None,
+                        used_at: str = '2024-01-01 00:00:00') -> InteractiveMessage:
+    return InteractiveMessage(message_id, 1, kind, '{"page": 0}', expires_at, used_at)
+
+
+@pytest.fixture
+def repo(database):
+    return InteractiveMessageRepository()
+
+
+class TestInteractiveMessageRepository:
+
+    @pytest.mark.asyncio
+    async def test_upsert_and_update_state(self, repo):
+        await repo.upsert_message(interactive_message(1))
+        await repo.update_state(1, 'pageable', '{"page": 2}', '2024-01-02 00:00:00')
+
+        message = await repo.get_message(1, 'pageable')
+        assert message.state == {'page': 2}
+        assert message.used_at == '2024-01-02 00:00:00'
+        assert await repo.get_message(1, 'deletable') is None
+
+    @pytest.mark.asyncio
+    async def test_get_messages_leaves_out_the_state(self, repo):
+        await repo.upsert_message(interactive_message(1, expires_at='2024-01-01 00:01:00'))
+        await repo.upsert_message(interactive_message(2, 'deletable'))
+
+        messages = await repo.get_messages('pageable')
+
+        assert [(m.message_id, m.message_state) for m in messages] == [(1, '')]
+        assert messages[0].expires_date.minute == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_unused_messages_keeps_messages_with_a_timeout(self, repo):
+        await repo.upsert_message(interactive_message(1))
+        await repo.upsert_message(interactive_message(2, expires_at='2024-01-01 00:01:00'))
+        await repo.upsert_message(interactive_message(3, used_at='2024-02-01 00:00:00'))
+        await repo.upsert_message(interactive_message(4, 'deletable'))
+
+        assert await repo.delete_unused_messages('pageable', '2024-01-15 00:00:00') == [1]
+
+        await repo.delete_messages([2, 3], 'pageable')
+        assert [m.message_id for m in await repo.get_messages('pageable')] == []
+        assert [m.message_id for m in await repo.get_messages('deletable')] == [4]
+
+    @pytest.mark.asyncio
+    async def test_a_message_can_be_pageable_and_deletable(self, repo):
+        await repo.upsert_message(InteractiveMessage(1, 1, 'pageable', '{"page": 0}', None, '2024-01-01 00:00:00'))
+        await repo.upsert_message(InteractiveMessage(1, 1, 'deletable', '{"messages": [[1, 1]]}', None,
+                                                     '2024-01-01 00:00:00'))
+        await repo.update_state(1, 'pageable', '{"page": 1}', '2024-01-02 00:00:00')
+
+        assert [m.message_id for m in await repo.get_messages('pageable')] == [1]
+        assert [m.message_id for m in await repo.get_messages('deletable')] == [1]
+        assert (await repo.get_message(1, 'pageable')).state == {'page': 1}
+        assert (await repo.get_message(1, 'deletable')).state == {'messages': [[1, 1]]}
+
+        await repo.delete_messages([1], 'deletable')
+        assert (await repo.get_message(1, 'pageable')).state == {'page': 1}
+        assert await repo.get_message(1, 'deletable') is None
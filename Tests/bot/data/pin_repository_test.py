@@ -0,0 +1,38 @@
+import pytest
+
+from bot.data.pin_repository import PinRepository
+from bot.models.class_models import ClassPin
+
+
+def class_pin(message_id: int, channel_id: int = 1) -> ClassPin:
+    return ClassPin(message_id, message_id + 1000, channel_id, 10, 20)
+
+
+@pytest.fixture
+def repo(database):
+    return PinRepository()
+
+
+class TestPinRepository:
+
+    @pytest.mark.asyncio
+    async def test_reconcile_pins_deletes_and_pins_in_one_call(self, repo):
+        for message_id in range(1, 5):
+            await repo.insert_pin(class_pin(message_id))
+
+        await repo.reconcile_pins([class_pin(1), class_pin(2)], [class_pin(3)])
+
+        assert [pin.sockbot_message_id for pin in await repo.get_open_pin_requests()] == [4]
+        assert (await repo.get_pin_from_sockbot(3)).pin_pinned
+        assert await repo.get_pin_from_sockbot(1) is None
+
+    @pytest.mark.asyncio
+    async def test_delete_pins(self, repo):
+        await repo.insert_pin(class_pin(1, channel_id=1))
+        await repo.insert_pin(class_pin(2, channel_id=1))
+        await repo.insert_pin(class_pin(3, channel_id=2))
+
+        await repo.delete_pins(await repo.get_pins_from_channel(1))
+
+        assert [pin.sockbot_message_id for pin in await repo.get_pins_from_channel(2)] == [3]
+        assert await repo.get_pins_from_channel(1) == []
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+
+import pytest
+
+from bot.data.row_mapper import row_mapper, row_type
+from bot.models.class_models import ClassChannel, ClassPin
+
+
+@dataclass(slots=True)
+class Model:
+    a: int
+    b: str
+    c: bool = False
+
+
+class TestRowMapper:
+
+    def test_maps_columns_in_a_different_order(self):
+        mapper = row_mapper(Model, ('b', 'a', 'c'))
+        assert mapper(('x', 1, True)) == Model(1, 'x', True)
+
+    def test_missing_defaulted_field_keeps_default(self):
+        mapper = row_mapper(Model, ('a', 'b'))
+        assert mapper((1, 'x')) == Model(1, 'x')
+
+    def test_extra_columns_are_ignored(self):
+        mapper = row_mapper(Model, ('RANK', 'a', 'b', 'c'))
+        assert mapper((5, 1, 'x', True)) == Model(1, 'x', True)
+
+    def test_single_column_out_of_order(self):
+        @dataclass
+        class Single:
+            a: int = 0
+            b: int = 0
+
+        assert row_mapper(Single, ('b',))((2,)) == Single(b=2)
+
+    def test_missing_required_field_throws_value_error(self):
+        with pytest.raises(ValueError):
+            row_mapper(Model, ('a', 'c'))
+
+    def test_mapper_is_cached_per_query_shape(self):
+        assert row_mapper(Model, ('a', 'b')) is row_mapper(Model, ('a', 'b'))
+        assert row_mapper(Model, ('a', 'b')) is not row_mapper(Model, ('b', 'a'))
+
+    def test_maps_table_columns_into_inherited_model(self):
+        # the column order of the ClassChannel table, which differs from the field order of the model
+        names = ('channel_id', 'semester_id', 'category_id', 'class_role_id', 'class_prefix', 'class_number',
+                 'post_message_id', 'class_professor', 'class_name', 'class_archived', 'class_ta_role_id')
+        channel = row_mapper(ClassChannel, names)((1, 'sp2023', 2, 3, 'CS', 1400, None, 'Prof', 'Intro', 0, 4))
+
+        assert channel == ClassChannel('CS', 1400, 'Prof', 'Intro', 1, 'sp2023', 2, 3, 4, None, 0)
+
+    def test_pin_columns_match_fields(self):
+        mapper = row_mapper(ClassPin, ('sockbot_message_id', 'user_message_id', 'channel_id', 'pin_owner',
+                                        'pin_requester', 'pin_pinned'))
+        assert mapper((1, 2, 3, 4, 5, True)) == ClassPin(1, 2, 3, 4, 5, True)
+
+    def test_row_type_has_column_attributes(self):
+        row = row_type(('a', 'COUNT(*)'))._make((1, 2))
+        assert row.a == 1
+        assert row[1] == 2
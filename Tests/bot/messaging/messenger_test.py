@@ -1,8 +1,11 @@
+import asyncio
+
 import pytest
 import asynctest
 import unittest
 
-from bot.messaging.messenger import Messenger
+from bot.messaging.event_queue import OverflowPolicy
+from bot.messaging.messenger import Messenger, DispatchPolicy
 
 class TestMessenger:
 
@@ -159,4 +162,283 @@ class TestMessenger:
         await messenger.publish('bar')
 
         assert len(messenger._events['bar']) == 0
-    
\ No newline at end of file
+    
+    @pytest.mark.asyncio
+    async def test_dead_ref_removed_without_publish(self):
+        messenger = Messenger()
+
+        class Foo:
+            async def async_1(self, *args, **kwargs):
+                pass
+
+        foo = Foo()
+        bar = Foo()
+        messenger.subscribe('bar', foo.async_1)
+        messenger.subscribe('bar', bar.async_1)
+        del foo
+
+        assert len(messenger._events['bar']) == 1
+
+    @pytest.mark.asyncio
+    async def test_dead_refs_do_not_skip_live_listeners(self):
+        messenger = Messenger()
+
+        class Foo:
+            def __init__(self):
+                self.async_mock1 = unittest.mock.Mock()
+
+            async def async_1(self, *args, **kwargs):
+                self.async_mock1(*args, **kwargs)
+
+        dead_1, dead_2, alive = Foo(), Foo(), Foo()
+        messenger.subscribe('bar', dead_1.async_1)
+        messenger.subscribe('bar', dead_2.async_1)
+        messenger.subscribe('bar', alive.async_1)
+        del dead_1, dead_2
+        await messenger.publish('bar')
+
+        alive.async_mock1.assert_called_once_with()
+        assert len(messenger._events['bar']) == 1
+
+    @pytest.mark.asyncio
+    async def test_failing_listener_does_not_stop_other_listeners(self):
+        messenger = Messenger()
+        mock = unittest.mock.Mock()
+
+        async def foo():
+            raise ValueError()
+
+        async def bar():
+            mock()
+
+        messenger.subscribe('baz', foo)
+        messenger.subscribe('baz', bar)
+        with pytest.raises(ValueError):
+            await messenger.publish('baz')
+
+        mock.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_additional_errors_sent_to_error_handler(self):
+        messenger = Messenger()
+        handled = []
+
+        async def handler(event, error):
+            handled.append((event, error))
+
+        async def foo():
+            raise ValueError()
+
+        async def bar():
+            raise KeyError()
+
+        messenger.error_handler = handler
+        messenger.subscribe('baz', foo)
+        messenger.subscribe('baz', bar)
+        with pytest.raises(ValueError):
+            await messenger.publish('baz')
+
+        assert len(handled) == 1
+        assert handled[0][0] == 'baz'
+        assert isinstance(handled[0][1], KeyError)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_listeners_run_together(self):
+        messenger = Messenger()
+        started = []
+        release = asyncio.Event()
+
+        async def foo():
+            started.append('foo')
+            await release.wait()
+
+        async def bar():
+            started.append('bar')
+            release.set()
+
+        messenger.subscribe('baz', foo, policy=DispatchPolicy.concurrent)
+        messenger.subscribe('baz', bar, policy=DispatchPolicy.concurrent)
+        await asyncio.wait_for(messenger.publish('baz'), timeout=1)
+
+        assert started == ['foo', 'bar']
+
+    @pytest.mark.asyncio
+    async def test_background_listener_does_not_block_publish(self):
+        messenger = Messenger()
+        release = asyncio.Event()
+
+        async def foo():
+            await release.wait()
+
+        messenger.subscribe('baz', foo, policy=DispatchPolicy.background)
+        await asyncio.wait_for(messenger.publish('baz'), timeout=1)
+
+        assert messenger.pending_tasks == 1
+        release.set()
+        await asyncio.sleep(0.01)
+        assert messenger.pending_tasks == 0
+
+    @pytest.mark.asyncio
+    async def test_background_listener_error_sent_to_error_handler(self):
+        messenger = Messenger()
+        handled = asyncio.Event()
+
+        async def handler(event, error):
+            handled.set()
+
+        async def foo():
+            raise ValueError()
+
+        messenger.error_handler = handler
+        messenger.subscribe('baz', foo, policy=DispatchPolicy.background)
+        await messenger.publish('baz')
+
+        await asyncio.wait_for(handled.wait(), timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_background_listeners(self):
+        messenger = Messenger()
+
+        async def foo():
+            await asyncio.sleep(60)
+
+        messenger.subscribe('baz', foo, policy=DispatchPolicy.background)
+        await messenger.publish('baz')
+        await messenger.close()
+
+        assert messenger.pending_tasks == 0
+
+    @pytest.mark.asyncio
+    async def test_queued_event_invokes_listener(self):
+        messenger = Messenger()
+        called = asyncio.Event()
+
+        async def foo(value):
+            called.set()
+
+        messenger.configure_queue('bar', maxsize=10)
+        messenger.subscribe('bar', foo)
+        await messenger.publish('bar', 1)
+
+        await asyncio.wait_for(called.wait(), timeout=1)
+        assert messenger.queue_stats()['bar']['processed'] == 1
+        await messenger.close()
+
+    @pytest.mark.asyncio
+    async def test_queued_event_drop_newest_when_full(self):
+        messenger = Messenger()
+        release = asyncio.Event()
+        received = []
+
+        async def foo(value):
+            received.append(value)
+            await release.wait()
+
+        messenger.configure_queue('bar', maxsize=1, overflow=OverflowPolicy.drop_newest)
+        messenger.subscribe('bar', foo)
+        await messenger.publish('bar', 1)
+        # let the worker pick up the first event so the queue is empty again
+        await asyncio.sleep(0)
+        await messenger.publish('bar', 2)
+        await messenger.publish('bar', 3)
+        release.set()
+        await asyncio.sleep(0.01)
+
+        assert received == [1, 2]
+        assert messenger.queue_stats()['bar']['dropped'] == 1
+        await messenger.close()
+
+    @pytest.mark.asyncio
+    async def test_queued_event_coalesces_duplicate_keys(self):
+        messenger = Messenger()
+        received = []
+
+        async def foo(key, value):
+            received.append((key, value))
+
+        messenger.configure_queue('bar', overflow=OverflowPolicy.coalesce, key=lambda key, value: key)
+        messenger.subscribe('bar', foo)
+        await messenger.publish('bar', 'a', 1)
+        await messenger.publish('bar', 'a', 2)
+        await messenger.publish('bar', 'b', 3)
+        await asyncio.sleep(0.01)
+
+        assert received == [('a', 2), ('b', 3)]
+        assert messenger.queue_stats()['bar']['coalesced'] == 1
+        await messenger.close()
+
+    @pytest.mark.asyncio
+    async def test_queued_events_sharing_a_queue_do_not_coalesce_across_each_other(self):
+        messenger = Messenger()
+        received = []
+
+        async def add(key):
+            received.append(('add', key))
+
+        async def remove(key):
+            received.append(('remove', key))
+
+        messenger.configure_queue('add', 'remove', overflow=OverflowPolicy.coalesce, key=lambda key: key)
+        messenger.subscribe('add', add)
+        messenger.subscribe('remove', remove)
+        await messenger.publish('add', 'a')
+        await messenger.publish('remove', 'a')
+        await messenger.publish('add', 'a')
+        await asyncio.sleep(0.01)
+
+        assert received == [('add', 'a'), ('remove', 'a'), ('add', 'a')]
+        assert list(messenger.queue_stats()) == ['add, remove']
+        await messenger.close()
+
+    @pytest.mark.asyncio
+    async def test_queued_events_with_the_same_order_key_are_dispatched_in_order(self):
+        messenger = Messenger()
+        received = []
+
+        async def add(key, delay):
+            await asyncio.sleep(delay)
+            received.append(('add', key))
+
+        async def remove(key, delay):
+            received.append(('remove', key))
+
+        messenger.configure_queue('add', 'remove', workers=4, order=lambda key, delay: key)
+        messenger.subscribe('add', add)
+        messenger.subscribe('remove', remove)
+        await messenger.publish('add', 'a', 0.02)
+        await messenger.publish('remove', 'a', 0)
+        await messenger.publish('add', 'b', 0)
+        await asyncio.sleep(0.05)
+
+        # b is not held back by a, but the remove of a waits for its add
+        assert received == [('add', 'b'), ('add', 'a'), ('remove', 'a')]
+        await messenger.close()
+
+    @pytest.mark.asyncio
+    async def test_configure_queue_twice_raises_value_error(self):
+        messenger = Messenger()
+        messenger.configure_queue('bar')
+        with pytest.raises(ValueError):
+            messenger.configure_queue('bar')
+
+    @pytest.mark.asyncio
+    async def test_publish_records_listener_metrics(self):
+        messenger = Messenger()
+
+        async def foo():
+            pass
+
+        async def bar():
+            raise ValueError()
+
+        messenger.subscribe('baz', foo)
+        messenger.subscribe('baz', bar)
+        with pytest.raises(ValueError):
+            await messenger.publish('baz')
+        snapshot = messenger.metrics.snapshot()
+
+        assert snapshot['baz']['calls'] == 1
+        assert snapshot['baz']['errors'] == 1
+        assert snapshot['baz']['listeners'][foo.__qualname__]['calls'] == 1
+        assert snapshot['baz']['listeners'][foo.__qualname__]['errors'] == 0
+        assert snapshot['baz']['listeners'][bar.__qualname__]['errors'] == 1
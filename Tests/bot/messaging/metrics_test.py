@@ -0,0 +1,50 @@
+from bot.messaging.metrics import LatencyHistogram, EventMetrics
+
+
+class TestLatencyHistogram:
+
+    def test_percentiles_of_empty_histogram_are_zero(self):
+        assert LatencyHistogram().percentiles(50, 99) == [0.0, 0.0]
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for i in range(1, 101):
+            histogram.record(i)
+
+        assert histogram.percentiles(50, 95, 99) == [51, 96, 100]
+
+    def test_ring_buffer_keeps_most_recent_samples(self):
+        histogram = LatencyHistogram(sample_size=10)
+        for i in range(100):
+            histogram.record(i)
+
+        assert histogram.calls == 100
+        assert histogram.percentiles(0) == [90]
+
+    def test_records_errors(self):
+        histogram = LatencyHistogram()
+        histogram.record(1)
+        histogram.record(1, failed=True)
+
+        assert histogram.calls == 2
+        assert histogram.errors == 1
+
+
+class TestEventMetrics:
+
+    def test_snapshot_nests_listeners_under_events(self):
+        metrics = EventMetrics()
+        metrics.record_event('foo', 0.1)
+        metrics.record_listener('foo', 'bar', 0.1)
+
+        snapshot = metrics.snapshot()
+
+        assert snapshot['foo']['calls'] == 1
+        assert snapshot['foo']['listeners']['bar']['calls'] == 1
+
+    def test_reset_clears_metrics(self):
+        metrics = EventMetrics()
+        metrics.record_event('foo', 0.1)
+        metrics.reset()
+
+        assert metrics.snapshot() == {}
@@ -0,0 +1,60 @@
+import asyncio
+from unittest import mock
+
+import discord
+
+import bot.bot_secrets as bot_secrets
+from bot.messaging.events import Events
+from bot.messaging.messenger import Messenger
+from bot.services.delete_message_service import DeleteMessageService
+from bot.utils.reaction_filter import ReactionFilter
+from bot.utils.scheduler import Scheduler
+from Tests.bot.utils.message_store_test import MemoryMessageRepository
+
+BOT_ID = 1
+AUTHOR_ID = 2
+
+
+class TestDeleteMessageService:
+
+    def test_reaction_on_a_persisted_message_not_in_the_cache_deletes_it(self):
+        async def test():
+            repository = MemoryMessageRepository()
+            with mock.patch.object(bot_secrets.secrets, '_persist_interactive_messages', True), \
+                    mock.patch('bot.services.delete_message_service.InteractiveMessageRepository',
+                               return_value=repository):
+                service = DeleteMessageService(bot=fake_bot())
+                msg = mock.Mock(id=100, channel=mock.Mock(id=10))
+                await service.set_message_deletable(msg=msg, author=mock.Mock(id=AUTHOR_ID))
+
+                # the bot restarts, so the message is only known from the database
+                restarted_bot = fake_bot()
+                restarted = DeleteMessageService(bot=restarted_bot)
+                await restarted.load_service()
+
+            partial = restarted_bot.get_partial_messageable.return_value.get_partial_message.return_value
+            await restarted_bot.messenger.publish(Events.on_raw_reaction_add, reaction(BOT_ID, '🗑️'))
+            await restarted_bot.messenger.publish(Events.on_raw_reaction_add, reaction(AUTHOR_ID, '🗑️'))
+            await restarted.unload_service()
+
+            restarted_bot.get_partial_messageable.assert_called_once_with(10)
+            partial.delete.assert_awaited_once()
+            assert await restarted.messages.get(100) is None
+            assert repository.messages == {}
+
+        asyncio.run(test())
+
+
+def fake_bot() -> mock.Mock:
+    bot = mock.Mock(messenger=Messenger(), reaction_filter=ReactionFilter(), scheduler=Scheduler(),
+                    user=mock.Mock(id=BOT_ID))
+    # the partial message every message is edited, deleted and has its reactions removed through
+    bot.get_partial_messageable.return_value.get_partial_message.return_value = mock.AsyncMock()
+    return bot
+
+
+def reaction(user_id: int, emoji: str) -> discord.RawReactionActionEvent:
+    payload = discord.RawReactionActionEvent({'message_id': 100, 'channel_id': 10, 'user_id': user_id, 'type': 0},
+                                             discord.PartialEmoji(name=emoji), 'REACTION_ADD')
+    payload.member = mock.Mock(id=user_id, roles=[], guild_permissions=mock.Mock(administrator=False))
+    return payload
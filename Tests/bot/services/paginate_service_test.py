@@ -0,0 +1,78 @@
+import asyncio
+from unittest import mock
+
+import discord
+
+import bot.bot_secrets as bot_secrets
+from bot.messaging.events import Events
+from bot.messaging.messenger import Messenger
+from bot.services.paginate_service import PaginateService
+from bot.utils.reaction_filter import ReactionFilter
+from bot.utils.scheduler import Scheduler
+from Tests.bot.utils.message_store_test import MemoryMessageRepository
+
+BOT_ID = 1
+AUTHOR_ID = 2
+
+
+class TestPaginateService:
+
+    def test_reaction_on_a_persisted_message_not_in_the_cache_turns_the_page(self):
+        async def test():
+            repository = MemoryMessageRepository()
+            with mock.patch.object(bot_secrets.secrets, '_persist_interactive_messages', True), \
+                    mock.patch('bot.services.paginate_service.InteractiveMessageRepository',
+                               return_value=repository):
+                service = PaginateService(bot=fake_bot())
+                channel = mock.Mock(send=mock.AsyncMock(return_value=mock.Mock(id=100, channel=mock.Mock(id=10))))
+                await service.set_text_pageable(embed_name='Languages', field_title='Languages:',
+                                                pages=['first', 'second'], author=mock.Mock(id=AUTHOR_ID),
+                                                channel=channel, timeout=None)
+
+                # the bot restarts, so the message is only known from the database
+                restarted_bot = fake_bot()
+                restarted = PaginateService(bot=restarted_bot)
+                await restarted.load_service()
+
+            partial = restarted_bot.get_partial_messageable.return_value.get_partial_message.return_value
+            await restarted_bot.messenger.publish(Events.on_raw_reaction_add, reaction(AUTHOR_ID, '➡️'))
+            await restarted.unload_service()
+
+            embed = partial.edit.await_args.kwargs['embed']
+            assert embed.fields[0].value == 'second'
+            assert embed.footer.text == 'Page 2 of 2'
+            partial.remove_reaction.assert_awaited_once()
+            assert (await restarted.messages.get(100)).curr_page_num == 1
+
+        asyncio.run(test())
+
+    def test_reaction_by_another_user_does_not_turn_the_page(self):
+        async def test():
+            bot = fake_bot()
+            service = PaginateService(bot=bot)
+            channel = mock.Mock(send=mock.AsyncMock(return_value=mock.Mock(id=100, channel=mock.Mock(id=10))))
+            await service.set_text_pageable(embed_name='Languages', field_title='Languages:',
+                                            pages=['first', 'second'], author=mock.Mock(id=AUTHOR_ID),
+                                            channel=channel, timeout=None)
+
+            await bot.messenger.publish(Events.on_raw_reaction_add, reaction(3, '➡️'))
+
+            bot.get_partial_messageable.assert_not_called()
+            assert (await service.messages.get(100)).curr_page_num == 0
+
+        asyncio.run(test())
+
+
+def fake_bot() -> mock.Mock:
+    bot = mock.Mock(messenger=Messenger(), reaction_filter=ReactionFilter(), scheduler=Scheduler(),
+                    user=mock.Mock(id=BOT_ID))
+    # the partial message every message is edited, deleted and has its reactions removed through
+    bot.get_partial_messageable.return_value.get_partial_message.return_value = mock.AsyncMock()
+    return bot
+
+
+def reaction(user_id: int, emoji: str) -> discord.RawReactionActionEvent:
+    payload = discord.RawReactionActionEvent({'message_id': 100, 'channel_id': 10, 'user_id': user_id, 'type': 0},
+                                             discord.PartialEmoji(name=emoji), 'REACTION_ADD')
+    payload.member = mock.Mock(id=user_id, roles=[], guild_permissions=mock.Mock(administrator=False))
+    return payload
@@ -0,0 +1,69 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from bot.messaging.messenger import Messenger
+from bot.models.class_models import ClassPin
+from bot.services.pin_service import PinService
+from bot.utils.reaction_filter import ReactionFilter
+from bot.utils.scheduler import Scheduler
+
+SOCKBOT_MESSAGE_ID = 100
+USER_MESSAGE_ID = 101
+
+
+class TestPinService:
+
+    def test_request_stays_open_when_updating_the_pin_fails(self):
+        async def test():
+            service, channel, class_pin = pin_service()
+            service.pin_repo.set_pinned.side_effect = RuntimeError()
+
+            with pytest.raises(RuntimeError):
+                await service._pin_request(channel, class_pin, mock.AsyncMock())
+
+            assert SOCKBOT_MESSAGE_ID in service.open_pins
+            assert USER_MESSAGE_ID in service.open_pins
+
+            # the request can be pinned again once the db is back
+            service.pin_repo.set_pinned.side_effect = None
+            message = mock.AsyncMock()
+            await service._pin_request(channel, class_pin, message)
+
+            assert SOCKBOT_MESSAGE_ID not in service.open_pins
+            assert USER_MESSAGE_ID not in service.open_pins
+            message.delete.assert_awaited_once()
+
+        asyncio.run(test())
+
+    def test_request_being_pinned_is_not_pinned_twice(self):
+        async def test():
+            service, channel, class_pin = pin_service()
+            pinned = asyncio.Event()
+
+            async def set_pinned(_):
+                await pinned.wait()
+
+            service.pin_repo.set_pinned.side_effect = set_pinned
+            first = asyncio.create_task(service._pin_request(channel, class_pin, mock.AsyncMock()))
+            await asyncio.sleep(0)
+            await service._pin_request(channel, class_pin, mock.AsyncMock())
+            pinned.set()
+            await first
+
+            service.pin_repo.set_pinned.assert_awaited_once_with(class_pin)
+            assert SOCKBOT_MESSAGE_ID not in service.open_pins
+
+        asyncio.run(test())
+
+
+def pin_service() -> tuple[PinService, mock.Mock, ClassPin]:
+    bot = mock.Mock(messenger=Messenger(), reaction_filter=ReactionFilter(), scheduler=Scheduler())
+    service = PinService(bot=bot)
+    service.pin_repo = mock.AsyncMock()
+    channel = mock.AsyncMock(id=10)
+    service.pin_counts[channel.id] = 0
+    class_pin = ClassPin(SOCKBOT_MESSAGE_ID, USER_MESSAGE_ID, channel.id, 2, 3)
+    service._open_request(class_pin)
+    return service, channel, class_pin
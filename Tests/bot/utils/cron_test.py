@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from bot.utils.cron import CronExpression
+
+
+class TestCronExpression:
+
+    def test_every_minute_returns_next_minute(self):
+        cron = CronExpression('* * * * *')
+        assert cron.next_after(datetime(2023, 1, 1, 12, 30, 15)) == datetime(2023, 1, 1, 12, 31)
+
+    def test_next_after_is_strictly_after(self):
+        cron = CronExpression('30 12 * * *')
+        assert cron.next_after(datetime(2023, 1, 1, 12, 30)) == datetime(2023, 1, 2, 12, 30)
+
+    def test_step_and_range_fields(self):
+        cron = CronExpression('*/15 9-17 * * *')
+        assert cron.minutes == (0, 15, 30, 45)
+        assert cron.hours == tuple(range(9, 18))
+        assert cron.next_after(datetime(2023, 1, 1, 17, 50)) == datetime(2023, 1, 2, 9, 0)
+
+    def test_weekday_field_uses_sunday_as_zero(self):
+        cron = CronExpression('0 0 * * 0')
+        # 2023-01-02 is a monday
+        assert cron.next_after(datetime(2023, 1, 2)) == datetime(2023, 1, 8)
+        assert CronExpression('0 0 * * 7').weekdays == (0,)
+
+    def test_day_and_weekday_match_either(self):
+        cron = CronExpression('0 0 15 * 1')
+        # the first monday after 2023-01-03 comes before the 15th
+        assert cron.next_after(datetime(2023, 1, 3)) == datetime(2023, 1, 9)
+        assert cron.next_after(datetime(2023, 1, 14)) == datetime(2023, 1, 15)
+
+    def test_month_rollover(self):
+        cron = CronExpression('@monthly')
+        assert cron.next_after(datetime(2023, 12, 5)) == datetime(2024, 1, 1)
+
+    @pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '* * * * mon', '5-1 * * * *', '*/0 * * * *'])
+    def test_invalid_expression_throws_value_error(self, expression):
+        with pytest.raises(ValueError):
+            CronExpression(expression)
+
+    def test_impossible_date_throws_value_error(self):
+        with pytest.raises(ValueError):
+            CronExpression('0 0 30 2 *').next_after(datetime(2023, 1, 1))
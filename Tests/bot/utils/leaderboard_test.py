@@ -0,0 +1,39 @@
+from bot.utils.leaderboard import Leaderboard
+
+
+class TestLeaderboard:
+
+    def test_top_is_highest_score_first(self):
+        board = Leaderboard([(1, 10), (2, 30), (3, 20)])
+        assert board.top(2) == [(2, 30), (3, 20)]
+        assert board.top(10) == [(2, 30), (3, 20), (1, 10)]
+
+    def test_rank_of_unknown_user_is_none(self):
+        assert Leaderboard().rank(1) is None
+
+    def test_ties_are_ranked_by_user_id(self):
+        board = Leaderboard([(2, 10), (1, 10)])
+        assert board.rank(1) == 1
+        assert board.rank(2) == 2
+
+    def test_add_moves_user_up(self):
+        board = Leaderboard([(1, 10), (2, 30), (3, 20)])
+
+        assert board.add(1, 25) == 35
+        assert board.rank(1) == 1
+        assert board.rank(2) == 2
+        assert len(board) == 3
+
+    def test_add_new_user(self):
+        board = Leaderboard([(1, 10)])
+        board.add(2, 5)
+
+        assert 2 in board
+        assert board.score(2) == 5
+        assert board.top(2) == [(1, 10), (2, 5)]
+
+    def test_set_lower_score_moves_user_down(self):
+        board = Leaderboard([(1, 10), (2, 30)])
+        board.set(2, 5)
+
+        assert board.top(2) == [(1, 10), (2, 5)]
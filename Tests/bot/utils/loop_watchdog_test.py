@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+from bot.utils.loop_watchdog import LoopWatchdog
+
+
+class TestLoopWatchdog:
+
+    def test_blocking_call_is_captured_as_offender(self):
+        def block_the_loop():
+            time.sleep(0.3)
+
+        async def stall_test():
+            watchdog = LoopWatchdog(interval=0.02, threshold=0.1)
+            watchdog.start()
+            await asyncio.sleep(0.05)
+            block_the_loop()
+            await asyncio.sleep(0.1)
+            watchdog.stop()
+
+            offenders = watchdog.stats()['offenders']
+            assert len(offenders) == 1
+            assert 'block_the_loop' in offenders[0]['location']
+            assert offenders[0]['longest_ms'] >= 100
+
+        asyncio.run(stall_test())
+
+    def test_no_offenders_without_stall(self):
+        async def no_stall_test():
+            watchdog = LoopWatchdog(interval=0.02, threshold=0.1)
+            watchdog.start()
+            await asyncio.sleep(0.1)
+            watchdog.stop()
+
+            stats = watchdog.stats()
+            assert stats['offenders'] == []
+            assert stats['lag']['calls'] > 0
+
+        asyncio.run(no_stall_test())
@@ -0,0 +1,184 @@
+import asyncio
+import dataclasses
+from dataclasses import dataclass
+from unittest import mock
+
+import pytest
+
+from bot.utils.message_store import MessageStateStore, PersistentMessageStore
+from bot.utils.reaction_filter import ReactionFilter
+
+
+class TestMessageStateStore:
+
+    def test_put_get_pop(self):
+        f = ReactionFilter()
+        store = MessageStateStore(f)
+        store.put(1, 'a')
+
+        assert store.get(1) == 'a'
+        assert 1 in f
+        assert store.pop(1) == 'a'
+        assert store.get(1) is None
+        assert 1 not in f
+
+    def test_least_recently_used_is_evicted_over_the_cap(self):
+        f = ReactionFilter()
+        store = MessageStateStore(f, max_entries=2)
+        store.put(1, 'a')
+        store.put(2, 'b')
+        store.get(1)
+        store.put(3, 'c')
+
+        assert store.get(2) is None
+        assert store.get(1) == 'a'
+        assert store.get(3) == 'c'
+        assert 2 not in f
+        assert store.stats()['evicted_lru'] == 1
+
+    def test_unused_entries_expire_after_the_ttl(self):
+        with mock.patch('bot.utils.message_store.time.monotonic') as monotonic:
+            monotonic.return_value = 0
+            store = MessageStateStore(ttl=10)
+            store.put(1, 'a')
+            store.put(2, 'b')
+
+            monotonic.return_value = 8
+            assert store.get(1) == 'a'
+
+            monotonic.return_value = 12
+            assert store.evict_expired() == 1
+            assert store.get(1) == 'a'
+            assert store.get(2) is None
+            assert store.stats()['evicted_ttl'] == 1
+
+            monotonic.return_value = 30
+            assert store.get(1) is None
+            assert len(store) == 0
+
+    def test_invalid_store_throws(self):
+        with pytest.raises(ValueError):
+            MessageStateStore(max_entries=0)
+
+
+class TestPersistentMessageStore:
+
+    def test_state_is_read_back_after_a_restart(self):
+        async def test():
+            repository = MemoryMessageRepository()
+            store = PersistentMessageStore('pageable', PageState, ReactionFilter(), repository=repository)
+            await store.put(1, 10, PageState(0), timeout=60)
+            await store.put(2, 10, PageState(0))
+            state = await store.get(2)
+            state.page = 3
+            await store.save(2, state)
+
+            f = ReactionFilter()
+            restarted = PersistentMessageStore('pageable', PageState, f, repository=repository)
+            loaded = await restarted.load()
+
+            assert sorted(m.message_id for m in loaded) == [1, 2]
+            assert [m.message_id for m in loaded if m.expires_date] == [1]
+            assert 1 in f and 2 in f
+            assert len(restarted) == 0
+            assert (await restarted.get(2)).page == 3
+            assert restarted.stats()['loaded'] == 1
+            assert len(restarted) == 1
+
+        asyncio.run(test())
+
+    def test_stores_of_each_kind_keep_their_own_state_for_a_message(self):
+        async def test():
+            repository = MemoryMessageRepository()
+            pages = PersistentMessageStore('pageable', PageState, repository=repository)
+            deletes = PersistentMessageStore('deletable', PageState, repository=repository)
+            await pages.put(1, 10, PageState(0))
+            await deletes.put(1, 10, PageState(9))
+            state = await pages.get(1)
+            state.page = 2
+            await pages.save(1, state)
+
+            pages = PersistentMessageStore('pageable', PageState, repository=repository)
+            deletes = PersistentMessageStore('deletable', PageState, repository=repository)
+            assert [m.message_id for m in await pages.load()] == [1]
+            assert [m.message_id for m in await deletes.load()] == [1]
+            assert (await pages.get(1)).page == 2
+            assert (await deletes.get(1)).page == 9
+
+        asyncio.run(test())
+
+    def test_state_evicted_from_memory_is_read_back(self):
+        async def test():
+            repository = MemoryMessageRepository()
+            store = PersistentMessageStore('pageable', PageState, repository=repository, max_entries=1)
+            await store.put(1, 10, PageState(1))
+            await store.put(2, 10, PageState(2))
+
+            assert (await store.get(1)).page == 1
+            assert store.stats()['evicted_lru'] == 2
+
+        asyncio.run(test())
+
+    def test_pop_deletes_persisted_state(self):
+        async def test():
+            f = ReactionFilter()
+            repository = MemoryMessageRepository()
+            store = PersistentMessageStore('pageable', PageState, f, repository=repository)
+            await store.put(1, 10, PageState(0))
+
+            await store.pop([1, 2])
+
+            assert repository.messages == {}
+            assert 1 not in f
+            assert await store.get(1) is None
+
+        asyncio.run(test())
+
+    def test_without_a_repository_state_is_only_in_memory(self):
+        async def test():
+            store = PersistentMessageStore('pageable', PageState)
+            await store.put(1, 10, PageState(0))
+
+            assert await store.load() == []
+            assert (await store.get(1)).page == 0
+            assert store.stats()['persisted'] == 0
+
+        asyncio.run(test())
+
+
+@dataclass
+class PageState:
+    page: int
+
+    def to_state(self):
+        return {'page': self.page}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state['page'])
+
+
+class MemoryMessageRepository:
+
+    def __init__(self):
+        self.messages = {}
+
+    async def get_message(self, message_id, kind):
+        return self.messages.get((message_id, kind))
+
+    async def get_messages(self, kind):
+        return [dataclasses.replace(m, message_state='') for m in self.messages.values() if m.message_kind == kind]
+
+    async def upsert_message(self, message):
+        self.messages[message.message_id, message.message_kind] = message
+
+    async def update_state(self, message_id, kind, state, used_at):
+        self.messages[message_id, kind] = dataclasses.replace(self.messages[message_id, kind], message_state=state,
+                                                              used_at=used_at)
+
+    async def delete_messages(self, message_ids, kind):
+        for message_id in message_ids:
+            self.messages.pop((message_id, kind), None)
+
+    async def delete_unused_messages(self, kind, used_before):
+        return []
@@ -0,0 +1,111 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from discord.ext.commands.errors import BadArgument
+
+from bot.utils import paginator
+from bot.utils.paginator import PaginatorView
+
+
+def interaction():
+    response = mock.Mock()
+    response.is_done.return_value = False
+    response.edit_message = mock.AsyncMock()
+    response.defer = mock.AsyncMock(side_effect=lambda: setattr(response.is_done, 'return_value', True))
+    return mock.Mock(response=response, edit_original_response=mock.AsyncMock())
+
+
+def counting_source(pages):
+    rendered = []
+
+    async def source(page):
+        if page >= len(pages):
+            return None
+        rendered.append(page)
+        return pages[page]
+
+    return source, rendered
+
+
+class TestPaginatorView:
+
+    def test_turn_renders_each_page_once_and_edits_in_one_call(self):
+        async def test():
+            source, rendered = counting_source(['a', 'b', 'c'])
+            view = PaginatorView(source, page_count=3)
+            channel = mock.Mock(send=mock.AsyncMock())
+            await view.start(channel)
+
+            for page in [1, 0, 1, 2]:
+                i = interaction()
+                await view.turn(i, page)
+                i.response.edit_message.assert_awaited_once()
+
+            assert rendered == [0, 1, 2]
+            assert view.page == 2
+            assert view.next_page.disabled and view.last_page.disabled
+            embed = i.response.edit_message.call_args.kwargs['embed']
+            assert embed.fields[0].value == 'c'
+            assert embed.footer.text == 'Page 3 of 3'
+
+        asyncio.run(test())
+
+    def test_only_the_last_pages_are_cached(self):
+        async def test():
+            source, rendered = counting_source(['a', 'b', 'c'])
+            view = PaginatorView(source, page_count=3, cache_size=2)
+            await view.start(mock.Mock(send=mock.AsyncMock()))
+
+            for page in [1, 2, 0]:
+                await view.turn(interaction(), page)
+
+            assert rendered == [0, 1, 2, 0]
+
+        asyncio.run(test())
+
+    def test_unknown_page_count_ends_when_the_source_runs_out(self):
+        async def test():
+            source, _ = counting_source(['a', 'b'])
+            view = PaginatorView(source)
+            await view.start(mock.Mock(send=mock.AsyncMock()))
+            assert view.last_page.disabled
+
+            await view.turn(interaction(), 1)
+            i = interaction()
+            await view.turn(i, 2)
+
+            assert view.page == 1
+            assert view.page_count == 2
+            assert view.next_page.disabled
+            assert 'embed' not in i.response.edit_message.call_args.kwargs
+
+        asyncio.run(test())
+
+    def test_slow_page_is_deferred(self):
+        async def test():
+            async def source(page):
+                if page:
+                    await asyncio.sleep(0.05)
+                return f'page {page}'
+
+            view = PaginatorView(source, page_count=2)
+            await view.start(mock.Mock(send=mock.AsyncMock()))
+
+            i = interaction()
+            with mock.patch.object(paginator, 'RESPONSE_DEADLINE', 0.01):
+                await view.turn(i, 1)
+
+            i.response.defer.assert_awaited_once()
+            i.response.edit_message.assert_not_awaited()
+            assert i.edit_original_response.call_args.kwargs['embed'].fields[0].value == 'page 1'
+
+        asyncio.run(test())
+
+    def test_empty_source_throws(self):
+        async def test():
+            source, _ = counting_source([])
+            with pytest.raises(BadArgument):
+                await PaginatorView(source).start(mock.Mock(send=mock.AsyncMock()))
+
+        asyncio.run(test())
@@ -0,0 +1,94 @@
+import asyncio
+from unittest import mock
+
+import discord
+
+from bot.utils.reaction_adder import UNKNOWN_MESSAGE_ERROR_CODE, ReactionAdder
+from bot.utils.request_scheduler import RequestScheduler
+
+
+class FakeMessage:
+
+    def __init__(self, message_id, channel_id=1, *, delay=0.0, deleted_after=None, on_add=None):
+        self.id = message_id
+        self.channel = mock.Mock(id=channel_id)
+        self.reactions = []
+        self.delay = delay
+        self.deleted_after = deleted_after
+        self.on_add = on_add
+
+    async def add_reaction(self, emoji):
+        if self.on_add:
+            self.on_add()
+        await asyncio.sleep(self.delay)
+        if self.deleted_after is not None and len(self.reactions) >= self.deleted_after:
+            raise discord.NotFound(mock.Mock(status=404, reason='Not Found'),
+                                   {'code': UNKNOWN_MESSAGE_ERROR_CODE, 'message': 'Unknown Message'})
+        self.reactions.append(emoji)
+
+
+class TestReactionAdder:
+
+    def test_reactions_are_added_in_order_without_waiting(self):
+        async def test():
+            adder = ReactionAdder(RequestScheduler())
+            message = FakeMessage(1)
+
+            task = adder.add(message, 'a', 'b', 'c')
+            assert message.reactions == []
+            assert adder.pending == 1
+
+            await task
+            assert message.reactions == ['a', 'b', 'c']
+            assert adder.pending == 0
+            stats = adder.stats()
+            assert stats['added'] == 3
+            assert stats['messages'] == 1
+            assert stats['failed'] == 0
+
+        asyncio.run(test())
+
+    def test_cancel_stops_the_reactions_left(self):
+        async def test():
+            adder = ReactionAdder(RequestScheduler())
+            # the message is deleted while its first reaction is being added, which is still added
+            message = FakeMessage(1, on_add=lambda: adder.cancel(1))
+
+            task = adder.add(message, 'a', 'b', 'c', 'd')
+            await asyncio.gather(task, return_exceptions=True)
+            await asyncio.sleep(0.01)
+
+            assert task.cancelled()
+            assert message.reactions == ['a']
+            assert adder.pending == 0
+            assert adder.cancelled == 4
+
+        asyncio.run(test())
+
+    def test_deleted_message_stops_the_reactions_left(self):
+        async def test():
+            adder = ReactionAdder(RequestScheduler())
+            message = FakeMessage(1, deleted_after=1)
+
+            await adder.add(message, 'a', 'b', 'c')
+
+            assert message.reactions == ['a']
+            stats = adder.stats()
+            assert stats['cancelled'] == 1
+            assert stats['failed'] == 1
+
+        asyncio.run(test())
+
+    def test_close_cancels_every_message(self):
+        async def test():
+            adder = ReactionAdder(RequestScheduler())
+            messages = [FakeMessage(i, channel_id=i, delay=0.01) for i in range(3)]
+            for message in messages:
+                adder.add(message, 'a', 'b')
+
+            await adder.close()
+
+            assert adder.pending == 0
+            assert all(message.reactions == [] for message in messages)
+
+        asyncio.run(test())
@@ -0,0 +1,39 @@
+from bot.utils.reaction_filter import ReactionFilter
+
+
+class TestReactionFilter:
+
+    def test_only_watched_messages_are_wanted(self):
+        f = ReactionFilter()
+        f.watch(1)
+
+        assert f.wants(1)
+        assert not f.wants(2)
+        assert not f.wants(3)
+        assert f.stats()['passed'] == 1
+        assert f.stats()['filtered'] == 2
+
+    def test_message_watched_twice_is_kept_until_both_stop(self):
+        f = ReactionFilter()
+        pins = f.watched_set()
+        pages = f.watched_set()
+        pins.add(1)
+        pages.add(1)
+
+        pins.discard(1)
+        assert 1 in f
+
+        pages.discard(1)
+        assert 1 not in f
+
+    def test_watched_set_adds_and_removes_once(self):
+        f = ReactionFilter()
+        messages = f.watched_set()
+        messages.add(1)
+        messages.add(1)
+        messages.remove(1)
+
+        assert 1 not in messages
+        assert 1 not in f
+        messages.discard(1)
+        assert len(f) == 0
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+
+import discord
+import pytest
+
+from bot.utils.request_scheduler import RequestScheduler, channel_bucket, guild_bucket
+
+
+class TestRequestScheduler:
+
+    def test_requests_in_a_bucket_run_in_order(self):
+        ran = []
+
+        def request(n):
+            async def call():
+                await asyncio.sleep(0.001 * (5 - n))
+                ran.append(n)
+                return n
+            return call
+
+        async def order_test():
+            s = RequestScheduler()
+            results = await asyncio.gather(*(s.submit(channel_bucket(1), request(n)) for n in range(5)))
+
+            assert results == [0, 1, 2, 3, 4]
+            assert ran == [0, 1, 2, 3, 4]
+            assert s.stats()['completed'] == 5
+            assert s.depth == 0
+
+        asyncio.run(order_test())
+
+    def test_buckets_run_in_parallel_up_to_the_concurrency(self):
+        running = 0
+        peak = 0
+
+        async def request():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+
+        async def parallel_test():
+            s = RequestScheduler(concurrency=3)
+            await asyncio.gather(*(s.submit(channel_bucket(n % 5), request) for n in range(20)))
+
+            assert peak == 3
+
+        asyncio.run(parallel_test())
+
+    def test_failed_request_does_not_stop_its_bucket(self):
+        async def fail():
+            raise ValueError()
+
+        async def succeed():
+            return 1
+
+        async def fail_test():
+            s = RequestScheduler()
+            results = await asyncio.gather(s.submit(guild_bucket(1, 'roles'), fail),
+                                           s.submit(guild_bucket(1, 'roles'), succeed), return_exceptions=True)
+
+            assert isinstance(results[0], ValueError)
+            assert results[1] == 1
+            assert s.stats()['failed'] == 1
+
+        asyncio.run(fail_test())
+
+    def test_rate_limited_request_is_retried(self):
+        calls = 0
+
+        async def request():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise discord.RateLimited(0.001)
+            return calls
+
+        async def retry_test():
+            s = RequestScheduler()
+
+            assert await s.submit(channel_bucket(1), request) == 2
+            assert s.stats()['retried'] == 1
+
+        asyncio.run(retry_test())
+
+    def test_counts_rate_limits_logged_by_discord(self):
+        s = RequestScheduler()
+        s.start()
+        try:
+            logging.getLogger('discord.http').warning('We are being rate limited. %s %s responded with 429.', 'GET', '/')
+            logging.getLogger('discord.http').warning('Something else')
+        finally:
+            asyncio.run(s.close())
+
+        assert s.stats()['rate_limited'] == 1
+
+    def test_close_cancels_queued_requests(self):
+        async def request():
+            await asyncio.sleep(1)
+
+        async def close_test():
+            s = RequestScheduler()
+            submitted = [asyncio.ensure_future(s.submit(channel_bucket(1), request)) for _ in range(3)]
+            await asyncio.sleep(0)
+            await s.close()
+
+            for future in submitted:
+                with pytest.raises(asyncio.CancelledError):
+                    await future
+
+        asyncio.run(close_test())
+
+    def test_close_cancels_queued_requests_behind_a_running_one(self):
+        started = asyncio.Event()
+
+        async def request():
+            started.set()
+            await asyncio.sleep(1)
+
+        async def close_test():
+            s = RequestScheduler()
+            submitted = [asyncio.ensure_future(s.submit(channel_bucket(1), request)) for _ in range(3)]
+            await started.wait()
+            await s.close()
+
+            results = await asyncio.wait_for(asyncio.gather(*submitted, return_exceptions=True), 1)
+            assert all(isinstance(result, asyncio.CancelledError) for result in results)
+            assert s.depth == 0
+
+        asyncio.run(close_test())
@@ -2,9 +2,11 @@ from attr import dataclass
 from discord.ext.commands.errors import BadArgument
 import pytest
 import asyncio
-from datetime import datetime
+import json
+from datetime import datetime, timedelta
 
-from bot.utils.scheduler import Scheduler
+from bot.models.scheduler_models import ScheduledJob
+from bot.utils.scheduler import MisfirePolicy, Scheduler
 
 class TestScheduler:
 
@@ -27,7 +29,7 @@ class TestScheduler:
             s.schedule_at(foo, time= datetime(year=2100, month= 1, day=1))
 
             assert len(s._scheduled_tasks) == 1
-        asyncio.get_event_loop().run_until_complete(valid_time_test())
+        asyncio.run(valid_time_test())
 
     def test_schedule_in_invalid_time_throws_bad_arg(self):
         async def foo():
@@ -51,7 +53,7 @@ class TestScheduler:
             s.schedule_in(foo, time= 1)
 
             assert len(s._scheduled_tasks) == 1
-        asyncio.get_event_loop().run_until_complete(valid_time_test())
+        asyncio.run(valid_time_test())
 
     def test_get_task_invalid_task_returns_none(self):
         s = Scheduler()
@@ -67,7 +69,7 @@ class TestScheduler:
 
             assert s.get_task(t_id) is not None
 
-        asyncio.get_event_loop().run_until_complete(get_task_valid_task())
+        asyncio.run(get_task_valid_task())
 
     def test_get_task_schedule_at_returns_valid_task(self):
         async def foo():
@@ -79,7 +81,7 @@ class TestScheduler:
 
             assert s.get_task(t_id) is not None
 
-        asyncio.get_event_loop().run_until_complete(get_task_valid_task())
+        asyncio.run(get_task_valid_task())
 
     def test_cancel_task_schedule_at_removes_task(self):
         async def foo():
@@ -93,7 +95,7 @@ class TestScheduler:
 
             assert len(s._scheduled_tasks) == 0
 
-        asyncio.get_event_loop().run_until_complete(get_task_valid_task())
+        asyncio.run(get_task_valid_task())
 
     def test_cancel_task_schedule_at_invalid_id_throws_key_error(self):
         async def foo():
@@ -106,7 +108,7 @@ class TestScheduler:
             with pytest.raises(KeyError):
                 s.cancel(1)
 
-        asyncio.get_event_loop().run_until_complete(get_task_valid_task())
+        asyncio.run(get_task_valid_task())
     
     def test_cancel_task_schedule_in_removes_task(self):
         async def foo():
@@ -120,7 +122,7 @@ class TestScheduler:
 
             assert len(s._scheduled_tasks) == 0
 
-        asyncio.get_event_loop().run_until_complete(get_task_valid_task())
+        asyncio.run(get_task_valid_task())
 
     def test_cancel_task_schedule_in_invalid_id_throws_key_error(self):
         async def foo():
@@ -133,5 +135,357 @@ class TestScheduler:
             with pytest.raises(KeyError):
                 s.cancel(1)
 
-        asyncio.get_event_loop().run_until_complete(get_task_valid_task())
+        asyncio.run(get_task_valid_task())
 
+
+    def test_scheduled_callbacks_run_in_due_order(self):
+        ran = []
+
+        async def foo(name):
+            ran.append(name)
+
+        async def due_order_test():
+            s = Scheduler()
+            s.schedule_in(foo('last'), time=0.03)
+            s.schedule_in(foo('first'), time=0.01)
+            s.schedule_in(foo('second'), time=0.02)
+
+            await asyncio.sleep(0.1)
+
+            assert ran == ['first', 'second', 'last']
+            assert len(s._scheduled_tasks) == 0
+
+        asyncio.run(due_order_test())
+
+    def test_cancelled_callback_does_not_run(self):
+        ran = []
+
+        async def foo(name):
+            ran.append(name)
+
+        async def cancel_test():
+            s = Scheduler()
+            t_id = s.schedule_in(foo('cancelled'), time=0.01)
+            s.schedule_in(foo('kept'), time=0.02)
+            s.cancel(t_id)
+
+            await asyncio.sleep(0.05)
+
+            assert ran == ['kept']
+
+        asyncio.run(cancel_test())
+
+    def test_contains_scheduled_task(self):
+        async def foo():
+            pass
+
+        async def contains_test():
+            s = Scheduler()
+            t_id = s.schedule_in(foo(), time=1)
+
+            assert t_id in s
+            s.cancel(t_id)
+            assert t_id not in s
+
+        asyncio.run(contains_test())
+
+    def test_running_task_is_tracked_until_cancelled(self):
+        cancelled = []
+
+        async def foo(event):
+            event.set()
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def running_test():
+            s = Scheduler()
+            started = asyncio.Event()
+            t_id = s.schedule_in(foo(started), time=0)
+            await started.wait()
+
+            assert t_id in s
+            s.cancel(t_id)
+            await asyncio.sleep(0)
+
+            assert cancelled == [True]
+            assert t_id not in s
+            assert len(s) == 0
+
+        asyncio.run(running_test())
+
+    def test_finished_task_is_no_longer_tracked(self):
+        async def foo():
+            pass
+
+        async def finished_test():
+            s = Scheduler()
+            t_id = s.schedule_in(foo(), time=0)
+            await asyncio.sleep(0.02)
+
+            assert t_id not in s
+            with pytest.raises(KeyError):
+                s.cancel(t_id)
+
+        asyncio.run(finished_test())
+
+    def test_schedule_in_with_task_id_replaces_scheduled_task(self):
+        ran = []
+
+        async def foo(name):
+            ran.append(name)
+
+        async def replace_test():
+            s = Scheduler()
+            s.schedule_in(foo('replaced'), time=0.01, task_id='task')
+            s.schedule_in(foo('kept'), time=0.01, task_id='task')
+
+            assert len(s) == 1
+            await asyncio.sleep(0.05)
+            assert ran == ['kept']
+
+        asyncio.run(replace_test())
+
+    def test_running_task_rescheduling_its_id_is_not_cancelled(self):
+        ran = []
+
+        async def foo(s, name):
+            s.schedule_in(foo(s, 'next'), time=1, task_id='task')
+            await asyncio.sleep(0)
+            ran.append(name)
+
+        async def reschedule_test():
+            s = Scheduler()
+            s.schedule_in(foo(s, 'first'), time=0, task_id='task')
+            await asyncio.sleep(0.02)
+
+            assert ran == ['first']
+            assert 'task' in s
+            s.cancel('task')
+
+        asyncio.run(reschedule_test())
+
+    def test_load_jobs_catches_up_missed_jobs_in_one_batch(self):
+        ran = []
+
+        async def job(name):
+            ran.append(name)
+
+        async def catch_up_test():
+            store = MemoryJobStore([
+                ScheduledJob('missed-1', 'job', '2000-01-01 00:00:00', json.dumps({'name': 'a'})),
+                ScheduledJob('missed-2', 'job', '2000-01-02 00:00:00', json.dumps({'name': 'b'})),
+                ScheduledJob('future', 'job', '2100-01-01 00:00:00', json.dumps({'name': 'c'})),
+                ScheduledJob('unknown', 'other', '2000-01-01 00:00:00', '{}'),
+            ])
+            s = Scheduler(store=store)
+            s.register_job('job', job)
+
+            await s.load_jobs()
+
+            # the missed jobs run in the background, so loading returns before they have run
+            assert ran == []
+            assert 'missed-1' in s
+            await asyncio.sleep(0.01)
+
+            assert sorted(ran) == ['a', 'b']
+            assert store.deletes == [['missed-1', 'missed-2']]
+            assert 'missed-1' not in s
+            assert 'future' in s
+            assert set(store.jobs) == {'future', 'unknown'}
+            s.cancel('future')
+
+        asyncio.run(catch_up_test())
+
+    def test_schedule_job_at_persists_and_removes_job_when_run(self):
+        ran = []
+
+        async def job(name):
+            ran.append(name)
+
+        async def persist_test():
+            store = MemoryJobStore([])
+            s = Scheduler(store=store)
+            s.register_job('job', job)
+
+            job_id = await s.schedule_job_at('job', time=datetime.utcnow() + timedelta(seconds=0.01), job_id='job:1', name='a')
+
+            assert store.jobs['job:1'].kwargs == {'name': 'a'}
+            await asyncio.sleep(0.05)
+            assert ran == ['a']
+            assert job_id not in s
+            assert 'job:1' not in store.jobs
+
+        asyncio.run(persist_test())
+
+    def test_persist_job_is_caught_up_until_cancelled(self):
+        ran = []
+
+        async def job(name):
+            ran.append(name)
+
+        async def checkpoint_test():
+            store = MemoryJobStore([])
+            s = Scheduler(store=store)
+            s.register_job('job', job)
+
+            await s.persist_job('job', job_id='job:1', name='a')
+            assert 'job:1' not in s
+
+            # a restart before the work is done runs the job again
+            restarted = Scheduler(store=store)
+            restarted.register_job('job', job)
+            await restarted.load_jobs()
+            await asyncio.sleep(0.01)
+            assert ran == ['a']
+
+            await s.persist_job('job', job_id='job:2', name='b')
+            await s.cancel_job('job:2')
+            assert store.jobs == {}
+
+        asyncio.run(checkpoint_test())
+
+    def test_load_jobs_again_does_not_repeat_a_running_job(self):
+        ran = []
+        release = asyncio.Event()
+
+        async def job(name):
+            ran.append(name)
+            await release.wait()
+
+        async def reload_test():
+            store = MemoryJobStore([ScheduledJob('job:1', 'job', '2000-01-01 00:00:00', json.dumps({'name': 'x'}))])
+            s = Scheduler(store=store)
+            s.register_job('job', job)
+
+            await s.load_jobs()
+            await asyncio.sleep(0.01)
+            # on_ready fires again on a reconnect while the caught up job is still running
+            await s.load_jobs()
+            release.set()
+            await asyncio.sleep(0.01)
+
+            assert ran == ['x']
+            assert store.jobs == {}
+
+        asyncio.run(reload_test())
+
+    def test_load_jobs_skips_a_job_in_progress_until_cancelled(self):
+        ran = []
+
+        async def job(name):
+            ran.append(name)
+
+        async def in_progress_test():
+            store = MemoryJobStore([])
+            s = Scheduler(store=store)
+            s.register_job('job', job)
+
+            await s.persist_job('job', job_id='job:1', name='a')
+            await s.load_jobs()
+            await asyncio.sleep(0.01)
+            assert ran == []
+
+            await s.cancel_job('job:1')
+            assert store.jobs == {}
+
+        asyncio.run(in_progress_test())
+
+    def test_cancel_job_without_store_throws_runtime_error(self):
+        s = Scheduler()
+        with pytest.raises(RuntimeError):
+            asyncio.run(s.cancel_job('job:1'))
+
+    def test_schedule_every_runs_until_cancelled(self):
+        ran = []
+        three_runs = asyncio.Event()
+
+        async def foo():
+            ran.append(1)
+            if len(ran) == 3:
+                three_runs.set()
+
+        async def every_test():
+            s = Scheduler()
+            t_id = s.schedule_every(foo, interval=0.01)
+
+            await asyncio.wait_for(three_runs.wait(), timeout=5)
+            s.cancel(t_id)
+            runs = len(ran)
+            await asyncio.sleep(0.03)
+
+            assert len(ran) == runs
+            assert t_id not in s
+
+        asyncio.run(every_test())
+
+    def test_schedule_every_invalid_interval_throws_bad_arg(self):
+        async def foo():
+            pass
+
+        async def invalid_interval_test():
+            s = Scheduler()
+            with pytest.raises(BadArgument):
+                s.schedule_every(foo, interval=0)
+
+        asyncio.run(invalid_interval_test())
+
+    def test_schedule_cron_invalid_expression_throws_bad_arg(self):
+        async def foo():
+            pass
+
+        async def invalid_cron_test():
+            s = Scheduler()
+            with pytest.raises(BadArgument):
+                s.schedule_cron(foo, cron='not a cron')
+
+        asyncio.run(invalid_cron_test())
+
+    @pytest.mark.parametrize('misfire', list(MisfirePolicy))
+    def test_busy_recurring_job_applies_misfire_policy(self, misfire):
+        async def misfire_test():
+            release = asyncio.Event()
+
+            async def blocked():
+                await release.wait()
+
+            s = Scheduler()
+            # the first run blocks while the job keeps firing every 10ms
+            t_id = s.schedule_every(blocked, interval=0.01, misfire=misfire)
+            await asyncio.sleep(0.045)
+            job = s.get_task(t_id)
+
+            assert job.running == 1
+            if misfire is MisfirePolicy.skip:
+                assert job.pending == 0
+            elif misfire is MisfirePolicy.coalesce:
+                assert job.pending == 1
+            else:
+                assert job.pending >= 2
+
+            s.cancel(t_id)
+            release.set()
+            await asyncio.sleep(0.01)
+            assert job.running == 0
+
+        asyncio.run(misfire_test())
+
+
+class MemoryJobStore:
+
+    def __init__(self, jobs):
+        self.jobs = {job.job_id: job for job in jobs}
+        self.deletes = []
+
+    async def get_all_jobs(self):
+        return list(self.jobs.values())
+
+    async def upsert_job(self, job):
+        self.jobs[job.job_id] = job
+
+    async def delete_jobs(self, job_ids):
+        self.deletes.append(job_ids)
+        for job_id in job_ids:
+            self.jobs.pop(job_id, None)
@@ -0,0 +1,57 @@
+import pytest
+
+from bot.utils.timer_wheel import TimerWheel
+
+
+class TestTimerWheel:
+
+    def test_entries_expire_after_their_timeout(self):
+        wheel = TimerWheel(slots=8)
+        start = wheel._tick
+        wheel.add('a', 1, 2, now=start)
+        wheel.add('b', 2, 5, now=start)
+
+        assert wheel.expire(now=start + 1) == []
+        assert wheel.expire(now=start + 2) == [('a', 1)]
+        assert wheel.expire(now=start + 10) == [('b', 2)]
+        assert len(wheel) == 0
+
+    def test_timeout_longer_than_a_turn_waits_for_more_turns(self):
+        wheel = TimerWheel(slots=4)
+        start = wheel._tick
+        wheel.add('a', 1, 10, now=start)
+
+        for second in range(1, 10):
+            assert wheel.expire(now=start + second) == []
+        assert wheel.expire(now=start + 10) == [('a', 1)]
+
+    def test_every_expired_entry_is_returned_after_a_long_gap(self):
+        wheel = TimerWheel(slots=4)
+        start = wheel._tick
+        for i in range(10):
+            wheel.add(i, i, i + 1, now=start)
+
+        assert sorted(wheel.expire(now=start + 100)) == [(i, i) for i in range(10)]
+
+    def test_discarded_and_replaced_entries(self):
+        wheel = TimerWheel(slots=8)
+        start = wheel._tick
+        wheel.add('a', 1, 1, now=start)
+        wheel.add('b', 2, 1, now=start)
+        wheel.discard('a')
+        wheel.add('b', 3, 5, now=start)
+
+        assert 'a' not in wheel
+        assert wheel.expire(now=start + 1) == []
+        assert wheel.expire(now=start + 5) == [('b', 3)]
+
+    def test_zero_timeout_expires_on_the_next_tick(self):
+        wheel = TimerWheel(slots=8)
+        start = wheel._tick
+        wheel.add('a', 1, 0, now=start)
+
+        assert wheel.expire(now=start + 1) == [('a', 1)]
+
+    def test_invalid_wheel_throws(self):
+        with pytest.raises(ValueError):
+            TimerWheel(resolution=0)
@@ -0,0 +1,66 @@
+import asyncio
+
+import discord
+import pytest
+
+from bot.utils.worker_pool import map_concurrently
+
+
+class TestWorkerPool:
+
+    def test_results_are_in_item_order_with_exceptions_in_place(self):
+        async def double(n):
+            await asyncio.sleep(0.001 * (5 - n))
+            if n == 3:
+                raise ValueError(n)
+            return n * 2
+
+        results = asyncio.run(map_concurrently(double, range(5), concurrency=2))
+
+        assert results[:3] == [0, 2, 4]
+        assert isinstance(results[3], ValueError)
+        assert results[4] == 8
+
+    def test_concurrency_is_limited(self):
+        running = 0
+        peak = 0
+
+        async def work(_):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+
+        asyncio.run(map_concurrently(work, range(20), concurrency=3))
+
+        assert peak == 3
+
+    def test_on_done_is_called_for_every_item(self):
+        done = []
+
+        async def work(n):
+            return n
+
+        async def on_done(item, result):
+            done.append((item, result))
+
+        asyncio.run(map_concurrently(work, range(4), concurrency=4, on_done=on_done))
+
+        assert sorted(done) == [(0, 0), (1, 1), (2, 2), (3, 3)]
+
+    def test_rate_limited_item_is_not_retried(self):
+        calls = []
+
+        async def work(n):
+            calls.append(n)
+            raise discord.RateLimited(0)
+
+        results = asyncio.run(map_concurrently(work, [0], concurrency=1))
+
+        assert isinstance(results[0], discord.RateLimited)
+        assert calls == [0]
+
+    def test_invalid_concurrency_throws(self):
+        with pytest.raises(ValueError):
+            asyncio.run(map_concurrently(None, [], concurrency=0))
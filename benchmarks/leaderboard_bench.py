@@ -0,0 +1,88 @@
+"""
+Load test for the geoguessr leaderboard
+
+Seeds a migrated database with 100k players and compares what the `lb` command and its rank button
+used to cost (a full ROW_NUMBER() window scan per rank lookup and a query per top 10 entry) against
+the in memory Leaderboard. Run from the repository root with:
+
+    python -m benchmarks.leaderboard_bench [players]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import aiosqlite
+
+from bot.data.base_repository import BaseRepository
+from bot.data.database import Database
+from bot.data.geo_repository import GeoRepository
+
+PLAYERS = 100_000
+OPERATIONS = 1_000
+# the old rank and top 10 lookups take whole table scans, so fewer of them are timed
+WINDOW_OPERATIONS = 20
+
+
+async def seed(path: str, players: int) -> None:
+    async with aiosqlite.connect(path) as db:
+        with open('bot/data/CreateTables.sql') as f:
+            await db.executescript(f.read())
+        await Database().migrate(db)
+        await db.executemany('INSERT INTO GeoguessrLeaderboard (user_id, score) VALUES (?, ?)',
+                             ((user_id, random.randrange(1_000_000)) for user_id in range(players)))
+        await db.commit()
+
+
+async def window_rank(repo: GeoRepository, user_id: int) -> int:
+    async with repo.read() as db:
+        cursor = await db.execute('SELECT *, ROW_NUMBER() OVER(ORDER BY score DESC) AS RANK from '
+                                  'GeoguessrLeaderboard')
+        return next(row['RANK'] for row in await repo.fetch_all_as_dict(cursor) if row['user_id'] == user_id)
+
+
+async def query_top_10(repo: GeoRepository) -> list:
+    return [(await repo.sort_and_return())[i] for i in range(10)]
+
+
+async def timed(name: str, operations: int, operation) -> None:
+    start = time.perf_counter()
+    for _ in range(operations):
+        await operation()
+    print(f'{name:>30} {(time.perf_counter() - start) / operations * 1e6:>12.1f}')
+
+
+async def main(players: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        print(f'Seeding {players:,} players...')
+        await seed(path, players)
+        await BaseRepository.open_pool(path)
+        repo = GeoRepository()
+
+        def player() -> int:
+            return random.randrange(players)
+
+        start = time.perf_counter()
+        await repo.get_leaderboard()
+        print(f'Leaderboard loaded in {(time.perf_counter() - start) * 1e3:.1f}ms')
+
+        print(f'{"operation":>30} {"us/op":>12}')
+        await timed('rank (window scan)', WINDOW_OPERATIONS, lambda: window_rank(repo, player()))
+        await timed('top 10 (query per entry)', WINDOW_OPERATIONS, lambda: query_top_10(repo))
+        await timed('rank (leaderboard)', OPERATIONS, lambda: repo.get_user_rank(player()))
+        await timed('top 10 (leaderboard)', OPERATIONS, lambda: repo.get_top(10))
+
+        GeoRepository.buffer_scores = True
+        await timed('add score (buffered)', OPERATIONS, lambda: repo.add_score(player(), random.randrange(5000)))
+        start = time.perf_counter()
+        await repo.flush_scores()
+        print(f'Flushed {OPERATIONS} buffered scores in {(time.perf_counter() - start) * 1e3:.1f}ms')
+
+        await BaseRepository.close_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else PLAYERS))
@@ -0,0 +1,45 @@
+"""
+Micro-benchmark for Messenger.publish
+
+Measures the cost of publishing a single event for a range of listener counts.
+Run from the repository root with:
+
+    python -m benchmarks.messenger_bench
+"""
+import asyncio
+import time
+
+from bot.messaging.messenger import Messenger
+
+LISTENER_COUNTS = [0, 1, 5, 10, 50, 100]
+PUBLISHES = 20_000
+
+
+class Listener:
+    async def on_event(self, *args, **kwargs) -> None:
+        pass
+
+
+async def bench(listener_count: int) -> float:
+    messenger = Messenger(name='bench')
+    # keep strong references alive for the duration of the run
+    listeners = [Listener() for _ in range(listener_count)]
+    for listener in listeners:
+        messenger.subscribe('bench_event', listener.on_event)
+
+    start = time.perf_counter()
+    for _ in range(PUBLISHES):
+        await messenger.publish('bench_event', 1, key='value')
+    return (time.perf_counter() - start) / PUBLISHES
+
+
+async def main() -> None:
+    print(f'{"listeners":>10} {"us/publish":>12} {"ns/listener":>12}')
+    for count in LISTENER_COUNTS:
+        per_publish = await bench(count)
+        per_listener = per_publish / count * 1e9 if count else 0
+        print(f'{count:>10} {per_publish * 1e6:>12.2f} {per_listener:>12.1f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark for repository query latency
+
+Compares opening a new aiosqlite connection for every query, which is what every repository
+method used to do, against borrowing a connection from the shared ConnectionPool.
+Run from the repository root with:
+
+    python -m benchmarks.repository_bench
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+import aiosqlite
+
+from bot.data.base_repository import BaseRepository
+from bot.data.pin_repository import PinRepository
+from bot.models.class_models import ClassPin
+
+PINS = 1_000
+QUERIES = 2_000
+CONCURRENCY = [1, 8]
+
+
+async def seed(path: str) -> None:
+    async with aiosqlite.connect(path) as db:
+        with open('bot/data/CreateTables.sql') as f:
+            await db.executescript(f.read())
+        await db.executemany('INSERT INTO ClassPin VALUES (?, ?, ?, ?, ?, False)',
+                             [(i, i + PINS, 1, 1, 1) for i in range(PINS)])
+        await db.commit()
+
+
+async def connect_per_query(path: str, message_id: int) -> None:
+    async with aiosqlite.connect(path) as db:
+        cursor = await db.execute('SELECT * FROM ClassPin WHERE sockbot_message_id = ?', (message_id,))
+        await cursor.fetchone()
+
+
+async def run(query, concurrency: int) -> float:
+    async def worker(offset: int) -> None:
+        for i in range(offset, QUERIES, concurrency):
+            await query(i % PINS)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return (time.perf_counter() - start) / QUERIES
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        await seed(path)
+        await BaseRepository.open_pool(path)
+        repo = PinRepository()
+
+        print(f'{"concurrency":>12} {"connect us/query":>18} {"pool us/query":>15} {"speedup":>8}')
+        for concurrency in CONCURRENCY:
+            before = await run(lambda message_id: connect_per_query(path, message_id), concurrency)
+            after = await run(repo.get_pin_from_sockbot, concurrency)
+            print(f'{concurrency:>12} {before * 1e6:>18.1f} {after * 1e6:>15.1f} {before / after:>7.1f}x')
+
+        await BaseRepository.close_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+Benchmark of the heap based Scheduler against the previous task per job scheduler
+
+Measures the time to schedule and to cancel N pending jobs and the memory they hold.
+Run from the repository root with:
+
+    python -m benchmarks.scheduler_bench [job counts...]
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+import uuid
+
+from bot.utils.scheduler import Scheduler
+
+DEFAULT_JOB_COUNTS = [10_000, 100_000]
+# far enough in the future that no job runs during the benchmark
+DELAY = 3600
+
+
+class TaskPerJobScheduler:
+    """The previous scheduler implementation, one sleeping asyncio.Task per scheduled job"""
+
+    def __init__(self) -> None:
+        self._scheduled_tasks = {}
+
+    def schedule_in(self, coro, *, time):
+        task_id = uuid.uuid4()
+        task = asyncio.create_task(self._delayed_coro(time, coro))
+        task.add_done_callback(lambda _: self._scheduled_tasks.pop(task_id, None))
+        self._scheduled_tasks[task_id] = task
+        return task_id
+
+    def cancel(self, task_id):
+        self._scheduled_tasks[task_id].cancel()
+        del self._scheduled_tasks[task_id]
+
+    async def _delayed_coro(self, delay, coro):
+        try:
+            await asyncio.sleep(delay)
+            await coro
+        finally:
+            coro.close()
+
+
+async def job():
+    pass
+
+
+async def schedule_all(scheduler, count: int):
+    ids = [scheduler.schedule_in(job(), time=DELAY + i / count) for i in range(count)]
+    # let the task per job scheduler start every task so their frames are allocated
+    await asyncio.sleep(0)
+    return ids
+
+
+async def cancel_all(scheduler, ids) -> None:
+    for task_id in ids:
+        scheduler.cancel(task_id)
+    await asyncio.sleep(0)
+
+
+async def bench(scheduler_type, count: int):
+    scheduler = scheduler_type()
+    start = time.perf_counter()
+    ids = await schedule_all(scheduler, count)
+    schedule_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await cancel_all(scheduler, ids)
+    cancel_time = time.perf_counter() - start
+
+    # measure memory in a separate run, tracing allocations skews the timings
+    scheduler = scheduler_type()
+    tracemalloc.start()
+    ids = await schedule_all(scheduler, count)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await cancel_all(scheduler, ids)
+
+    return schedule_time, cancel_time, memory
+
+
+async def main(counts):
+    print(f'{"scheduler":>12} {"jobs":>8} {"schedule us/job":>16} {"cancel us/job":>14} {"memory MB":>10}')
+    for count in counts:
+        for name, scheduler_type in (('task-per-job', TaskPerJobScheduler), ('heap', Scheduler)):
+            schedule_time, cancel_time, memory = await bench(scheduler_type, count)
+            print(f'{name:>12} {count:>8} {schedule_time / count * 1e6:>16.2f} '
+                  f'{cancel_time / count * 1e6:>14.2f} {memory / 1e6:>10.1f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main([int(n) for n in sys.argv[1:]] or DEFAULT_JOB_COUNTS))
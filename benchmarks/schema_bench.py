@@ -0,0 +1,92 @@
+"""
+Benchmark for the lookup indexes added by the database migrations
+
+Seeds a database with the base tables, times the repository lookups, applies the migrations and
+times the same lookups again. Run from the repository root with:
+
+    python -m benchmarks.schema_bench [rows]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import aiosqlite
+
+from bot.data.base_repository import BaseRepository
+from bot.data.class_repository import ClassRepository
+from bot.data.database import Database
+from bot.data.geo_repository import GeoRepository
+from bot.data.pin_repository import PinRepository
+
+ROWS = 1_000_000
+CHANNELS = 500
+LOOKUPS = 200
+
+
+async def seed(path: str, rows: int) -> None:
+    async with aiosqlite.connect(path) as db:
+        with open('bot/data/CreateTables.sql') as f:
+            await db.executescript(f.read())
+        # the role lookup needs the ta role column, which the first migration would otherwise add
+        await db.execute('ALTER TABLE ClassChannel ADD COLUMN class_ta_role_id INTEGER')
+        await db.executemany('INSERT INTO ClassChannel VALUES (?, ?, 1, ?, ?, ?, NULL, ?, ?, FALSE, ?)',
+                             ((c, 'sp2023', c + 10_000, 'CPSC', 1000 + c, 'Prof', 'Class', c + 20_000)
+                              for c in range(CHANNELS)))
+        await db.executemany('INSERT INTO ClassPin VALUES (?, ?, ?, 1, 1, ?)',
+                             ((i, i + rows, i % CHANNELS, i % 10 != 0) for i in range(rows)))
+        await db.executemany('INSERT INTO GeoguessrLeaderboard (user_id, score) VALUES (?, ?)',
+                             ((i, i * 7 % 100_000) for i in range(rows)))
+        await db.commit()
+
+
+async def time_lookups(rows: int) -> dict[str, float]:
+    pins = PinRepository()
+    classes = ClassRepository()
+    geo = GeoRepository()
+    lookups = {
+        'pin by user message': lambda i: pins.get_pin_from_user(i * 997 % rows + rows),
+        'open pin by message': lambda i: pins.get_open_pin_from_message(i * 997 % rows + rows),
+        'pins by channel': lambda i: pins.get_pins_from_channel(i % CHANNELS),
+        'existing geo score': lambda i: geo.get_existing_score(i * 997 % rows),
+        'top 10 geo scores': lambda i: geo.sort_and_return(),
+        'class by role': lambda i: classes.search_class_by_role(i % CHANNELS + 20_000),
+    }
+
+    results = {}
+    for name, lookup in lookups.items():
+        start = time.perf_counter()
+        for i in range(LOOKUPS):
+            await lookup(i)
+        results[name] = (time.perf_counter() - start) / LOOKUPS
+    return results
+
+
+async def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        print(f'Seeding {rows:,} pins and scores...')
+        await seed(path, rows)
+
+        await BaseRepository.open_pool(path)
+        before = await time_lookups(rows)
+        await BaseRepository.close_pool()
+
+        async with aiosqlite.connect(path) as db:
+            start = time.perf_counter()
+            await Database().migrate(db)
+            print(f'Migrations applied in {time.perf_counter() - start:.2f}s')
+
+        await BaseRepository.open_pool(path)
+        after = await time_lookups(rows)
+        await BaseRepository.close_pool()
+
+    print(f'{"lookup":>22} {"before ms":>10} {"after ms":>10} {"speedup":>9}')
+    for name in before:
+        print(f'{name:>22} {before[name] * 1e3:>10.3f} {after[name] * 1e3:>10.3f} '
+              f'{before[name] / after[name]:>8.0f}x')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS))
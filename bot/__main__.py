@@ -9,6 +9,9 @@ import discord
 
 import bot.bot_secrets as bot_secrets
 from bot.sock_bot import SockBot as SockBot
+from bot.data.scheduler_repository import SchedulerRepository
+from bot.messaging.event_queue import OverflowPolicy
+from bot.messaging.events import Events
 from bot.messaging.messenger import Messenger
 from bot.utils.scheduler import Scheduler
 
@@ -69,13 +72,26 @@ async def main():
     # E.G a website frontend
     messenger = Messenger(name='primary_bot_messenger')
 
+    # raw reactions are high volume and low priority, queue them so a raid or a mass reaction
+    # can't pile up unbounded listener coroutines, repeated reactions from the same user are coalesced.
+    # adds and removes share the queue and are ordered per message so a remove never overtakes its add
+    messenger.configure_queue(
+        Events.on_raw_reaction_add,
+        Events.on_raw_reaction_remove,
+        maxsize=500,
+        workers=4,
+        overflow=OverflowPolicy.coalesce,
+        key=lambda payload: (payload.message_id, payload.user_id, str(payload.emoji)),
+        order=lambda payload: payload.message_id
+    )
+
     # enable privileged member gateway intents
     intents = discord.Intents.default()  # pylint: disable=assigning-non-slot
     intents.members = True  # pylint: disable=assigning-non-slot
     intents.message_content = True  # pylint: disable=assigning-non-slot
 
-    # Create the scheduler for injection into the bot instance
-    scheduler = Scheduler()
+    # Create the scheduler for injection into the bot instance, backed by the database so jobs survive restarts
+    scheduler = Scheduler(store=SchedulerRepository())
 
     # set allowed mentions
     mentions = discord.AllowedMentions(everyone=False, roles=False)
@@ -89,6 +105,9 @@ async def main():
         activity=discord.Game(name='Run ?help'),
         case_insensitive=True,
         max_messages=50000,
+        # discord.py waits out rate limits up to this many seconds itself and raises discord.RateLimited
+        # for longer ones, which the RequestScheduler retries in order within the bucket
+        max_ratelimit_timeout=30.0,
         allowed_mentions=mentions,
         intents=intents
     )
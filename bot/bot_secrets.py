@@ -21,6 +21,8 @@ class BotSecrets:
         self._error_log_channel_ids: list[int] | None = None
         self._class_archive_category_ids: list[int] | None = None
         self._class_notifs_channel_id: int | None = None
+        self._event_metrics_snapshot_interval: int | None = None
+        self._persist_interactive_messages: bool | None = None
 
     @property
     def bot_token(self) -> str:
@@ -175,6 +177,38 @@ class BotSecrets:
             raise ConfigAccessError("class_notifs_channel_id has already been initialized")
         self._class_notifs_channel_id = value
 
+    @property
+    def event_metrics_snapshot_interval(self) -> int | None:
+        """
+        The number of seconds between messenger event metric snapshots written to the Logs directory
+
+        Returns:
+            int | None: The interval, or None if snapshots are disabled
+        """
+        return self._event_metrics_snapshot_interval
+
+    @event_metrics_snapshot_interval.setter
+    def event_metrics_snapshot_interval(self, value: int | None) -> None:
+        if self._event_metrics_snapshot_interval:
+            raise ConfigAccessError("event_metrics_snapshot_interval has already been initialized")
+        self._event_metrics_snapshot_interval = value
+
+    @property
+    def persist_interactive_messages(self) -> bool:
+        """
+        Whether the state of paginated and deletable messages is kept in the database so it survives a restart
+
+        Returns:
+            bool: True if the state is persisted, defaults to False
+        """
+        return bool(self._persist_interactive_messages)
+
+    @persist_interactive_messages.setter
+    def persist_interactive_messages(self, value: bool | None) -> None:
+        if self._persist_interactive_messages:
+            raise ConfigAccessError("persist_interactive_messages has already been initialized")
+        self._persist_interactive_messages = value
+
     def load_development_secrets(self, lines: str) -> None:
         secrets = json.loads(lines)
 
@@ -190,6 +224,8 @@ class BotSecrets:
         self.azure_translate_key = secrets["AzureTranslateKey"]
         self.class_archive_category_ids = secrets["ClassArchiveCategoryIds"]
         self.class_notifs_channel_id = secrets["ClassNotifsChannelId"]
+        self.event_metrics_snapshot_interval = secrets.get("EventMetricsSnapshotInterval")
+        self.persist_interactive_messages = secrets.get("PersistInteractiveMessages")
 
         log.info("Bot Secrets Loaded")
 
@@ -214,6 +250,9 @@ class BotSecrets:
             int(n) for n in os.environ.get("CLASS_ARCHIVE_CATEGORY_IDS").split(",")  # type: ignore
         ]
         self.class_notifs_channel_id = int(os.environ.get("CLASS_NOTIFS_CHANNEL_ID"))  # type: ignore
+        if interval := os.environ.get("EVENT_METRICS_SNAPSHOT_INTERVAL"):
+            self.event_metrics_snapshot_interval = int(interval)
+        self.persist_interactive_messages = os.environ.get("PERSIST_INTERACTIVE_MESSAGES", "").lower() == "true"
 
         log.info("Production keys loaded")
 
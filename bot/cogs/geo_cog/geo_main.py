@@ -144,19 +144,11 @@ class GeoGuessCog(commands.Cog):
                              icon_url="https://i.imgur.com/ZyGOyTg.png")
         lb_output = ""
 
-        entries: int = 10 if (await self.repo.return_size()) >= 10 else (await self.repo.return_size())
         rank_btn = Button(label="What's my rank?", style=discord.ButtonStyle.primary, row=1)
 
         async def view_rank(interaction: discord.Interaction) -> None:
-            if await self.repo.get_by_userid_scores_descending(interaction.user.id) is not None:
-                size = (await self.repo.return_size())
-                rank = 0
-
-                for x in range(size):
-                    if (await self.repo.get_rank())[x].get('user_id') == interaction.user.id:
-                        rank = (await self.repo.get_rank())[x].get('RANK')
-
-                score = (await self.repo.sort_and_return())[rank - 1].get('score')
+            if (user_rank := await self.repo.get_user_rank(interaction.user.id)) is not None:
+                rank, score = user_rank
                 msg = f'You are ranked **#{rank}** and you have **{score} points**'
                 await interaction.response.send_message(msg, ephemeral=True)
             else:
@@ -167,10 +159,10 @@ class GeoGuessCog(commands.Cog):
         rank_btn.callback = view_rank
         view.add_item(rank_btn)
 
-        for i in range(entries):
+        for i, (user_id, score) in enumerate(await self.repo.get_top(10)):
             lb_output += f"**{i+1}.** " \
-                        f"{guild.get_member((await self.repo.sort_and_return())[i].get('user_id'))} " \
-                        f" **{(await self.repo.sort_and_return())[i].get('score')} points**\n"
+                        f"{guild.get_member(user_id)} " \
+                        f" **{score} points**\n"
 
         new_embed.add_field(name="Leaderboard", value=lb_output, inline=False)
         await ctx.send(embed=new_embed, view=view)
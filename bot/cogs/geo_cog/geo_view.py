@@ -214,11 +214,7 @@ class CountryBTN(discord.ui.Button):
             if self.status == "correct":
                 # Calculate score and update database with new score.
                 final_score: int = int(5000 * math.exp((-1 / 28) * (end - self.start)))
-                if await self.repo.get_by_userid_scores_descending(interaction.user.id) is None:
-                    await self.repo.add_into(interaction.user.id, final_score)
-                else:
-                    existingScore = (await self.repo.get_existing_score(interaction.user.id)) + final_score
-                    await self.repo.update_score(existingScore, interaction.user.id)
+                await self.repo.add_score(interaction.user.id, final_score)
 
                 # Generate a message displaying the location of the image.
                 city: str = self.parent_self.location_params['city']
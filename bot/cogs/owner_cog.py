@@ -9,6 +9,8 @@ import discord.ext.commands as commands
 import bot.bot_secrets as bot_secrets
 from bot.consts import DiscordLimits
 from bot.data.base_repository import BaseRepository
+from bot.data.class_repository import ClassRepository
+from bot.utils.message_store import PersistentMessageStore
 
 log = logging.getLogger(__name__)
 
@@ -43,6 +45,122 @@ class OwnerCog(commands.Cog):
     async def log(self, ctx):
         pass
 
+    @owner.group(invoke_without_command=True)
+    @commands.is_owner()
+    async def stats(self, ctx):
+        pass
+
+    @stats.command()
+    @commands.is_owner()
+    async def events(self, ctx, reset: bool = False):
+        """Shows the call counts, latency percentiles and error counts of every event and listener"""
+        snapshot = self.bot.messenger.metrics.snapshot()
+        if reset:
+            self.bot.messenger.metrics.reset()
+        if not snapshot:
+            await ctx.send('No messenger events have been published')
+            return
+
+        def format_stats(name: str, stats: dict, indent: str) -> str:
+            return (f'{indent}{name}: calls {stats["calls"]} errors {stats["errors"]} '
+                    f'p50 {stats["p50_ms"]:.1f}ms p95 {stats["p95_ms"]:.1f}ms p99 {stats["p99_ms"]:.1f}ms')
+
+        lines = []
+        # show the events that have taken the most total time first
+        for event, stats in sorted(snapshot.items(), key=lambda e: e[1]['avg_ms'] * e[1]['calls'], reverse=True):
+            lines.append(format_stats(event, stats, ''))
+            for listener, listener_stats in stats['listeners'].items():
+                lines.append(format_stats(listener, listener_stats, '  '))
+        await self.send_chunked(ctx, '\n'.join(lines))
+
+    @stats.command()
+    @commands.is_owner()
+    async def stalls(self, ctx, stacks: int = 0):
+        """Shows the event loop lag and the code that blocked the loop, with the stacks of the top offenders"""
+        stats = self.bot.watchdog.stats()
+        lag = stats['lag']
+        lines = [f'loop lag: p50 {lag["p50_ms"]:.1f}ms p95 {lag["p95_ms"]:.1f}ms p99 {lag["p99_ms"]:.1f}ms']
+        if not stats['offenders']:
+            lines.append('No event loop stalls captured')
+        for i, offender in enumerate(stats['offenders']):
+            lines.append(f'{offender["location"]}\n'
+                         f'  stalls: {offender["stalls"]} total: {offender["total_ms"]:.0f}ms '
+                         f'longest: {offender["longest_ms"]:.0f}ms')
+            if i < stacks:
+                lines.append(offender['stack'])
+        await self.send_chunked(ctx, '\n'.join(lines))
+
+    @stats.command()
+    @commands.is_owner()
+    async def queues(self, ctx):
+        """Shows the depth and counters of every queued messenger event"""
+        queue_stats = self.bot.messenger.queue_stats()
+        if not queue_stats:
+            await ctx.send('No messenger events are queued')
+            return
+
+        lines = []
+        for event, stats in queue_stats.items():
+            lines.append(f'{event}\n'
+                         f'  depth: {stats["depth"]}/{stats["maxsize"]} workers: {stats["workers"]} '
+                         f'overflow: {stats["overflow"]}\n'
+                         f'  enqueued: {stats["enqueued"]} processed: {stats["processed"]} '
+                         f'dropped: {stats["dropped"]} coalesced: {stats["coalesced"]}\n'
+                         f'  wait avg: {stats["avg_wait_ms"]:.2f}ms max: {stats["max_wait_ms"]:.2f}ms')
+        await self.send_chunked(ctx, '\n'.join(lines))
+
+    @stats.command()
+    @commands.is_owner()
+    async def requests(self, ctx):
+        """Shows the queue depth and rate limits of the discord request scheduler"""
+        stats = self.bot.requests.stats()
+        await self.send_chunked(ctx, f'request scheduler\n'
+                                     f'  depth: {stats["depth"]} buckets: {stats["buckets"]} '
+                                     f'running: {stats["running"]}/{stats["concurrency"]}\n'
+                                     f'  completed: {stats["completed"]} failed: {stats["failed"]}\n'
+                                     f'  429s: {stats["rate_limited"]} retried: {stats["retried"]}')
+
+    @stats.command()
+    @commands.is_owner()
+    async def reactions(self, ctx):
+        """Shows how many reaction events were filtered out and how long the bot takes to add its reactions"""
+        stats = self.bot.reaction_filter.stats()
+        adder = self.bot.reaction_adder.stats()
+        await self.send_chunked(ctx, f'reaction filter watching {stats["watched"]} messages\n'
+                                     f'  passed: {stats["passed"]} filtered: {stats["filtered"]} '
+                                     f'filter rate: {stats["filter_rate"]:.1%}\n'
+                                     f'reaction adder pending {adder["pending"]} messages\n'
+                                     f'  added: {adder["added"]} cancelled: {adder["cancelled"]} '
+                                     f'messages: {adder["messages"]} failed: {adder["failed"]}\n'
+                                     f'  per message p50 {adder["p50_ms"]:.1f}ms p95 {adder["p95_ms"]:.1f}ms '
+                                     f'p99 {adder["p99_ms"]:.1f}ms')
+
+    @stats.command()
+    @commands.is_owner()
+    async def cache(self, ctx):
+        """Shows the size and hit rate of the class repository cache"""
+        stats = ClassRepository.cache.stats()
+        await self.send_chunked(ctx, f'class cache warm: {stats["warm"]}\n'
+                                     f'  channels: {stats["channels"]} tas: {stats["tas"]} '
+                                     f'semesters: {stats["semesters"]}\n'
+                                     f'  found: {stats["found"]} absent: {stats["absent"]} missed: {stats["missed"]} '
+                                     f'hit rate: {stats["hit_rate"]:.1%}')
+
+    @stats.command()
+    @commands.is_owner()
+    async def messages(self, ctx):
+        """Shows the size and evictions of the interactive message stores of each service"""
+        lines = []
+        for name, service in self.bot.active_services.items():
+            if not isinstance(store := getattr(service, 'messages', None), PersistentMessageStore):
+                continue
+            stats = store.stats()
+            lines.append(f'{name}: {stats["size"]}/{stats["max_entries"]} messages\n'
+                         f'  hits: {stats["hits"]} misses: {stats["misses"]} '
+                         f'evicted lru: {stats["evicted_lru"]} ttl: {stats["evicted_ttl"]}\n'
+                         f'  persisted: {stats["persisted"]} loaded: {stats["loaded"]}')
+        await self.send_chunked(ctx, '\n'.join(lines) or 'No message stores are loaded')
+
     @log.command()
     @commands.is_owner()
     async def get(self, ctx, lines: int):
@@ -91,6 +209,11 @@ class OwnerCog(commands.Cog):
 
         await ctx.send(f'```{json_res}```')
 
+    async def send_chunked(self, ctx, text: str):
+        chunks = [text[i:i + MAX_MESSAGE_SIZE] for i in range(0, len(text), MAX_MESSAGE_SIZE)]
+        for c in chunks:
+            await ctx.send(f'```{c}```')
+
 
 async def setup(bot):
     await bot.add_cog(OwnerCog(bot))
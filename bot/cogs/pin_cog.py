@@ -80,10 +80,11 @@ class PinCog(commands.Cog):
         if len(message.attachments):
             embed.add_field(name='Files Attached', value=len(message.attachments))
         sockbot_message = await message.channel.send(embed=embed)
-        await sockbot_message.add_reaction(PIN_REACTION)
+        self.bot.reaction_adder.add(sockbot_message, PIN_REACTION)
         # create our class pin object and push it to the db
         class_pin = ClassPin(sockbot_message.id, message.id, message.channel.id, message.author.id, ctx.author.id)
         await self.pin_repo.insert_pin(class_pin)
+        await self.bot.messenger.publish(Events.on_pin_request, class_pin)
         # finally, delete the command sent to us
         await ctx.message.delete()
 
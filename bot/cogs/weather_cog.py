@@ -249,11 +249,16 @@ class WeatherCog(commands.Cog):
         elif is_day:
             msg_title += f'{num_day}-Day Forecast'
 
+        # a forecast is out of date by the time the bot restarts, so it is paged with buttons and is not persisted
+        async def render_page(page: int):
+            return weatherPages[page]
+
         await wait_msg.delete()
-        await self.bot.messenger.publish(Events.on_set_pageable_text,
+        await self.bot.messenger.publish(Events.on_set_pageable_source,
+                                         source=render_page,
+                                         page_count=len(weatherPages),
                                          embed_name='OpenWeatherMap Weather',
                                          field_title=msg_title,
-                                         pages=weatherPages,
                                          author=ctx.author,
                                          channel=ctx.channel)
 
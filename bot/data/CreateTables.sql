@@ -91,3 +91,12 @@ CREATE TABLE IF NOT EXISTS GeoguessrLeaderboard (
     user_id     INTEGER,
     score       INTEGER
 );
+
+-- Scheduled jobs that are persisted so they survive a restart
+CREATE TABLE IF NOT EXISTS ScheduledJob
+(
+    job_id      TEXT    PRIMARY KEY,    -- Unique job ID, Ex: semester_archive:sp2024
+    job_name    TEXT    NOT NULL,       -- The name of the callback registered with the scheduler
+    due_time    TEXT    NOT NULL,       -- The time the job is due to run (UTC)
+    job_args    TEXT    NOT NULL        -- JSON object of the keyword arguments the callback is called with
+);
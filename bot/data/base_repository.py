@@ -1,19 +1,68 @@
 import logging
-from typing import Any
+from typing import Any, AsyncContextManager, AsyncIterator, Type, TypeVar
 
 import aiosqlite
 
+from bot.data.connection_pool import DEFAULT_READERS, ConnectionPool
+from bot.data.row_mapper import columns, row_mapper, row_type
+
 log = logging.getLogger(__name__)
 
+DB_PATH = 'database/SockBot.db'
+# the number of rows fetched from sqlite at a time when iterating over a result set
+ITERATE_BATCH_SIZE = 500
+
+T = TypeVar('T')
+
 
 class BaseRepository:
     """
     The base level repository that defines the fully resolved path for
     sqlite connection
+
+    Every repository shares one connection pool, which is opened lazily on the first query
+    if `open_pool` has not already been called
     """
 
+    pool: ConnectionPool | None = None
+
     def __init__(self):
-        self.resolved_db_path = f'database/SockBot.db'
+        self.resolved_db_path = DB_PATH
+
+    @classmethod
+    async def open_pool(cls, path: str = DB_PATH, *, readers: int | None = None) -> ConnectionPool:
+        """
+        Opens the connection pool shared by every repository, this should be called once on startup
+
+        Args:
+            path (str): The path of the sqlite database file
+            readers (int, optional): The maximum number of reader connections
+        """
+        if BaseRepository.pool and BaseRepository.pool.path != path:
+            await cls.close_pool()
+        if not BaseRepository.pool:
+            BaseRepository.pool = ConnectionPool(path, readers=readers or DEFAULT_READERS)
+        await BaseRepository.pool.open()
+        return BaseRepository.pool
+
+    @classmethod
+    async def close_pool(cls) -> None:
+        if BaseRepository.pool:
+            await BaseRepository.pool.close()
+            BaseRepository.pool = None
+
+    def read(self) -> AsyncContextManager[aiosqlite.Connection]:
+        """Borrows a reader connection from the shared pool for one or more select statements"""
+        return self._pool().read()
+
+    def write(self) -> AsyncContextManager[aiosqlite.Connection]:
+        """Holds the shared writer connection for a transaction that is committed when the block exits"""
+        return self._pool().write()
+
+    def _pool(self) -> ConnectionPool:
+        if not BaseRepository.pool:
+            BaseRepository.pool = ConnectionPool(self.resolved_db_path)
+        return BaseRepository.pool
 
     async def fetch_all_as_dict(self, cursor: aiosqlite.Cursor) -> list[dict[Any, Any]]:
         """
@@ -27,8 +76,8 @@ class BaseRepository:
         Returns:
             [list(dict)]: a list of dictionaries with row names as keys
         """
-        return [dict(zip([column[0] for column in cursor.description], row))
-                for row in await cursor.fetchall()]
+        names = columns(cursor.description)
+        return [dict(zip(names, row)) for row in await cursor.fetchall()]
 
     async def fetch_all_as_class(self, cursor: aiosqlite.Cursor):
         """
@@ -42,8 +91,8 @@ class BaseRepository:
         Returns:
             [cls]: a list of classes with row names as attributes
         """
-        return [type('Query', (), dict(zip([column[0] for column in cursor.description], row)))
-                for row in await cursor.fetchall()]
+        query = row_type(columns(cursor.description))
+        return [query._make(row) for row in await cursor.fetchall()]
 
     async def fetch_first_as_dict(self, cursor: aiosqlite.Cursor) -> dict[Any, Any]:
         """
@@ -57,9 +106,12 @@ class BaseRepository:
         Returns:
             [dict]: a dictionary with row names as keys
         """
-        if not (row := await cursor.fetchone()):
+        row = await cursor.fetchone()
+        # close the cursor so the statement does not hold a read snapshot open on the pooled connection
+        await cursor.close()
+        if not row:
             return {}
-        return dict(zip([column[0] for column in cursor.description], row))
+        return dict(zip(columns(cursor.description), row))
 
     async def fetch_first_as_class(self, cursor: aiosqlite.Cursor):
         """
@@ -73,4 +125,86 @@ class BaseRepository:
         Returns:
             [dict]: a class with row names as attributes
         """
-        return type('Query', (), dict(zip([column[0] for column in cursor.description], await cursor.fetchone())))
+        row = await cursor.fetchone()
+        await cursor.close()
+        return row_type(columns(cursor.description))._make(row)
+
+    async def fetch_all_as(self, cursor: aiosqlite.Cursor, model: Type[T]) -> list[T]:
+        """
+        This function maps every row of the sql query directly into the given dataclass model,
+        the column to field mapping is only worked out once per model and query
+
+        Args:
+            cursor (aiosqlite.Cursor): The cursor object that contains the query to be ran
+            model (Type): The dataclass to map each row into
+
+        Returns:
+            [list(model)]: a list of models
+        """
+        mapper = row_mapper(model, columns(cursor.description))
+        return [mapper(row) for row in await cursor.fetchall()]
+
+    async def fetch_first_as(self, cursor: aiosqlite.Cursor, model: Type[T]) -> T | None:
+        """
+        This function maps the first row of the sql query into the given dataclass model
+
+        Args:
+            cursor (aiosqlite.Cursor): The cursor object that contains the query to be ran
+            model (Type): The dataclass to map the row into
+
+        Returns:
+            [model]: the model, or None if the query returned no rows
+        """
+        row = await cursor.fetchone()
+        await cursor.close()
+        if not row:
+            return None
+        return row_mapper(model, columns(cursor.description))(row)
+
+    async def iterate_as(self,
+                         cursor: aiosqlite.Cursor,
+                         model: Type[T],
+                         batch_size: int = ITERATE_BATCH_SIZE) -> AsyncIterator[T]:
+        """
+        This function lazily maps the rows of the sql query into the given dataclass model,
+        fetching them in batches so that large result sets are never held in memory at once.
+        The connection the cursor belongs to must stay borrowed until the iteration is finished
+
+        Args:
+            cursor (aiosqlite.Cursor): The cursor object that contains the query to be ran
+            model (Type): The dataclass to map each row into
+            batch_size (int): The number of rows fetched at a time
+
+        Returns:
+            [AsyncIterator(model)]: an async iterator of models
+        """
+        mapper = row_mapper(model, columns(cursor.description))
+        try:
+            while rows := await cursor.fetchmany(batch_size):
+                for row in rows:
+                    yield mapper(row)
+        finally:
+            await cursor.close()
+
+    async def stream(self,
+                     model: Type[T],
+                     statement: str,
+                     parameters: tuple = (),
+                     batch_size: int = ITERATE_BATCH_SIZE) -> AsyncIterator[T]:
+        """
+        This function runs a select statement on a reader connection and lazily maps its rows
+        into the given dataclass model, the connection is returned to the pool once the iteration ends
+
+        Args:
+            model (Type): The dataclass to map each row into
+            statement (str): The select statement to run
+            parameters (tuple): The parameters of the statement
+            batch_size (int): The number of rows fetched at a time
+
+        Returns:
+            [AsyncIterator(model)]: an async iterator of models
+        """
+        async with self.read() as db:
+            cursor = await db.execute(statement, parameters)
+            async for item in self.iterate_as(cursor, model, batch_size):
+                yield item
@@ -0,0 +1,165 @@
+import bisect
+import copy
+import typing as t
+from datetime import datetime, timedelta
+
+from bot.models.class_models import ClassChannel, ClassSemester, ClassTA
+
+T = t.TypeVar('T')
+
+
+class ClassCache:
+    """
+    An in memory copy of every class channel, class TA and semester, indexed by the keys they are looked up by
+
+    The cache is filled in bulk and then kept up to date by the repository writing through it, so once it is
+    warm a key that is not in it does not exist in the database either. Until it is warm the repository
+    queries the database and counts a miss. Models are copied on the way in and out so a caller mutating
+    a model can never change the cached row without writing it
+    """
+
+    def __init__(self) -> None:
+        self.warm = False
+        self._channels: t.Dict[int, ClassChannel] = {}
+        self._roles: t.Dict[int, ClassChannel] = {}
+        self._tas: t.Dict[t.Tuple[int, int], ClassTA] = {}
+        self._semesters: t.Dict[str, ClassSemester] = {}
+        # the semesters sorted by start date, and their start dates for bisecting
+        self._calendar: t.List[ClassSemester] = []
+        self._starts: t.List[datetime] = []
+        # the resolved current semester and the time range it stays the current semester for
+        self._current: ClassSemester | None = None
+        self._current_range = (datetime.max, datetime.min)
+
+        # found: served a cached row, absent: answered that no row exists without a query,
+        # missed: had to query the database because the cache was not warm yet
+        self.found = 0
+        self.absent = 0
+        self.missed = 0
+
+    def load(self, channels: t.Iterable[ClassChannel], tas: t.Iterable[ClassTA],
+             semesters: t.Iterable[ClassSemester]) -> None:
+        """Replaces the cached rows with every row in the database and marks the cache as warm"""
+        self._channels.clear()
+        self._roles.clear()
+        self._tas.clear()
+        self._semesters = {semester.semester_id: copy.copy(semester) for semester in semesters}
+        self._calendar = sorted(self._semesters.values(), key=lambda semester: semester.start_date)
+        self._starts = [semester.start_date for semester in self._calendar]
+        self._current_range = (datetime.max, datetime.min)
+        for channel in channels:
+            self.put_channel(channel)
+        for ta in tas:
+            self.put_ta(ta)
+        self.warm = True
+
+    def channel(self, channel_id: int) -> ClassChannel | None:
+        return self._get(self._channels, channel_id)
+
+    def channel_by_role(self, role_id: int) -> ClassChannel | None:
+        return self._get(self._roles, role_id)
+
+    def ta(self, user_id: int, channel_id: int) -> ClassTA | None:
+        return self._get(self._tas, (user_id, channel_id))
+
+    def semester(self, semester_id: str) -> ClassSemester | None:
+        return self._get(self._semesters, semester_id)
+
+    def channels(self, predicate: t.Callable[[ClassChannel], bool]) -> t.List[ClassChannel]:
+        return self._filter(self._channels.values(), predicate)
+
+    def tas(self, predicate: t.Callable[[ClassTA], bool]) -> t.List[ClassTA]:
+        return self._filter(self._tas.values(), predicate)
+
+    def semesters(self) -> t.List[ClassSemester]:
+        return self._filter(self._semesters.values(), lambda _: True)
+
+    def current_semester(self, now: datetime) -> ClassSemester | None:
+        """
+        Returns the semester that the given UTC time falls in, the result is kept until the time crosses the
+        next semester boundary so most calls are a range check and the rest are a binary search
+        """
+        self._refresh_current(now)
+        return self._copy(self._current)
+
+    def next_semester(self, now: datetime) -> ClassSemester | None:
+        """Returns the first semester that starts after the given UTC time"""
+        i = bisect.bisect_right(self._starts, now)
+        return self._copy(self._calendar[i] if i < len(self._calendar) else None)
+
+    def next_rollover(self, now: datetime) -> datetime | None:
+        """Returns the first time after the given UTC time that the current semester changes, if it ever does"""
+        self._refresh_current(now)
+        _, end = self._current_range
+        return None if end == datetime.max else end
+
+    def _refresh_current(self, now: datetime) -> None:
+        start, end = self._current_range
+        if not start <= now < end:
+            self._current, self._current_range = self._resolve_current(now)
+
+    def _resolve_current(self, now: datetime) -> t.Tuple[ClassSemester | None, t.Tuple[datetime, datetime]]:
+        i = bisect.bisect_right(self._starts, now) - 1
+        next_start = self._starts[i + 1] if i + 1 < len(self._starts) else datetime.max
+        if i < 0:
+            return None, (datetime.min, next_start)
+
+        semester = self._calendar[i]
+        # the end date is inclusive, so the semester stops being current just after it
+        end = semester.end_date + timedelta(microseconds=1)
+        if now < end:
+            return semester, (semester.start_date, min(end, next_start))
+        return None, (end, next_start)
+
+    def put_channel(self, channel: ClassChannel) -> None:
+        self.remove_channel(channel.channel_id)
+        channel = copy.copy(channel)
+        self._channels[channel.channel_id] = channel
+        for role_id in (channel.class_role_id, channel.class_ta_role_id):
+            if role_id:
+                self._roles[role_id] = channel
+
+    def remove_channel(self, channel_id: int) -> None:
+        if not (channel := self._channels.pop(channel_id, None)):
+            return
+        for role_id in (channel.class_role_id, channel.class_ta_role_id):
+            if self._roles.get(role_id) is channel:
+                del self._roles[role_id]
+
+    def put_ta(self, ta: ClassTA) -> None:
+        self._tas[(ta.ta_user_id, ta.channel_id)] = copy.copy(ta)
+
+    def remove_ta(self, user_id: int, channel_id: int) -> None:
+        self._tas.pop((user_id, channel_id), None)
+
+    def remove_channel_tas(self, channel_ids: t.Collection[int]) -> None:
+        for key in [key for key in self._tas if key[1] in channel_ids]:
+            del self._tas[key]
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        hits = self.found + self.absent
+        lookups = hits + self.missed
+        return {
+            'warm': self.warm,
+            'channels': len(self._channels),
+            'tas': len(self._tas),
+            'semesters': len(self._semesters),
+            'found': self.found,
+            'absent': self.absent,
+            'missed': self.missed,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+
+    def _get(self, index: t.Dict[t.Any, T], key: t.Any) -> T | None:
+        return self._copy(index.get(key))
+
+    def _copy(self, value: T | None) -> T | None:
+        if value is None:
+            self.absent += 1
+            return None
+        self.found += 1
+        return copy.copy(value)
+
+    def _filter(self, values: t.Iterable[T], predicate: t.Callable[[T], bool]) -> t.List[T]:
+        self.found += 1
+        return [copy.copy(value) for value in values if predicate(value)]
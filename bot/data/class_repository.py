@@ -1,54 +1,93 @@
+import dataclasses
+from datetime import datetime
 from typing import Union
 
-import aiosqlite
 import discord
 
 from bot.data.base_repository import BaseRepository
+from bot.data.class_cache import ClassCache
 from bot.models.class_models import ClassSemester, ClassChannel, ClassTA
 
 
 class ClassRepository(BaseRepository):
+    """
+    Lookups are answered from a ClassCache shared by every instance once it has been warmed with `warm_cache`,
+    and every write to the class tables goes through the cache so it never has to be invalidated
+    """
+
+    cache = ClassCache()
+    # bumped by every write so a warm up that raced a write knows to read again
+    _writes = 0
+
+    async def warm_cache(self) -> None:
+        """
+        Loads every class channel, class TA and semester into the cache in bulk.
+        """
+        while True:
+            writes = ClassRepository._writes
+            async with self.read() as db:
+                channels = await self.fetch_all_as(await db.execute('SELECT * FROM ClassChannel'), ClassChannel)
+                tas = await self.fetch_all_as(await db.execute('SELECT * FROM ClassTA'), ClassTA)
+                semesters = await self.fetch_all_as(await db.execute('SELECT * FROM ClassSemester'), ClassSemester)
+            if writes == ClassRepository._writes:
+                break
+        ClassRepository.cache.load(channels, tas, semesters)
 
     async def get_all_semesters(self) -> list[ClassSemester]:
         """
         Fetches all semesters from the database.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.semesters()
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute("SELECT * FROM ClassSemester")
-            return [ClassSemester(**d) for d in await self.fetch_all_as_dict(cursor)]
+            return await self.fetch_all_as(cursor, ClassSemester)
 
     async def get_current_semester(self) -> ClassSemester | None:
         """
         Gets the current semester, if one exists.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.current_semester(datetime.utcnow())
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute("""SELECT * FROM ClassSemester 
                                          WHERE semester_start <= strftime('%Y-%m-%d %H:%M:%S', datetime('now')) 
                                          AND strftime('%Y-%m-%d %H:%M:%S', datetime('now')) <= semester_end""")
-            dictionary = await self.fetch_first_as_dict(cursor)
-            if not dictionary:
-                return None
-            return ClassSemester(**dictionary)
+            return await self.fetch_first_as(cursor, ClassSemester)
 
     async def get_next_semester(self) -> ClassSemester | None:
         """
         Gets the next semester, if one exists.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.next_semester(datetime.utcnow())
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute("""SELECT * FROM ClassSemester
                                          WHERE semester_start > strftime('%Y-%m-%d %H:%M:%S', datetime('now'))""")
-            dictionary = await self.fetch_first_as_dict(cursor)
-            if not dictionary:
-                return None
-            return ClassSemester(**dictionary)
+            return await self.fetch_first_as(cursor, ClassSemester)
+
+    async def get_semester_rollover(self) -> datetime | None:
+        """
+        Gets the next time a semester starts or ends, after which the current semester is different.
+        Returns None if no semester starts or ends in the future.
+        """
+        if not ClassRepository.cache.warm:
+            await self.warm_cache()
+        return ClassRepository.cache.next_rollover(datetime.utcnow())
 
     async def get_unarchived_classes(self) -> list[ClassChannel]:
         """
         Gets a list of class channels that are currently marked as unarchived.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.channels(lambda c: not c.class_archived)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute("SELECT * FROM ClassChannel WHERE class_archived IS FALSE")
-            return [ClassChannel(**d) for d in await self.fetch_all_as_dict(cursor)]
+            return await self.fetch_all_as(cursor, ClassChannel)
 
     async def get_semester_classes(self, semester: ClassSemester) -> list[ClassChannel]:
         """
@@ -56,9 +95,12 @@ class ClassRepository(BaseRepository):
         only fetch the ones that are currently marked as unarchived.
         """
         statement = 'SELECT * FROM ClassChannel WHERE semester_id = ?'
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.channels(lambda c: c.semester_id == semester.semester_id)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute(statement, (semester.semester_id,))
-            return [ClassChannel(**d) for d in await self.fetch_all_as_dict(cursor)]
+            return await self.fetch_all_as(cursor, ClassChannel)
 
     async def search_semester(self, semester_id: str) -> ClassSemester | None:
         """
@@ -66,40 +108,41 @@ class ClassRepository(BaseRepository):
         Note that this does not search for the semester name, which is different.
         ex: Semester Name: Spring 2023, Semester ID: sp2023
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.semester(semester_id)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute("SELECT * FROM ClassSemester WHERE semester_id = ?", (semester_id,))
-            dictionary = await self.fetch_first_as_dict(cursor)
-            if not dictionary:
-                return None
-            return ClassSemester(**dictionary)
+            return await self.fetch_first_as(cursor, ClassSemester)
 
     async def search_class(self, prefix: str, num: int, prof: str) -> ClassChannel | None:
         """
         Searches for a registered class given the class abbreviation, class number, and class instructor.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return next(iter(ClassRepository.cache.channels(
+                lambda c: c.class_prefix == prefix and c.class_number == num and c.class_professor == prof)), None)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute(
                 """ SELECT * FROM ClassChannel 
                     WHERE class_prefix = ? 
                     AND class_number = ? 
                     AND class_professor = ?""", (prefix, num, prof)
             )
-            dictionary = await self.fetch_first_as_dict(cursor)
-            if not dictionary:
-                return None
-            return ClassChannel(**dictionary)
+            return await self.fetch_first_as(cursor, ClassChannel)
 
     async def search_class_by_channel(self, channel: Union[discord.TextChannel, int]) -> ClassChannel | None:
         """
         Searches for a registered class with the given channel ID or channel itself.
         """
         channel_id = channel if isinstance(channel, int) else channel.id
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.channel(channel_id)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute('SELECT * FROM ClassChannel WHERE channel_id = ?', (channel_id,))
-            dictionary = await self.fetch_first_as_dict(cursor)
-            if not dictionary:
-                return None
-            return ClassChannel(**dictionary)
+            return await self.fetch_first_as(cursor, ClassChannel)
 
     async def search_class_by_role(self, role: Union[discord.Role, int]) -> ClassChannel | None:
         """
@@ -107,66 +150,92 @@ class ClassRepository(BaseRepository):
         Checks against both the class_role_id and the class_ta_role_id.
         """
         role_id = role if isinstance(role, int) else role.id
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.channel_by_role(role_id)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute('SELECT * FROM ClassChannel WHERE class_role_id = ? OR class_ta_role_id = ?',
                                       (role_id, role_id))
-            dictionary = await self.fetch_first_as_dict(cursor)
-            if not dictionary:
-                return None
-            return ClassChannel(**dictionary)
+            return await self.fetch_first_as(cursor, ClassChannel)
 
     async def insert_class(self, cls: ClassChannel) -> None:
         """
         Inserts the given ClassChannel model into the database.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        async with self.write() as db:
             await db.execute("INSERT INTO ClassChannel VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
                              (cls.channel_id, cls.semester_id, cls.category_id, cls.class_role_id, cls.class_prefix,
                               cls.class_number, cls.post_message_id, cls.class_professor, cls.class_name,
                               cls.class_archived, None))
-            await db.commit()
+        ClassRepository._writes += 1
+        if ClassRepository.cache.warm:
+            # the ta role is always inserted as NULL, so the cached copy has to match
+            ClassRepository.cache.put_channel(dataclasses.replace(cls, class_ta_role_id=None))
 
     async def delete_class(self, channel: Union[int, ClassChannel]) -> None:
         """
         Deletes the ClassChannel with the given channel or channel id.
         """
         channel_id = channel if isinstance(channel, int) else channel.channel_id
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        async with self.write() as db:
             await db.execute('DELETE FROM ClassChannel WHERE channel_id = ?', (channel_id,))
-            await db.commit()
+        ClassRepository._writes += 1
+        ClassRepository.cache.remove_channel(channel_id)
 
     async def update_class(self, cls: ClassChannel) -> None:
         """
         Updates the ClassChannel object in the database.
         All members of the ClassChannel model are updated except the channel_id.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
-            await db.execute('UPDATE ClassChannel SET semester_id = ?, category_id = ?, class_role_id = ?, '
-                             'class_prefix = ?, class_number = ?, post_message_id = ?, class_professor = ?, '
-                             'class_name = ?, class_archived = ?, class_ta_role_id = ? '
-                             'WHERE channel_id = ?',
-                             (cls.semester_id, cls.category_id, cls.class_role_id,
-                              cls.class_prefix, cls.class_number, cls.post_message_id, cls.class_professor,
-                              cls.class_name, cls.class_archived, cls.class_ta_role_id, cls.channel_id))
-            await db.commit()
+        async with self.write() as db:
+            cursor = await db.execute('UPDATE ClassChannel SET semester_id = ?, category_id = ?, class_role_id = ?, '
+                                      'class_prefix = ?, class_number = ?, post_message_id = ?, class_professor = ?, '
+                                      'class_name = ?, class_archived = ?, class_ta_role_id = ? '
+                                      'WHERE channel_id = ?',
+                                      (cls.semester_id, cls.category_id, cls.class_role_id,
+                                       cls.class_prefix, cls.class_number, cls.post_message_id, cls.class_professor,
+                                       cls.class_name, cls.class_archived, cls.class_ta_role_id, cls.channel_id))
+        ClassRepository._writes += 1
+        if ClassRepository.cache.warm and cursor.rowcount:
+            ClassRepository.cache.put_channel(cls)
+
+    async def archive_classes(self, classes: list[ClassChannel]) -> None:
+        """
+        Marks every given ClassChannel as archived in the category it was moved to and deletes all of their TAs,
+        in a single transaction.
+        """
+        channel_ids = [(cls.channel_id,) for cls in classes]
+        async with self.write() as db:
+            await db.executemany('UPDATE ClassChannel SET class_archived = TRUE, category_id = ? WHERE channel_id = ?',
+                                 [(cls.category_id, cls.channel_id) for cls in classes])
+            await db.executemany('DELETE FROM ClassTA WHERE channel_id = ?', channel_ids)
+        ClassRepository._writes += 1
+
+        if ClassRepository.cache.warm:
+            for cls in classes:
+                ClassRepository.cache.put_channel(dataclasses.replace(cls, class_archived=True))
+        ClassRepository.cache.remove_channel_tas({cls.channel_id for cls in classes})
 
     async def insert_ta(self, ta_model: ClassTA) -> None:
         """
         Inserts the given ClassTA model into the database.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        async with self.write() as db:
             await db.execute('INSERT INTO ClassTA VALUES (?, ?, ?, ?)',
                              (ta_model.channel_id, ta_model.ta_user_id, ta_model.ta_display_tag, ta_model.ta_details))
-            await db.commit()
+        ClassRepository._writes += 1
+        if ClassRepository.cache.warm:
+            ClassRepository.cache.put_ta(ta_model)
 
     async def delete_ta(self, ta_model: ClassTA) -> None:
         """
         Deletes the ClassTA where the channel_id and ta_user_id are present.
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        async with self.write() as db:
             await db.execute('DELETE FROM ClassTA WHERE channel_id = ? AND ta_user_id = ?',
                              (ta_model.channel_id, ta_model.ta_user_id))
-            await db.commit()
+        ClassRepository._writes += 1
+        ClassRepository.cache.remove_ta(ta_model.ta_user_id, ta_model.channel_id)
 
     async def update_ta(self, ta_model: ClassTA) -> None:
         """
@@ -175,11 +244,14 @@ class ClassRepository(BaseRepository):
         - ta_display_tag
         - ta_details
         """
-        async with aiosqlite.connect(self.resolved_db_path) as db:
-            await db.execute('UPDATE ClassTA SET ta_display_tag = ?, ta_details = ? '
-                             'WHERE channel_id = ? AND ta_user_id = ?',
-                             (ta_model.ta_display_tag, ta_model.ta_details, ta_model.channel_id, ta_model.ta_user_id))
-            await db.commit()
+        async with self.write() as db:
+            cursor = await db.execute('UPDATE ClassTA SET ta_display_tag = ?, ta_details = ? '
+                                      'WHERE channel_id = ? AND ta_user_id = ?',
+                                      (ta_model.ta_display_tag, ta_model.ta_details,
+                                       ta_model.channel_id, ta_model.ta_user_id))
+        ClassRepository._writes += 1
+        if ClassRepository.cache.warm and cursor.rowcount:
+            ClassRepository.cache.put_ta(ta_model)
 
     async def get_ta(self,
                      user: Union[int, discord.User, discord.Member],
@@ -189,37 +261,47 @@ class ClassRepository(BaseRepository):
         """
         user_id = user if isinstance(user, int) else user.id
         channel_id = channel if isinstance(channel, int) else channel.id
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.ta(user_id, channel_id)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute('SELECT * FROM ClassTA WHERE ta_user_id = ? AND channel_id = ?',
                                       (user_id, channel_id))
-            dictionary = await self.fetch_first_as_dict(cursor)
-            if not dictionary:
-                return None
-            return ClassTA(**dictionary)
+            return await self.fetch_first_as(cursor, ClassTA)
 
     async def get_tas_by_channel(self, channel: Union[int, discord.TextChannel]) -> list[ClassTA]:
         """
         Searches for all ClassTA's for the given channel.
         """
         channel_id = channel if isinstance(channel, int) else channel.id
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.tas(lambda ta: ta.channel_id == channel_id)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute('SELECT * FROM ClassTA WHERE channel_id = ?', (channel_id,))
-            return [ClassTA(**d) for d in await self.fetch_all_as_dict(cursor)]
+            return await self.fetch_all_as(cursor, ClassTA)
 
     async def get_tas_by_user(self, user: Union[int, discord.User, discord.Member]) -> list[ClassTA]:
         """
         Searches for all ClassTA's for the given user.
         """
         user_id = user if isinstance(user, int) else user.id
-        async with aiosqlite.connect(self.resolved_db_path) as db:
+        if ClassRepository.cache.warm:
+            return ClassRepository.cache.tas(lambda ta: ta.ta_user_id == user_id)
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
             cursor = await db.execute('SELECT * FROM ClassTA WHERE ta_user_id = ?', (user_id,))
-            return [ClassTA(**d) for d in await self.fetch_all_as_dict(cursor)]
+            return await self.fetch_all_as(cursor, ClassTA)
 
     async def is_ta_role(self, role: Union[int, discord.Role]) -> bool:
         """
         Checks if the given role is registered as a TA role for a class channel.
         """
         role_id = role if isinstance(role, int) else role.id
-        async with aiosqlite.connect(self.resolved_db_path) as db:
-            cursor = await db.execute('SELECT * FROM ClassChannel WHERE class_ta_role_id = ?', (role_id,))
-            return len(await self.fetch_all_as_dict(cursor)) > 0
+        if ClassRepository.cache.warm:
+            return (class_channel := ClassRepository.cache.channel_by_role(role_id)) is not None \
+                and class_channel.class_ta_role_id == role_id
+        ClassRepository.cache.missed += 1
+        async with self.read() as db:
+            cursor = await db.execute('SELECT 1 FROM ClassChannel WHERE class_ta_role_id = ? LIMIT 1', (role_id,))
+            return bool(await self.fetch_first_as_dict(cursor))
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import typing as t
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+log = logging.getLogger(__name__)
+
+DEFAULT_READERS = 4
+# how long a connection waits on a database lock held by another process before raising, in milliseconds
+BUSY_TIMEOUT = 5000
+
+
+class ConnectionPool:
+    """
+    A pool of long lived sqlite connections to a single database file
+
+    Writes are serialized through one writer connection, while reads are spread over a fixed number of
+    reader connections that are opened lazily as concurrent reads need them. The database is put in WAL
+    mode so that the readers never block the writer and the writer never blocks the readers
+    """
+
+    def __init__(self, path: str, *, readers: int = DEFAULT_READERS) -> None:
+        if readers < 1:
+            raise ValueError('A connection pool must have at least one reader')
+
+        self.path = path
+        self.max_readers = readers
+
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+        self._readers: t.List[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        # held while a connection is being opened so concurrent callers do not open more than the maximum
+        self._open_lock = asyncio.Lock()
+        self.closed = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def open(self) -> None:
+        """Opens the writer connection and switches the database to WAL mode, this is a no op if it is already open"""
+        async with self._open_lock:
+            if self._writer:
+                return
+            self.closed = False
+            self._writer = await self._connect()
+            # WAL is persistent in the database file, so only the writer has to set it
+            await self._writer.execute('PRAGMA journal_mode = WAL')
+            await self._writer.execute('PRAGMA synchronous = NORMAL')
+            log.info(f'Opened connection pool for {self.path} with up to {self.max_readers} readers')
+
+    async def close(self) -> None:
+        """Waits for the current write to finish and closes every connection"""
+        async with self._write_lock:
+            self.closed = True
+            connections = [*self._readers, *([self._writer] if self._writer else [])]
+            self._readers.clear()
+            self._idle = asyncio.Queue()
+            self._writer = None
+
+        for connection in connections:
+            try:
+                await connection.close()
+            except Exception:
+                log.exception(f'Failed to close connection to {self.path}')
+        log.info(f'Closed connection pool for {self.path}')
+
+    @asynccontextmanager
+    async def read(self) -> t.AsyncIterator[aiosqlite.Connection]:
+        """Borrows a reader connection, waiting for one to be returned if every reader is busy"""
+        connection = await self._acquire_reader()
+        try:
+            yield connection
+        finally:
+            if connection in self._readers:
+                self._idle.put_nowait(connection)
+
+    @asynccontextmanager
+    async def write(self) -> t.AsyncIterator[aiosqlite.Connection]:
+        """
+        Holds the writer connection for a transaction, which is committed when the block exits
+        or rolled back if it raises
+        """
+        await self._ensure_open()
+        async with self._write_lock:
+            if self.closed:
+                raise RuntimeError(f'Connection pool for {self.path} is closed')
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            await self._writer.commit()
+
+    async def _ensure_open(self) -> None:
+        # a pool that was closed is only opened again explicitly, so queries made during shutdown fail loudly
+        if self.closed:
+            raise RuntimeError(f'Connection pool for {self.path} is closed')
+        if not self._writer:
+            await self.open()
+
+    async def _acquire_reader(self) -> aiosqlite.Connection:
+        await self._ensure_open()
+
+        if self._idle.empty() and len(self._readers) < self.max_readers:
+            async with self._open_lock:
+                if self._idle.empty() and len(self._readers) < self.max_readers:
+                    connection = await self._connect()
+                    self._readers.append(connection)
+                    return connection
+        return await self._idle.get()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(self.path)
+        await connection.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT}')
+        return connection
@@ -1,11 +1,24 @@
+import importlib
 import logging
 import os
+import re
+import typing as t
 from pathlib import Path
 
 import aiosqlite
 
 log = logging.getLogger(__name__)
 
+MIGRATIONS_PATH = Path('bot/data/migrations')
+MIGRATIONS_PACKAGE = 'bot.data.migrations'
+# migrations are named <version>_<description>.sql or .py, Ex: 0002_lookup_indexes.sql
+MIGRATION_NAME = re.compile(r'^(\d+)_\w+\.(sql|py)$')
+
+
+class Migration(t.NamedTuple):
+    version: int
+    path: Path
+
 
 class Database:
     async def create_database(self):
@@ -13,6 +26,65 @@ class Database:
             log.info('Database Folder not found: Creating one')
             os.makedirs('database')
         async with aiosqlite.connect(Path(f'database/SockBot.db')) as db:
+            # the base tables and semester data are idempotent, so they are applied on every start
             with open('bot/data/CreateTables.sql') as f:
                 await db.executescript(f.read())
                 await db.commit()
+            await self.migrate(db)
+
+    async def migrate(self, db: aiosqlite.Connection) -> int:
+        """
+        Applies every migration newer than the version stored in `PRAGMA user_version`, in order.
+        Each migration and the version bump that records it are committed in a single transaction
+
+        Args:
+            db (aiosqlite.Connection): The connection to migrate
+
+        Returns:
+            int: the version of the database after migrating
+        """
+        cursor = await db.execute('PRAGMA user_version')
+        version = (await cursor.fetchone())[0]
+
+        for migration in self.get_migrations():
+            if migration.version <= version:
+                continue
+            log.info(f'Applying database migration {migration.path.name}')
+            await self._apply(db, migration)
+            version = migration.version
+        return version
+
+    @staticmethod
+    def get_migrations() -> list[Migration]:
+        """Finds the migrations in the migrations folder, sorted by version"""
+        migrations = {}
+        for path in MIGRATIONS_PATH.iterdir():
+            if not (match := MIGRATION_NAME.match(path.name)):
+                continue
+            version = int(match.group(1))
+            if version in migrations:
+                raise ValueError(f'Migrations {migrations[version].name} and {path.name} have the same version')
+            migrations[version] = path
+        return [Migration(version, path) for version, path in sorted(migrations.items())]
+
+    @staticmethod
+    async def _apply(db: aiosqlite.Connection, migration: Migration) -> None:
+        if migration.path.suffix == '.sql':
+            # executescript commits any open transaction first, so the script is wrapped in its own
+            try:
+                await db.executescript(f'BEGIN;\n{migration.path.read_text()}\n'
+                                       f'PRAGMA user_version = {migration.version};\nCOMMIT;')
+            except BaseException:
+                await db.rollback()
+                raise
+            return
+
+        module = importlib.import_module(f'{MIGRATIONS_PACKAGE}.{migration.path.stem}')
+        await db.execute('BEGIN')
+        try:
+            await module.migrate(db)
+            await db.execute(f'PRAGMA user_version = {migration.version}')
+        except BaseException:
+            await db.rollback()
+            raise
+        await db.commit()
@@ -1,33 +1,114 @@
-import aiosqlite
+import asyncio
+import logging
+
 from bot.data.base_repository import BaseRepository
 from bot.models.geo_models import GeoguessrLeaderboard
+from bot.utils.leaderboard import Leaderboard
+
+log = logging.getLogger(__name__)
+
+ADD_SCORE = ('INSERT INTO GeoguessrLeaderboard (user_id, score) VALUES (?, ?) '
+             'ON CONFLICT (user_id) DO UPDATE SET score = score + excluded.score;')
 
 
 class GeoRepository(BaseRepository):
+    """
+    Score increments can be buffered and written behind in a single transaction, the buffer is shared
+    by every instance of the repository and is flushed before any query that reads the scores
 
-    async def get_rank(self) -> list[dict]:
-        async with aiosqlite.connect(self.resolved_db_path) as connection:
-            cursor = await connection.execute('SELECT *, ROW_NUMBER() OVER(ORDER BY score DESC) AS RANK from '
-                                              'GeoguessrLeaderboard')
-            return await self.fetch_all_as_dict(cursor)
+    Ranks and the top scores are answered from an in memory Leaderboard, which is loaded from the
+    database on first use and kept in sync by add_score
+    """
+
+    # when enabled add_score only adds the increment to the buffer, see GeoScoreService
+    buffer_scores: bool = False
+    # pending score increments by user id
+    _pending: dict[int, int] = {}
+
+    _leaderboard: Leaderboard | None = None
+    _leaderboard_lock: asyncio.Lock | None = None
+
+    async def add_score(self, user_id: int, score: int) -> None:
+        """
+        Adds the given score to the user's total, creating their leaderboard row if they don't have one
+        """
+        # the leaderboard is loaded before writing so the new score can't be missed by a load in progress
+        leaderboard = await self.get_leaderboard()
+        if GeoRepository.buffer_scores:
+            GeoRepository._pending[user_id] = GeoRepository._pending.get(user_id, 0) + score
+        else:
+            async with self.write() as connection:
+                await connection.execute(ADD_SCORE, (user_id, score))
+        leaderboard.add(user_id, score)
+
+    async def get_leaderboard(self) -> Leaderboard:
+        """
+        Gets the in memory leaderboard, loading every score and any buffered increments the first time it is used
+        """
+        if GeoRepository._leaderboard:
+            return GeoRepository._leaderboard
+        if (lock := GeoRepository._leaderboard_lock) is None:
+            lock = GeoRepository._leaderboard_lock = asyncio.Lock()
+
+        async with lock:
+            if GeoRepository._leaderboard:
+                return GeoRepository._leaderboard
+            async with self.read() as connection:
+                cursor = await connection.execute('SELECT user_id, score FROM GeoguessrLeaderboard;')
+                leaderboard = Leaderboard(await cursor.fetchall())
+            for user_id, score in GeoRepository._pending.items():
+                leaderboard.add(user_id, score)
+            log.info(f'Loaded geoguessr leaderboard with {len(leaderboard)} users')
+            GeoRepository._leaderboard = leaderboard
+        return leaderboard
+
+    async def get_top(self, n: int = 10) -> list[tuple[int, int]]:
+        """
+        Gets the (user_id, score) of the n highest scoring users, highest first
+        """
+        return (await self.get_leaderboard()).top(n)
+
+    async def get_user_rank(self, user_id: int) -> tuple[int, int] | None:
+        """
+        Gets the 1 based rank and the score of the given user, or None if they have no score
+        """
+        leaderboard = await self.get_leaderboard()
+        if (rank := leaderboard.rank(user_id)) is None:
+            return None
+        return rank, leaderboard.score(user_id)
+
+    async def flush_scores(self) -> None:
+        """
+        Writes every buffered score increment in a single transaction
+        """
+        if not GeoRepository._pending:
+            return
+        pending, GeoRepository._pending = GeoRepository._pending, {}
+        try:
+            async with self.write() as connection:
+                await connection.executemany(ADD_SCORE, pending.items())
+        except Exception:
+            # put the increments back so they are written by the next flush instead of being lost
+            for user_id, score in pending.items():
+                GeoRepository._pending[user_id] = GeoRepository._pending.get(user_id, 0) + score
+            raise
+        log.debug(f'Flushed buffered geoguessr scores for {len(pending)} users')
 
     async def return_size(self) -> int:
-        async with aiosqlite.connect(self.resolved_db_path) as connection:
+        await self.flush_scores()
+        async with self.read() as connection:
             cursor = await connection.execute('SELECT COUNT(*) FROM GeoguessrLeaderboard;')
             return int((await self.fetch_first_as_dict(cursor))['COUNT(*)'])
 
-    async def update_score(self, score, user_id):
-        async with aiosqlite.connect(self.resolved_db_path) as connection:
-            await connection.execute('UPDATE GeoguessrLeaderboard SET score = ? WHERE user_id = ?;', (score, user_id,))
-            await connection.commit()
-
     async def sort_and_return(self) -> list[dict]:
-        async with aiosqlite.connect(self.resolved_db_path) as connection:
+        await self.flush_scores()
+        async with self.read() as connection:
             cursor = await connection.execute('SELECT * FROM GeoguessrLeaderboard ORDER BY score DESC LIMIT 10;')
             return await self.fetch_all_as_dict(cursor)
 
     async def get_existing_score(self, user_id) -> int | None:
-        async with aiosqlite.connect(self.resolved_db_path) as connection:
+        await self.flush_scores()
+        async with self.read() as connection:
             cursor = await connection.execute('SELECT score FROM GeoguessrLeaderboard WHERE user_id = ? LIMIT 1;',
                                               (user_id,))
             dictionary = await self.fetch_first_as_dict(cursor)
@@ -35,17 +116,9 @@ class GeoRepository(BaseRepository):
                 return None
             return int(dictionary['score'])
 
-    async def add_into(self, user_id, score):
-        async with aiosqlite.connect(self.resolved_db_path) as connection:
-            await connection.execute('INSERT INTO GeoguessrLeaderboard (user_id, score) values (?, ?);',
-                                     (user_id, score))
-            await connection.commit()
-
     async def get_by_userid_scores_descending(self, user_id: int):
-        async with aiosqlite.connect(self.resolved_db_path) as connection:
+        await self.flush_scores()
+        async with self.read() as connection:
             cursor = await connection.execute('SELECT * FROM GeoguessrLeaderboard WHERE user_id = ? '
                                               'ORDER BY score DESC LIMIT 1;', (user_id,))
-            dictionary = await self.fetch_first_as_dict(cursor)
-            if not dictionary:
-                return None
-            return GeoguessrLeaderboard(**dictionary)
+            return await self.fetch_first_as(cursor, GeoguessrLeaderboard)
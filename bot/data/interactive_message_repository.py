@@ -0,0 +1,59 @@
+from bot.data.base_repository import BaseRepository
+from bot.models.interactive_message_models import InteractiveMessage
+
+
+class InteractiveMessageRepository(BaseRepository):
+
+    async def get_message(self, message_id: int, kind: str) -> InteractiveMessage | None:
+        """
+        Fetches the state of a message handled by the given kind of service.
+        """
+        async with self.read() as db:
+            cursor = await db.execute('SELECT * FROM InteractiveMessage WHERE message_id = ? AND message_kind = ?',
+                                      (message_id, kind))
+            return await self.fetch_first_as(cursor, InteractiveMessage)
+
+    async def get_messages(self, kind: str) -> list[InteractiveMessage]:
+        """
+        Fetches every message handled by the given kind of service, without its state so that it is only
+        read for the messages that are used.
+        """
+        async with self.read() as db:
+            cursor = await db.execute("""SELECT message_id, channel_id, message_kind, '' AS message_state,
+                                         expires_at, used_at FROM InteractiveMessage
+                                         WHERE message_kind = ?""", (kind,))
+            return await self.fetch_all_as(cursor, InteractiveMessage)
+
+    async def upsert_message(self, message: InteractiveMessage) -> None:
+        """
+        Inserts the given message, replacing the message with the same message_id if one exists.
+        """
+        async with self.write() as db:
+            await db.execute('INSERT OR REPLACE INTO InteractiveMessage VALUES (?, ?, ?, ?, ?, ?)',
+                             (message.message_id, message.channel_id, message.message_kind, message.message_state,
+                              message.expires_at, message.used_at))
+
+    async def update_state(self, message_id: int, kind: str, state: str, used_at: str) -> None:
+        async with self.write() as db:
+            await db.execute('UPDATE InteractiveMessage SET message_state = ?, used_at = ? '
+                             'WHERE message_id = ? AND message_kind = ?',
+                             (state, used_at, message_id, kind))
+
+    async def delete_messages(self, message_ids: list[int], kind: str) -> None:
+        """
+        Deletes the messages of the given kind with the given message ids in a single transaction.
+        """
+        async with self.write() as db:
+            await db.executemany('DELETE FROM InteractiveMessage WHERE message_id = ? AND message_kind = ?',
+                                 [(message_id, kind) for message_id in message_ids])
+
+    async def delete_unused_messages(self, kind: str, used_before: str) -> list[int]:
+        """
+        Deletes the messages without a timeout that have not been used since the given time,
+        and returns their message ids.
+        """
+        async with self.write() as db:
+            cursor = await db.execute("""DELETE FROM InteractiveMessage
+                                         WHERE message_kind = ? AND expires_at IS NULL AND used_at < ?
+                                         RETURNING message_id""", (kind, used_before))
+            return [row[0] for row in await cursor.fetchall()]
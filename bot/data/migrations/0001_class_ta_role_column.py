@@ -0,0 +1,12 @@
+"""
+Adds the ClassChannel.class_ta_role_id column, which the class repository reads and writes but
+CreateTables.sql never declared. Databases that already had the column added by hand are left alone
+"""
+import aiosqlite
+
+
+async def migrate(db: aiosqlite.Connection) -> None:
+    cursor = await db.execute('PRAGMA table_info(ClassChannel)')
+    if 'class_ta_role_id' in [row[1] for row in await cursor.fetchall()]:
+        return
+    await db.execute('ALTER TABLE ClassChannel ADD COLUMN class_ta_role_id INTEGER')
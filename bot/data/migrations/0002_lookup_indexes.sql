@@ -0,0 +1,30 @@
+-- Secondary indexes for the columns the repositories filter and sort on.
+
+
+-- PinRepository.get_open_pin_from_message and get_pin_from_user
+CREATE INDEX IF NOT EXISTS ix_ClassPin_user_message_id ON ClassPin (user_message_id);
+
+-- PinRepository.get_pins_from_channel, the primary key leads with sockbot_message_id so it can not be used
+CREATE INDEX IF NOT EXISTS ix_ClassPin_channel_id ON ClassPin (channel_id);
+
+-- PinRepository.get_open_pin_requests, only the open pins are indexed
+CREATE INDEX IF NOT EXISTS ix_ClassPin_open ON ClassPin (sockbot_message_id) WHERE pin_pinned = FALSE;
+
+-- ClassRepository.search_class_by_role and is_ta_role
+CREATE INDEX IF NOT EXISTS ix_ClassChannel_class_role_id ON ClassChannel (class_role_id);
+CREATE INDEX IF NOT EXISTS ix_ClassChannel_class_ta_role_id ON ClassChannel (class_ta_role_id);
+
+-- ClassRepository.get_semester_classes
+CREATE INDEX IF NOT EXISTS ix_ClassChannel_semester_id ON ClassChannel (semester_id);
+
+-- ClassRepository.search_class
+CREATE INDEX IF NOT EXISTS ix_ClassChannel_class ON ClassChannel (class_prefix, class_number, class_professor);
+
+-- ClassRepository.get_tas_by_user, the primary key leads with channel_id so it can not be used
+CREATE INDEX IF NOT EXISTS ix_ClassTA_ta_user_id ON ClassTA (ta_user_id);
+
+-- GeoRepository.get_existing_score and get_by_userid_scores_descending
+CREATE INDEX IF NOT EXISTS ix_GeoguessrLeaderboard_user_id ON GeoguessrLeaderboard (user_id, score);
+
+-- GeoRepository.sort_and_return and get_rank
+CREATE INDEX IF NOT EXISTS ix_GeoguessrLeaderboard_score ON GeoguessrLeaderboard (score);
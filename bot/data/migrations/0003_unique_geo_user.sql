@@ -0,0 +1,12 @@
+-- One GeoguessrLeaderboard row per user, so scores can be added with an atomic upsert.
+
+
+-- keep the highest scoring row of any user that somehow has more than one
+DELETE FROM GeoguessrLeaderboard
+WHERE id NOT IN (SELECT id
+                 FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY score DESC, id) AS row_number
+                       FROM GeoguessrLeaderboard)
+                 WHERE row_number = 1);
+
+DROP INDEX IF EXISTS ix_GeoguessrLeaderboard_user_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_GeoguessrLeaderboard_user_id ON GeoguessrLeaderboard (user_id);
@@ -0,0 +1,16 @@
+-- The state of paginated and deletable messages, so their reactions keep working after a restart.
+
+
+CREATE TABLE IF NOT EXISTS InteractiveMessage
+(
+    message_id      INTEGER     NOT NULL,       -- Discord Message ID (Generated by SockBot)
+    channel_id      INTEGER     NOT NULL,       -- Discord Channel ID of the message
+    message_kind    TEXT        NOT NULL,       -- The service that handles the message, Ex: pageable
+    message_state   TEXT        NOT NULL,       -- JSON object of the state the service keeps for the message
+    expires_at      TEXT,                       -- The time the reactions of the message time out (UTC) or NULL
+    used_at         TEXT        NOT NULL,       -- The time the message was last used (UTC)
+    PRIMARY KEY (message_id, message_kind)      -- A message can be both pageable and deletable
+);
+
+-- InteractiveMessageRepository.get_messages and delete_unused_messages
+CREATE INDEX IF NOT EXISTS ix_InteractiveMessage_kind ON InteractiveMessage (message_kind, used_at);
@@ -0,0 +1,65 @@
+import dataclasses
+import typing as t
+from collections import namedtuple
+from functools import lru_cache
+from operator import itemgetter
+
+T = t.TypeVar('T')
+
+# the number of distinct (model, query shape) pairs that keep a compiled mapper
+MAPPER_CACHE_SIZE = 256
+
+
+def columns(description: t.Sequence[t.Sequence[t.Any]]) -> t.Tuple[str, ...]:
+    """Returns the column names of a cursor description"""
+    return tuple(column[0] for column in description)
+
+
+@lru_cache(maxsize=MAPPER_CACHE_SIZE)
+def row_mapper(model: t.Type[T], names: t.Tuple[str, ...]) -> t.Callable[[t.Sequence[t.Any]], T]:
+    """
+    Compiles a function that maps a row with the given column names into an instance of a dataclass model
+
+    The mapping from columns to fields is worked out once per model and query shape, so mapping each row
+    is a single itemgetter call and a constructor call. Columns that are not fields of the model are ignored
+    and fields that are not selected keep their default
+
+    Args:
+        model (Type): The dataclass to map rows into
+        names (Tuple[str]): The column names of the query, in the order they are selected
+
+    Raises:
+        ValueError: If a field of the model without a default is not selected
+    """
+    index = {name: i for i, name in enumerate(names)}
+    fields = [field for field in dataclasses.fields(model) if field.init]
+
+    selected = []
+    for field in fields:
+        if field.name in index:
+            selected.append(field)
+        elif field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING:
+            raise ValueError(f'Column for field: {field.name} of {model.__name__} is missing from query: {names}')
+
+    if not selected:
+        return lambda row: model()
+
+    indices = [index[field.name] for field in selected]
+    if len(indices) == 1:
+        # itemgetter returns a bare value instead of a tuple for a single index
+        getter = lambda row, i=indices[0]: (row[i],)  # noqa: E731
+    else:
+        getter = itemgetter(*indices)
+
+    if selected == fields[:len(selected)]:
+        # the selected fields are the leading constructor arguments, so the values can be passed positionally
+        return lambda row: model(*getter(row))
+
+    field_names = tuple(field.name for field in selected)
+    return lambda row: model(**dict(zip(field_names, getter(row))))
+
+
+@lru_cache(maxsize=MAPPER_CACHE_SIZE)
+def row_type(names: t.Tuple[str, ...]) -> t.Type[tuple]:
+    """Returns a named tuple type with the given column names as attributes, created once per query shape"""
+    return namedtuple('Query', names, rename=True)
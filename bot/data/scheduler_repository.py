@@ -0,0 +1,29 @@
+
+from bot.data.base_repository import BaseRepository
+from bot.models.scheduler_models import ScheduledJob
+
+
+class SchedulerRepository(BaseRepository):
+
+    async def get_all_jobs(self) -> list[ScheduledJob]:
+        """
+        Fetches every persisted job.
+        """
+        async with self.read() as db:
+            cursor = await db.execute('SELECT * FROM ScheduledJob ORDER BY due_time')
+            return await self.fetch_all_as(cursor, ScheduledJob)
+
+    async def upsert_job(self, job: ScheduledJob) -> None:
+        """
+        Inserts the given ScheduledJob, replacing the job with the same job_id if one exists.
+        """
+        async with self.write() as db:
+            await db.execute('INSERT OR REPLACE INTO ScheduledJob VALUES (?, ?, ?, ?)',
+                             (job.job_id, job.job_name, job.due_time, job.job_args))
+
+    async def delete_jobs(self, job_ids: list[str]) -> None:
+        """
+        Deletes the jobs with the given job ids in a single transaction.
+        """
+        async with self.write() as db:
+            await db.executemany('DELETE FROM ScheduledJob WHERE job_id = ?', [(job_id,) for job_id in job_ids])
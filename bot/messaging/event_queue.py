@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+import typing as t
+from collections import deque
+from enum import Enum, auto
+
+log = logging.getLogger(__name__)
+
+
+class OverflowPolicy(Enum):
+    """Defines what happens when an event is published to a full event queue"""
+
+    # the publisher waits until a worker frees up room in the queue
+    block = auto()
+    # the newly published event is discarded
+    drop_newest = auto()
+    # the oldest queued event is discarded to make room for the new one
+    drop_oldest = auto()
+    # the new event replaces the last queued event with the same key if it is the same event,
+    # if the queue is still full the oldest event is discarded
+    coalesce = auto()
+
+
+class QueuedEvent:
+    """The arguments of a published event waiting in an event queue"""
+
+    __slots__ = ('event', 'args', 'kwargs', 'key', 'order', 'enqueued_at')
+
+    def __init__(self, event: str, args: tuple, kwargs: dict, key: t.Hashable | None, order: t.Hashable | None) -> None:
+        self.event = event
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.order = order
+        self.enqueued_at = time.perf_counter()
+
+
+class EventQueue:
+    """
+    A bounded queue of published events for one or more event types, in the order they were published
+
+    Events are dispatched by a fixed number of worker tasks owned by the Messenger,
+    the queue only stores the pending events and keeps the counters for them. Events with the
+    same order key are handed to one worker at a time, so they are dispatched in order even
+    when there are several workers
+    """
+
+    def __init__(self,
+                 name: str,
+                 *,
+                 maxsize: int,
+                 workers: int,
+                 overflow: OverflowPolicy,
+                 key: t.Callable[..., t.Hashable] | None = None,
+                 order: t.Callable[..., t.Hashable] | None = None) -> None:
+        if maxsize < 1:
+            raise ValueError('An event queue must be able to hold at least one event')
+        if workers < 1:
+            raise ValueError('An event queue must have at least one worker')
+        if overflow is OverflowPolicy.coalesce and key is None:
+            raise ValueError('A coalescing event queue requires a key function')
+
+        self.name = name
+        self.maxsize = maxsize
+        self.workers = workers
+        self.overflow = overflow
+        self.key = key
+        self.order = order
+
+        self._items: t.Deque[QueuedEvent] = deque()
+        # the last queued event with each key
+        self._keyed: t.Dict[t.Hashable, QueuedEvent] = {}
+        # the order keys of the events being dispatched by a worker
+        self._dispatching: t.Set[t.Hashable] = set()
+        lock = asyncio.Lock()
+        self._not_empty = asyncio.Condition(lock)
+        self._not_full = asyncio.Condition(lock)
+
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def put(self, event: str, args: tuple, kwargs: dict) -> None:
+        """Adds a published event to the queue, applying the overflow policy if the queue is full"""
+        key = self.key(*args, **kwargs) if self.key else None
+        async with self._not_empty:
+            # only the last event with the key is replaced, so an add and a remove published in between stay
+            # in order instead of the second add being merged into the first one ahead of the remove
+            if key is not None and (queued := self._keyed.get(key)) and queued.event == event:
+                # an identical event is still waiting, update it in place instead of queueing another
+                queued.args = args
+                queued.kwargs = kwargs
+                self.coalesced += 1
+                return
+
+            if len(self._items) >= self.maxsize:
+                if self.overflow is OverflowPolicy.block:
+                    await self._not_full.wait_for(lambda: len(self._items) < self.maxsize)
+                elif self.overflow is OverflowPolicy.drop_newest:
+                    self.dropped += 1
+                    return
+                else:
+                    self._forget(self._items.popleft())
+                    self.dropped += 1
+
+            queued = QueuedEvent(event, args, kwargs, key, self.order(*args, **kwargs) if self.order else None)
+            self._items.append(queued)
+            if key is not None:
+                self._keyed[key] = queued
+            self.enqueued += 1
+            self._not_empty.notify()
+
+    async def get(self) -> QueuedEvent:
+        """
+        Waits for and removes the oldest event in the queue whose order key is not being dispatched,
+        `done` must be called with the event once it has been dispatched
+        """
+        async with self._not_empty:
+            while (queued := self._next()) is None:
+                await self._not_empty.wait()
+            self._items.remove(queued)
+            self._forget(queued)
+            if queued.order is not None:
+                self._dispatching.add(queued.order)
+            self._not_full.notify()
+
+        wait = time.perf_counter() - queued.enqueued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.processed += 1
+        return queued
+
+    async def done(self, queued: QueuedEvent) -> None:
+        """Marks an event taken with `get` as dispatched, so the next event with its order key can be taken"""
+        if queued.order is None:
+            return
+        async with self._not_empty:
+            self._dispatching.discard(queued.order)
+            self._not_empty.notify()
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        """Returns a snapshot of the queue depth and counters"""
+        return {
+            'depth': len(self._items),
+            'maxsize': self.maxsize,
+            'workers': self.workers,
+            'overflow': self.overflow.name,
+            'enqueued': self.enqueued,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'avg_wait_ms': (self.total_wait / self.processed * 1000) if self.processed else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+    def _next(self) -> QueuedEvent | None:
+        if not self._dispatching:
+            return self._items[0] if self._items else None
+        return next((queued for queued in self._items if queued.order not in self._dispatching), None)
+
+    def _forget(self, queued: QueuedEvent) -> None:
+        if queued.key is not None and self._keyed.get(queued.key) is queued:
+            del self._keyed[queued.key]
@@ -331,6 +331,16 @@ class EventsMeta(type):
         """
         return '_on_set_deletable'
 
+    @property
+    def on_pin_request(self):
+        """
+        Published when a pin request is opened.
+
+        Args:
+            class_pin (bot.models.class_models.ClassPin): The pin request.
+        """
+        return 'on_pin_request'
+
     @property
     def on_guild_channel_create(self):
         """
@@ -390,6 +400,24 @@ class EventsMeta(type):
         """
         return 'on_set_pageable_embed'
 
+    @property
+    def on_set_pageable_source(self):
+        """
+        Published when pages rendered on demand are needed to be able to paginate with buttons,
+        the paginator is not persisted so it stops working if the bot restarts
+
+        Args:
+            source (Callable[[int], Awaitable[discord.Embed | str | None]]): renders the page at an index,
+            or returns None if there is no page at the index
+            page_count (int): optional arg, the number of pages if it is known
+            embed_name (str): optional arg, name of the embed for pages rendered as text
+            field_title (str): optional arg, name for the field/page for pages rendered as text
+            author (discord.Member): member who called the bot
+            channel (discord.TextChannel): the channel to send the embed
+            timeout (int): optional arg, time(seconds) for paginate to timeout, default is 60s
+        """
+        return 'on_set_pageable_source'
+
     @property
     def on_member_update(self):
         """
@@ -1,55 +1,256 @@
 import asyncio
 import inspect
 import logging
+import time
 import typing as t
 import weakref as wr
+from enum import Enum, auto
+from functools import partial
+
+from bot.messaging.event_queue import EventQueue, OverflowPolicy
+from bot.messaging.metrics import EventMetrics, LatencyHistogram
 
 log = logging.getLogger(__name__)
 
 
+class DispatchPolicy(Enum):
+    """Defines how a listener is invoked when the event it is subscribed to is published"""
+
+    # awaited in subscription order, the publisher waits for the listener to finish
+    sequential = auto()
+    # started alongside the other listeners of the event, the publisher waits for all of them to finish
+    concurrent = auto()
+    # started as a tracked task, the publisher does not wait for the listener at all
+    background = auto()
+
+
+class _Listener:
+    """A weakly referenced listener callback, the policy used to invoke it and the histogram it is measured by"""
+
+    __slots__ = ('ref', 'policy', 'name', 'histogram')
+
+    def __init__(self, ref: wr.ref, policy: DispatchPolicy, name: str, histogram: LatencyHistogram) -> None:
+        self.ref = ref
+        self.policy = policy
+        self.name = name
+        self.histogram = histogram
+
+    def __repr__(self) -> str:
+        return f'<_Listener name={self.name} policy={self.policy.name}>'
+
+
 class Messenger:
     """This is the global message bus that handles all application level events"""
 
-    def __init__(self, name=None) -> None:
+    def __init__(self, name=None,
+                 error_handler: t.Callable[[str, Exception], t.Awaitable[None]] | None = None) -> None:
         log.info(f'New messenger created with name: {name}')
         self.name = name
-        self._events: t.Dict[str, t.Awaitable] = {}
+        # each event maps to an immutable tuple of listeners, subscribing or pruning a dead reference
+        # swaps in a new tuple so publish can iterate without copying or guarding against mutation
+        self._events: t.Dict[str, t.Tuple[_Listener, ...]] = {}
+        self._background_tasks: t.Set[asyncio.Task] = set()
+        # the queue of each event that has been configured to be queued and the workers that dispatch them,
+        # by queue name. Events configured together share a queue
+        self._queues: t.Dict[str, EventQueue] = {}
+        self._workers: t.Dict[str, t.List[asyncio.Task]] = {}
+        # call counts, latency percentiles and error counts per event and per listener
+        self.metrics = EventMetrics()
+
+        # optional coroutine function called with (event, exception) for listener errors that
+        # cannot be raised to the publisher, errors are only logged if this is not set
+        self.error_handler = error_handler
+
+    @property
+    def pending_tasks(self) -> int:
+        """The number of background listeners that are currently running"""
+        return len(self._background_tasks)
 
     async def publish(self, event: str, *args, **kwargs) -> None:
         """
         Publishes an event with given args onto the global message bus
 
+        Each listener is isolated from the others, a listener that raises does not stop the
+        remaining listeners from being invoked. Once every sequential and concurrent listener has
+        finished the first error is raised to the publisher and any others are sent to the error handler
+
+        If the event has been configured as queued the event is only added to its queue,
+        the publisher does not wait for the listeners and errors are sent to the error handler
+
         Args:
             event (str): The event invoke the listeners on
         """
-        log.info(f'Recieved published event: {event}')
-        event = event
-        print(event)
-        if event in self._events.keys():
-            listeners = self._events[event]
-            for i, sub in enumerate(listeners):
-                if sub._alive:
-                    log.info(f'Invoking listener: {sub} on event {event} in Messenger: {self.name}')
-                    await sub()(*args, **kwargs)
+        if (queue := self._queues.get(event)) is not None:
+            self._ensure_workers(queue)
+            await queue.put(event, args, kwargs)
+            return
+
+        await self._dispatch(event, args, kwargs)
+
+    def configure_queue(self,
+                        *events: str,
+                        maxsize: int = 1000,
+                        workers: int = 1,
+                        overflow: OverflowPolicy = OverflowPolicy.block,
+                        key: t.Callable[..., t.Hashable] | None = None,
+                        order: t.Callable[..., t.Hashable] | None = None) -> None:
+        """
+        Configures events to be published through a bounded queue that is drained by worker tasks
+        instead of running their listeners inline in the publisher
+
+        Args:
+            events (str): The events to queue, events configured together share one queue so they
+            are taken from it in the order they were published
+            maxsize (int): The maximum number of events waiting in the queue
+            workers (int): The number of worker tasks dispatching events from the queue
+            overflow (OverflowPolicy): What to do with a published event when the queue is full
+            key (Callable, optional): Called with the published args to get the key used to coalesce
+            duplicate events, required for OverflowPolicy.coalesce
+            order (Callable, optional): Called with the published args to get a key, events with the
+            same key are dispatched one at a time in the order they were published
+        """
+        if not events:
+            raise ValueError('At least one event is needed to configure a queue')
+        if queued := [event for event in events if event in self._queues]:
+            raise ValueError(f'Events: {", ".join(queued)} are already queued in Messenger: {self.name}')
+
+        name = ', '.join(events)
+        queue = EventQueue(name, maxsize=maxsize, workers=workers, overflow=overflow, key=key, order=order)
+        for event in events:
+            self._queues[event] = queue
+        log.info(f'Queueing events: {name} with maxsize: {maxsize}, workers: {workers} '
+                 f'and overflow: {overflow.name} in Messenger: {self.name}')
+
+    def queue_stats(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """Returns the depth and counters of every queue by name"""
+        return {queue.name: queue.stats() for queue in dict.fromkeys(self._queues.values())}
+
+    async def _dispatch(self, event: str, args: tuple, kwargs: dict) -> None:
+        listeners = self._events.get(event)
+        if not listeners:
+            return
+
+        errors: t.List[Exception] = []
+        concurrent: t.List[asyncio.Task] = []
+        event_start = time.perf_counter()
+
+        for listener in listeners:
+            # the reference can only be dead here if it was collected mid publish,
+            # the finalizer callback will remove it from the table
+            if (callback := listener.ref()) is None:
+                continue
+
+            if listener.policy is DispatchPolicy.sequential:
+                start = time.perf_counter()
+                try:
+                    await callback(*args, **kwargs)
+                except Exception as e:
+                    errors.append(e)
+                    listener.histogram.record(time.perf_counter() - start, True)
                 else:
-                    log.info(f'Deleting dead reference in Event: {event} function: {sub}')
-                    del listeners[i]
+                    listener.histogram.record(time.perf_counter() - start)
+            elif listener.policy is DispatchPolicy.concurrent:
+                concurrent.append(asyncio.create_task(self._timed(listener.histogram, callback(*args, **kwargs))))
+            else:
+                self._spawn(event, self._timed(listener.histogram, callback(*args, **kwargs)))
+
+        if concurrent:
+            results = await asyncio.gather(*concurrent, return_exceptions=True)
+            errors.extend(r for r in results if isinstance(r, Exception))
+
+        self.metrics.record_event(event, time.perf_counter() - event_start, bool(errors))
+
+        if errors:
+            for error in errors[1:]:
+                await self._report_error(event, error)
+            raise errors[0]
+
+    async def _timed(self, histogram: LatencyHistogram, coro: t.Coroutine) -> None:
+        """Awaits a concurrent or background listener and records how long it took"""
+        start = time.perf_counter()
+        try:
+            await coro
+        except Exception:
+            histogram.record(time.perf_counter() - start, True)
+            raise
+        histogram.record(time.perf_counter() - start)
 
-    def subscribe(self, event: str, callback: t.Awaitable) -> None:
+    def _ensure_workers(self, queue: EventQueue) -> None:
+        """Starts the workers for a queue the first time one of its events is published"""
+        if queue.name in self._workers:
+            return
+        self._workers[queue.name] = [asyncio.create_task(self._worker(queue)) for _ in range(queue.workers)]
+
+    async def _worker(self, queue: EventQueue) -> None:
+        while True:
+            queued = await queue.get()
+            try:
+                await self._dispatch(queued.event, queued.args, queued.kwargs)
+            except Exception as e:
+                await self._report_error(queued.event, e)
+            finally:
+                await queue.done(queued)
+
+    def subscribe(self,
+                  event: str,
+                  callback: t.Awaitable,
+                  *,
+                  policy: DispatchPolicy = DispatchPolicy.sequential) -> None:
         """Subscribes a method as a callback listener to a given event """
         if not asyncio.iscoroutinefunction(callback):
             raise TypeError('A given messenger callback must be awaitable')
 
-        weak_ref = self._getWeakRef(callback)
-        if event in self._events.keys():
-            self._events[event].append(weak_ref)
-        else:
+        weak_ref = self._getWeakRef(callback, partial(self._remove_dead_ref, event))
+        if event not in self._events:
             log.info(f'Registering new event: {event} to Messenger: {self.name}')
-            self._events[event] = [weak_ref]
+        name = getattr(callback, '__qualname__', repr(callback))
+        listener = _Listener(weak_ref, policy, name, self.metrics.listener(event, name))
+        self._events[event] = self._events.get(event, ()) + (listener,)
+
+        log.info(f'Registering listener {callback} to event: {event} with policy: {policy.name} '
+                 f'in Messenger: {self.name}')
+
+    async def close(self) -> None:
+        """Cancels any queue workers and background listeners that are still running and waits for them to exit"""
+        tasks = [worker for workers in self._workers.values() for worker in workers]
+        tasks.extend(self._background_tasks)
+        self._workers.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-        log.info(f'Registering listener {callback} to event: {event} in Messenger: {self.name}')
+    def _spawn(self, event: str, coro: t.Coroutine) -> None:
+        """Starts a background listener and tracks it until it is done"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(partial(self._end_background_task, event))
+
+    def _end_background_task(self, event: str, task: asyncio.Task) -> None:
+        self._background_tasks.discard(task)
+        if task.cancelled() or not (error := task.exception()):
+            return
+        # there is no publisher left to raise to, so the error handler is the only place for it to go
+        self._spawn(event, self._report_error(event, error))
+
+    async def _report_error(self, event: str, error: Exception) -> None:
+        if (handler := self.error_handler) is None:
+            log.error(f'Unhandled error in listener for event: {event} in Messenger: {self.name}', exc_info=error)
+            return
+        try:
+            await handler(event, error)
+        except Exception:
+            log.exception(f'Error handler failed for event: {event} in Messenger: {self.name}')
+
+    def _remove_dead_ref(self, event: str, dead_ref: wr.ref) -> None:
+        """
+        Finalizer callback for a listener reference, called by the garbage collector
+        when the object the listener is bound to has been collected
+        """
+        log.debug(f'Deleting dead reference in Event: {event} function: {dead_ref}')
+        listeners = self._events.get(event, ())
+        self._events[event] = tuple(listener for listener in listeners if listener.ref is not dead_ref)
 
-    def _getWeakRef(self, obj):
+    def _getWeakRef(self, obj, callback=None):
         """
         Get a weak reference to obj. If obj is a bound method, a WeakMethod
         object, that behaves like a WeakRef, is returned; if it is
@@ -59,4 +260,4 @@ class Messenger:
             createRef = wr.WeakMethod
         else:
             createRef = wr.ref
-        return createRef(obj)
+        return createRef(obj, callback)
@@ -0,0 +1,106 @@
+import typing as t
+
+# the number of most recent latency samples kept per event and per listener
+DEFAULT_SAMPLE_SIZE = 1024
+
+
+class LatencyHistogram:
+    """
+    Call counters and a fixed size ring buffer of the most recent latencies
+
+    Recording a sample is O(1) and allocation free, the percentiles are only
+    computed from the buffered samples when they are requested
+    """
+
+    __slots__ = ('_samples', '_index', 'calls', 'errors', 'total')
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE) -> None:
+        self._samples = [0.0] * sample_size
+        self._index = 0
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def record(self, duration: float, failed: bool = False) -> None:
+        """Records the duration of a single call in seconds"""
+        self._samples[self._index] = duration
+        self._index = (self._index + 1) % len(self._samples)
+        self.calls += 1
+        self.total += duration
+        if failed:
+            self.errors += 1
+
+    def reset(self) -> None:
+        self._index = 0
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def percentiles(self, *percents: float) -> t.List[float]:
+        """Returns the given percentiles, from 0 to 100, of the buffered samples in seconds"""
+        samples = sorted(self._samples[:min(self.calls, len(self._samples))])
+        if not samples:
+            return [0.0 for _ in percents]
+        return [samples[min(len(samples) - 1, int(len(samples) * p / 100))] for p in percents]
+
+    def snapshot(self) -> t.Dict[str, t.Any]:
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_ms': (self.total / self.calls * 1000) if self.calls else 0.0,
+            'p50_ms': p50 * 1000,
+            'p95_ms': p95 * 1000,
+            'p99_ms': p99 * 1000,
+        }
+
+
+class EventMetrics:
+    """Latency histograms for every published event and every listener invoked by it"""
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE) -> None:
+        self.sample_size = sample_size
+        self._events: t.Dict[str, LatencyHistogram] = {}
+        self._listeners: t.Dict[t.Tuple[str, str], LatencyHistogram] = {}
+
+    def event(self, event: str) -> LatencyHistogram:
+        """Gets or creates the histogram for an event"""
+        if (histogram := self._events.get(event)) is None:
+            histogram = self._events[event] = LatencyHistogram(self.sample_size)
+        return histogram
+
+    def listener(self, event: str, listener: str) -> LatencyHistogram:
+        """
+        Gets or creates the histogram for a listener of an event, callers on a hot path
+        should hold on to the histogram instead of looking it up for every call
+        """
+        key = (event, listener)
+        if (histogram := self._listeners.get(key)) is None:
+            histogram = self._listeners[key] = LatencyHistogram(self.sample_size)
+        return histogram
+
+    def record_event(self, event: str, duration: float, failed: bool = False) -> None:
+        self.event(event).record(duration, failed)
+
+    def record_listener(self, event: str, listener: str, duration: float, failed: bool = False) -> None:
+        self.listener(event, listener).record(duration, failed)
+
+    def reset(self) -> None:
+        """Clears the recorded samples and counters, histograms held by callers stay valid"""
+        for histogram in (*self._events.values(), *self._listeners.values()):
+            histogram.reset()
+
+    def snapshot(self) -> t.Dict[str, t.Any]:
+        """
+        Returns the counters and percentiles of every event, with the listeners
+        of each event nested under it, in a json serializable dictionary
+        """
+        result = {event: {**histogram.snapshot(), 'listeners': {}}
+                  for event, histogram in self._events.items() if histogram.calls}
+        for (event, listener), histogram in self._listeners.items():
+            if not histogram.calls:
+                continue
+            # background listeners can be recorded for an event before the event itself finishes
+            entry = result.setdefault(event, {**LatencyHistogram(1).snapshot(), 'listeners': {}})
+            entry['listeners'][listener] = histogram.snapshot()
+        return result
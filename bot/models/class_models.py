@@ -3,7 +3,7 @@ from datetime import datetime
 from bot.utils.helpers import strtodt
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassSemester:
     semester_id: str
     semester_name: str
@@ -19,7 +19,7 @@ class ClassSemester:
         return strtodt(self.semester_end)
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassChannelScaffold:
     class_prefix: str
     class_number: int
@@ -48,7 +48,7 @@ class ClassChannelScaffold:
         return f'{self.class_code} TA'
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassChannel(ClassChannelScaffold):
     channel_id: int
     semester_id: str
@@ -59,7 +59,7 @@ class ClassChannel(ClassChannelScaffold):
     class_archived: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassPin:
     sockbot_message_id: int
     user_message_id: int
@@ -69,7 +69,7 @@ class ClassPin:
     pin_pinned: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ClassTA:
     channel_id: int
     ta_user_id: int
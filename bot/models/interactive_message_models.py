@@ -0,0 +1,22 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+
+@dataclass(slots=True)
+class InteractiveMessage:
+    message_id: int
+    channel_id: int
+    message_kind: str
+    message_state: str
+    expires_at: str | None
+    used_at: str
+
+    @property
+    def state(self) -> dict[str, Any]:
+        return json.loads(self.message_state)
+
+    @property
+    def expires_date(self) -> datetime | None:
+        return datetime.fromisoformat(self.expires_at) if self.expires_at else None
@@ -0,0 +1,20 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+
+@dataclass(slots=True)
+class ScheduledJob:
+    job_id: str
+    job_name: str
+    due_time: str
+    job_args: str
+
+    @property
+    def due_date(self) -> datetime:
+        return datetime.fromisoformat(self.due_time)
+
+    @property
+    def kwargs(self) -> dict[str, Any]:
+        return json.loads(self.job_args)
@@ -1,6 +1,7 @@
 import abc
 import inspect
 
+from bot.messaging.messenger import DispatchPolicy
 from bot.sock_bot import SockBot
 
 
@@ -20,7 +21,8 @@ class BaseService(abc.ABC):
             if hasattr(value, '__event_listener__'):
                 event = getattr(value, '__event_listener__')
             if event:
-                self.bot.messenger.subscribe(event, value)
+                policy = getattr(value, '__event_policy__', DispatchPolicy.sequential)
+                self.bot.messenger.subscribe(event, value, policy=policy)
 
     @abc.abstractmethod
     async def load_service(self):
@@ -30,8 +32,15 @@ class BaseService(abc.ABC):
         """
         pass
 
+    async def unload_service(self):
+        """
+        Called when the bot is shutting down to handle any cleanup the service needs,
+        things like flushing buffered writes or cancelling background tasks
+        """
+        pass
+
     @classmethod
-    def listener(cls, event=None):
+    def listener(cls, event=None, policy: DispatchPolicy = DispatchPolicy.sequential):
         """
         The method decorator to allow for service methods to be marked as a callback 
         for application level events
@@ -39,6 +48,8 @@ class BaseService(abc.ABC):
         Args:
             event ([Str], optional): The event that the method is subscribing too.
             Defaults to None.
+            policy (DispatchPolicy, optional): How the listener is invoked when the event is published.
+            Defaults to DispatchPolicy.sequential.
         """
 
         def wrapper(func):
@@ -48,6 +59,7 @@ class BaseService(abc.ABC):
             if not inspect.iscoroutinefunction(actual):
                 raise TypeError('Listener function must be a coroutine function.')
             actual.__event_listener__ = event or actual.__name__
+            actual.__event_policy__ = policy
 
             return func
 
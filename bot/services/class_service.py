@@ -1,4 +1,7 @@
+import asyncio
 import logging
+import time
+from datetime import timedelta
 
 import discord
 from discord import CategoryChannel
@@ -11,9 +14,19 @@ from bot.models.class_models import ClassSemester, ClassChannel, ClassChannelSca
 from bot.services.base_service import BaseService
 from bot.sock_bot import SockBot
 from bot.utils.helpers import error_embed, fetch_optional_message
+from bot.utils.request_scheduler import channel_bucket, guild_bucket
+from bot.utils.worker_pool import map_concurrently
 
 MAX_CHANNELS_PER_CATEGORY = 50
 WELCOME_MESSAGE_REACTION = '✅'
+SEMESTER_ARCHIVE_JOB = 'semester_archive'
+# how long after a semester starts or ends the rollover runs, so the boundary is strictly in the past
+ROLLOVER_DELAY = timedelta(seconds=1)
+# the rollover is scheduled with a fixed id so scheduling it again replaces the one already scheduled
+ROLLOVER_TASK_ID = 'semester_rollover'
+# how many class channels a semester archival changes at once, and how often it reports its progress in seconds
+ARCHIVE_CONCURRENCY = 5
+ARCHIVE_PROGRESS_INTERVAL = 5
 
 log = logging.getLogger(__name__)
 
@@ -22,8 +35,9 @@ class ClassService(BaseService):
 
     def __init__(self, bot: SockBot):
         super().__init__(bot)
-        self.messages: set[int] = set()
+        self.messages = bot.reaction_filter.watched_set()
         self.repo = ClassRepository()
+        self.bot.scheduler.register_job(SEMESTER_ARCHIVE_JOB, self.on_semester_archive_job)
 
     @BaseService.listener(Events.on_class_create)
     async def on_class_create(self, inter: discord.Interaction, cls: ClassChannelScaffold, desc: str | None = None):
@@ -144,35 +158,125 @@ class ClassService(BaseService):
         await self._get_notifs_channel().send(embed=embed)
         await inter.followup.send(embed=embed)
 
+    async def on_semester_archive_job(self, semester_id: str):
+        """
+        Persisted scheduler job that archives the semester with the given ID once it has ended.
+        """
+        if not (semester := await self.repo.search_semester(semester_id)):
+            log.warning(f'Semester {semester_id} scheduled for archival no longer exists')
+            return
+        await self.on_semester_archive(semester)
+
     @BaseService.listener(Events.on_semester_archive)
     async def on_semester_archive(self, semester: ClassSemester, inter: discord.Interaction | None = None):
-        # go through each channel we have in the semester that is unarchived and archive it
         if inter:
             await inter.response.defer(thinking=True)
-        channels = await self.repo.get_semester_classes(semester)
+        # persist the archival while it runs, so if the bot restarts part way through it is resumed on the next start
+        job_id = f'{SEMESTER_ARCHIVE_JOB}:{semester.semester_id}'
+        await self.bot.scheduler.persist_job(SEMESTER_ARCHIVE_JOB, job_id=job_id, semester_id=semester.semester_id)
+
+        # only the unarchived channels are archived, so a resumed archival skips the ones that were committed
+        classes = [cls for cls in await self.repo.get_semester_classes(semester) if not cls.class_archived]
         notif_channel = self._get_notifs_channel()
-        channel_mentions = []
-        for channel in channels:
-            for class_ta in await self.repo.get_tas_by_channel(channel.channel_id):
-                await self.repo.delete_ta(class_ta)
-            if class_role := self.bot.guild.get_role(channel.class_role_id):
-                await class_role.delete(reason='Semester archival')
-            if ta_role := self.bot.guild.get_role(channel.class_ta_role_id):
-                await ta_role.delete(reason='Semester archival')
-            channel_mentions.append(await self.on_class_archive(channel))
+        progress = await notif_channel.send(f'📔 Archiving {len(classes)} classes from {semester.semester_name}...')
+
+        # the discord calls for each channel are made concurrently, then every archived channel is committed at once
+        plans, failed = self._plan_archive(classes)
+        done = 0
+        last_report = time.monotonic()
+
+        async def report(*_):
+            nonlocal done, last_report
+            done += 1
+            if time.monotonic() - last_report >= ARCHIVE_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await progress.edit(content=f'📔 Archiving {semester.semester_name}: {done}/{len(plans)} channels')
+
+        results = await map_concurrently(self._archive_channel, plans, concurrency=ARCHIVE_CONCURRENCY, on_done=report)
+        archived, channel_mentions = [], []
+        for (cls, channel, _), result in zip(plans, results):
+            if isinstance(result, Exception):
+                log.error(f'Failed to archive class channel {cls.channel_id}', exc_info=result)
+                failed.append(cls)
+                continue
+            archived.append(cls)
+            channel_mentions.append(channel.mention)
+            self.messages.discard(cls.post_message_id)
+        await self.repo.archive_classes(archived)
+        await self.bot.scheduler.cancel_job(job_id)
 
         # prepare our embed
-        embed = discord.Embed(title='📔 Semester Archived', color=Colors.Purple)
+        embed = discord.Embed(title='📔 Semester Archived', color=Colors.Purple,
+                              description='\n'.join(channel_mentions)[:4096])
         embed.add_field(name='Semester', value=semester.semester_name)
-        embed.add_field(name='Class Count', value=len(channels))
+        embed.add_field(name='Class Count', value=len(archived))
         embed.add_field(name='Archived By', value=inter.user.mention if inter else 'System')
-        embed.add_field(name='Channels Archived', value='\n'.join(channel_mentions))
+        if failed:
+            embed.add_field(name='Failed', value=', '.join(f'`{cls.channel_id}`' for cls in failed)[:1024],
+                            inline=False)
 
-        # send our embed to the notifications channel + to the user
-        await notif_channel.send(embed=embed)
+        # replace the progress message with our embed + send it to the user
+        await progress.edit(content=None, embed=embed)
         if inter:
             await inter.followup.send(embed=embed, ephemeral=True)
 
+    def _plan_archive(self, classes: list[ClassChannel]) \
+            -> tuple[list[tuple[ClassChannel, discord.TextChannel, CategoryChannel]], list[ClassChannel]]:
+        """
+        Picks the archive category each class channel is moved to before any of them are moved, since the
+        channels are moved concurrently and can not each look for a category with room.
+        Returns the (class, channel, category) of each channel to archive and the classes that can not be archived.
+        """
+        archive_categories = bot_secrets.secrets.class_archive_category_ids
+        room = {category: MAX_CHANNELS_PER_CATEGORY - len(category.channels)
+                for category in self.bot.guild.categories if category.id in archive_categories}
+        plans, failed = [], []
+        for cls in classes:
+            if not (channel := self.bot.guild.get_channel(cls.channel_id)):
+                failed.append(cls)
+                continue
+            # a channel already in an archive category was moved by an archival that was interrupted
+            if channel.category in room:
+                category = channel.category
+            elif category := next((category for category, free in room.items() if free > 0), None):
+                room[category] -= 1
+            else:
+                failed.append(cls)
+                continue
+            cls.class_archived = True
+            cls.category_id = category.id
+            plans.append((cls, channel, category))
+        return plans, failed
+
+    async def _archive_channel(self, plan: tuple[ClassChannel, discord.TextChannel, CategoryChannel]) -> None:
+        """
+        Makes the discord changes for archiving a class channel, the class channel itself is committed by the caller.
+        """
+        cls, channel, category = plan
+        deletes = []
+        for role_id in (cls.class_role_id, cls.class_ta_role_id):
+            if role := self.bot.guild.get_role(role_id):
+                deletes.append(self.bot.requests.submit(guild_bucket(self.bot.guild, 'roles'),
+                                                        lambda role=role: role.delete(reason='Semester archival')))
+        await asyncio.gather(*deletes)
+        # a channel that is already in its category was moved and announced by an archival that was interrupted
+        moved = channel.category != category
+        if moved:
+            await self._move_and_sort(category, channel)
+        await self.bot.requests.submit(
+            channel_bucket(channel),
+            lambda: channel.set_permissions(self.bot.guild.default_role, view_channel=False)
+        )
+        if not moved:
+            return
+
+        embed = discord.Embed(title='📔 Class Archived', color=Colors.Purple)
+        embed.add_field(name='Class Title', value=cls.full_title, inline=False)
+        embed.add_field(name='Channel', value=channel.mention)
+        embed.add_field(name='Moved To', value=category.name)
+        embed.add_field(name='Archived By', value='Semester Archival', inline=False)
+        await channel.send(embed=embed)
+
     @BaseService.listener(Events.on_class_archive)
     async def on_class_archive(self, cls: ClassChannel, inter: discord.Interaction | None = None) -> str | None:
         if inter:
@@ -319,8 +423,12 @@ class ClassService(BaseService):
         Moves the given discord.TextChannel to the given discord.CategoryChannel.
         Sorts the channel based on descending order and syncs the permissions of the channel based off the category.
         """
-        i = len([ch for ch in category.channels if isinstance(ch, discord.TextChannel) and ch.name < channel.name])
-        await channel.move(beginning=True, offset=i, category=category, sync_permissions=True)
+        async def move():
+            # the position is worked out when the move runs, after every move queued before it has been made
+            i = len([ch for ch in category.channels if isinstance(ch, discord.TextChannel) and ch.name < channel.name])
+            await channel.move(beginning=True, offset=i, category=category, sync_permissions=True)
+
+        await self.bot.requests.submit(guild_bucket(self.bot.guild, 'channels'), move)
 
     def _available_archive_category(self) -> CategoryChannel | None:
         """
@@ -340,23 +448,31 @@ class ClassService(BaseService):
         Gets or creates a new category channel for the given scaffold.
         """
         category_name = cls.intended_category
-        for category in self.bot.guild.categories:
-            if category_name == category.name:
-                return category
-        return await self.bot.guild.create_category(name=category_name)
+
+        async def get_or_create():
+            # looked up in the queue, so a category created by a request queued before this one is found
+            for category in self.bot.guild.categories:
+                if category_name == category.name:
+                    return category
+            return await self.bot.guild.create_category(name=category_name)
+
+        return await self.bot.requests.submit(guild_bucket(self.bot.guild, 'channels'), get_or_create)
 
     async def _get_or_create_role(self, cls: ClassChannelScaffold) -> discord.Role:
         """
         Gets or creates a new role for the given class scaffold.
         """
-        for r in self.bot.guild.roles:
-            if r.name == cls.class_code:
-                return r
-        return await self.bot.guild.create_role(
-            name=cls.class_code,
-            mentionable=True,
-            reason=f'Class creation or could not find class role {cls.class_code}'
-        )
+        async def get_or_create():
+            for r in self.bot.guild.roles:
+                if r.name == cls.class_code:
+                    return r
+            return await self.bot.guild.create_role(
+                name=cls.class_code,
+                mentionable=True,
+                reason=f'Class creation or could not find class role {cls.class_code}'
+            )
+
+        return await self.bot.requests.submit(guild_bucket(self.bot.guild, 'roles'), get_or_create)
 
     async def _sync_perms(self, cls: ClassChannel) -> None:
         """
@@ -372,20 +488,27 @@ class ClassService(BaseService):
         if not (channel := self.bot.guild.get_channel(cls.channel_id)):
             await self._send_failure(cls, 'Syncing Perms Failed', f'The channel `{cls.channel_id}` does not exist.')
             return
-        await channel.set_permissions(role, view_channel=True)
-        await channel.set_permissions(cleanup, view_channel=False)
-        await role.edit(mentionable=True, position=3)
-        await cleanup.edit(position=2)
+        # the channel and the roles are in different buckets, so their requests are made at the same time
+        requests = self.bot.requests
+        await asyncio.gather(
+            requests.submit(channel_bucket(channel), lambda: channel.set_permissions(role, view_channel=True)),
+            requests.submit(channel_bucket(channel), lambda: channel.set_permissions(cleanup, view_channel=False)),
+            requests.submit(guild_bucket(self.bot.guild, 'roles'), lambda: role.edit(mentionable=True, position=3)),
+            requests.submit(guild_bucket(self.bot.guild, 'roles'), lambda: cleanup.edit(position=2)),
+        )
 
     async def _get_or_create_cleanup(self) -> discord.Role:
         """
         Fetches the 'Cleanup' role from the guild.
         If not found, a new role with the name 'Cleanup' is created and returned.
         """
-        for role in self.bot.guild.roles:
-            if role.name == 'Cleanup':
-                return role
-        return await self.bot.guild.create_role(name='Cleanup')
+        async def get_or_create():
+            for role in self.bot.guild.roles:
+                if role.name == 'Cleanup':
+                    return role
+            return await self.bot.guild.create_role(name='Cleanup')
+
+        return await self.bot.requests.submit(guild_bucket(self.bot.guild, 'roles'), get_or_create)
 
     async def _send_welcome(self, cls: ClassChannel, just_created: bool, user: discord.User):
         """
@@ -416,7 +539,7 @@ class ClassService(BaseService):
         self.messages.add(message.id)
 
         # add the reaction for users to add/remove the class role
-        await message.add_reaction(WELCOME_MESSAGE_REACTION)
+        self.bot.reaction_adder.add(message, WELCOME_MESSAGE_REACTION)
 
     async def _send_failure(self, cls: ClassChannel, title: str, desc: str) -> None:
         """
@@ -459,13 +582,13 @@ class ClassService(BaseService):
         return channel
 
     async def load_service(self):
+        # load every class channel, TA and semester into the repository cache in bulk, so reactions and
+        # commands in every channel are answered without querying the database
+        await self.repo.warm_cache()
+        await self._schedule_rollover()
         if not (semester := await self.repo.get_current_semester()):
             return
-        # since we have a current semester, schedule the archival for the end date...
-        self.bot.scheduler.schedule_at(
-            self.on_semester_archive(semester),
-            time=semester.end_date
-        )
+        await self._schedule_archive(semester)
         # cache our post message IDs and clean up any data since the last run
         for class_channel in await self.repo.get_semester_classes(semester):
             if not (channel := self.bot.guild.get_channel(class_channel.channel_id)):
@@ -481,3 +604,37 @@ class ClassService(BaseService):
                 continue
             # add the post message id to our messages to listen for
             self.messages.add(class_channel.post_message_id)
+
+    async def unload_service(self):
+        if ROLLOVER_TASK_ID in self.bot.scheduler:
+            self.bot.scheduler.cancel(ROLLOVER_TASK_ID)
+
+    async def on_semester_rollover(self):
+        """
+        Runs just after a semester starts or ends. The semesters are reloaded so any added since the last load
+        are picked up, then the archival of the new current semester and the next rollover are scheduled.
+        """
+        await self.repo.warm_cache()
+        await self._schedule_rollover()
+        if semester := await self.repo.get_current_semester():
+            log.info(f'Semester {semester.semester_id} is now the current semester')
+            await self._schedule_archive(semester)
+
+    async def _schedule_rollover(self) -> None:
+        # the current semester is resolved from the cached semesters, so it is only looked up again
+        # once the next semester boundary has passed
+        if not (rollover := await self.repo.get_semester_rollover()):
+            return
+        # load_service runs again on every on_ready, so this replaces a rollover that is already scheduled
+        self.bot.scheduler.schedule_at(self.on_semester_rollover(), time=rollover + ROLLOVER_DELAY,
+                                       task_id=ROLLOVER_TASK_ID)
+
+    async def _schedule_archive(self, semester: ClassSemester) -> None:
+        # schedule the archival for the end date of the semester...
+        # the job is persisted, so if the bot is offline at the end date it is caught up on the next start
+        await self.bot.scheduler.schedule_job_at(
+            SEMESTER_ARCHIVE_JOB,
+            time=semester.end_date,
+            job_id=f'{SEMESTER_ARCHIVE_JOB}:{semester.semester_id}',
+            semester_id=semester.semester_id
+        )
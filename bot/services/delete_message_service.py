@@ -1,14 +1,42 @@
-import asyncio
 import logging
 import typing as t
+from dataclasses import dataclass
+from datetime import datetime
 
 import discord
 
+import bot.bot_secrets as bot_secrets
+from bot.data.interactive_message_repository import InteractiveMessageRepository
 from bot.messaging.events import Events
 from bot.services.base_service import BaseService
+from bot.utils.message_store import PersistentMessageStore
+from bot.utils.scheduler import MisfirePolicy
+from bot.utils.timer_wheel import TimerWheel
+from bot.utils.worker_pool import map_concurrently
 
 log = logging.getLogger(__name__)
 
+MESSAGE_KIND = 'deletable'
+EXPIRY_JOB_ID = 'deletable_message_expiry'
+# how often timed out messages are swept in seconds, and how many have their reaction cleared at once
+EXPIRY_SWEEP_INTERVAL = 1
+EXPIRY_CONCURRENCY = 5
+
+
+@dataclass(slots=True)
+class DeletableMessage:
+    # the (channel id, message id) of every message to delete, the reaction is on the last one
+    messages: t.Tuple[t.Tuple[int, int], ...]
+    role_ids: t.FrozenSet[int]
+    author_id: int | None
+
+    def to_state(self) -> t.Dict[str, t.Any]:
+        return {'messages': self.messages, 'role_ids': list(self.role_ids), 'author_id': self.author_id}
+
+    @classmethod
+    def from_state(cls, state: t.Dict[str, t.Any]) -> 'DeletableMessage':
+        return cls(tuple(tuple(ids) for ids in state['messages']), frozenset(state['role_ids']), state['author_id'])
+
 
 class DeleteMessageService(BaseService):
     """
@@ -18,7 +46,11 @@ class DeleteMessageService(BaseService):
 
     def __init__(self, *, bot):
         super().__init__(bot)
-        self.messages = {}
+        repository = InteractiveMessageRepository() if bot_secrets.secrets.persist_interactive_messages else None
+        self.messages: PersistentMessageStore[DeletableMessage] = PersistentMessageStore(
+            MESSAGE_KIND, DeletableMessage, bot.reaction_filter, repository=repository)
+        # the channel id of each deletable message with a timeout, by message id
+        self.expiries: TimerWheel[int, int] = TimerWheel()
 
     # Called When a cog would like to be able to delete a message or messages
     @BaseService.listener(Events.on_set_deletable)
@@ -33,44 +65,71 @@ class DeleteMessageService(BaseService):
         if not isinstance(roles, t.List):
             roles = [roles]
 
-        # stores the message info
-        self.messages[msg[-1].id] = {
-            "MessagesToDelete": msg,
-            "Roles": roles,
-            "Author": author.id if author else None
-        }
+        # stores the message info, only the ids are kept so the state of a message stays small
+        await self.messages.put(msg[-1].id, msg[-1].channel.id, DeletableMessage(
+            messages=tuple((m.channel.id, m.id) for m in msg),
+            role_ids=frozenset(role.id for role in roles),
+            author_id=author.id if author else None
+        ), timeout=timeout)
 
         # the emoji is placed on the last message in the list
-        await msg[-1].add_reaction("🗑️")
+        self.bot.reaction_adder.add(msg[-1], "🗑️")
+        # the message is expired by the next sweep after the timeout, instead of a coroutine sleeping until then
         if timeout:
-            await asyncio.sleep(timeout)
-            try:
-                await msg[-1].clear_reaction("🗑️")
-                del self.messages[msg[-1].id]
-            except:
-                pass
-            finally:
-                log.info(f'Message: {msg[-1].id} timed out as deletable')
-
-    @BaseService.listener(Events.on_reaction_add)
-    async def delete_message(self, reaction: discord.Reaction, user: t.Union[discord.User, discord.Member]):
-        role_ids = [role.id for role in user.roles]
+            self.expiries.add(msg[-1].id, msg[-1].channel.id, timeout)
+
+    @BaseService.listener(Events.on_raw_reaction_add)
+    async def delete_message(self, payload: discord.RawReactionActionEvent):
+        # the raw event is used because on_reaction_add only fires for messages in discord.py's message cache,
+        # which is empty after a restart even though the state of the message is read back from the database
         delete = False
 
-        if reaction.emoji != '🗑️' or reaction.message.id not in self.messages:
+        if payload.user_id == self.bot.user.id or str(payload.emoji) != '🗑️':
+            return
+        if not (deletable := await self.messages.get(payload.message_id)):
             return
-        elif user.guild_permissions.administrator:
+        # the member is only given for reactions in a guild, so only the author can delete a message elsewhere
+        member = payload.member
+        if payload.user_id == deletable.author_id:
             delete = True
-        elif user.id == self.messages[reaction.message.id]['Author']:
+        elif member and member.guild_permissions.administrator:
             delete = True
-        elif any(True for role in self.messages[reaction.message.id]['Roles'] if role.id in role_ids):
+        elif member and any(True for role in member.roles if role.id in deletable.role_ids):
             delete = True
 
         if delete:
-            for msg in self.messages[reaction.message.id]['MessagesToDelete']:
-                log.info(f'Mesaage {msg.id} deleted by delete message service')
-                await msg.delete()
-            del self.messages[reaction.message.id]
+            for channel_id, message_id in deletable.messages:
+                log.info(f'Mesaage {message_id} deleted by delete message service')
+                await self.bot.get_partial_messageable(channel_id).get_partial_message(message_id).delete()
+            await self.messages.pop([payload.message_id])
+            self.expiries.discard(payload.message_id)
+
+    async def expire_messages(self):
+        """
+        Removes the delete reaction from every message whose timeout has passed since the last sweep
+        """
+        await self.messages.evict_expired()
+        if not (expired := self.expiries.expire()):
+            return
+        await self.messages.pop(message_id for message_id, _ in expired)
+        # the message may have been deleted in the meantime, so failures are ignored
+        await map_concurrently(lambda message: message.clear_reaction("🗑️"),
+                               [self.bot.get_partial_messageable(channel_id).get_partial_message(message_id)
+                                for message_id, channel_id in expired],
+                               concurrency=EXPIRY_CONCURRENCY)
+        log.info(f'{len(expired)} messages timed out as deletable')
 
     async def load_service(self):
-        pass
+        # the timeouts of the messages persisted before a restart carry on, or expire on the first sweep
+        now = datetime.utcnow()
+        for message in await self.messages.load():
+            if expires := message.expires_date:
+                self.expiries.add(message.message_id, message.channel_id, max((expires - now).total_seconds(), 0))
+        # the sweep also evicts the state of messages without a timeout that have not been used for a long time
+        # a sweep that is still running when the next is due has already expired everything that was due
+        self.bot.scheduler.schedule_every(self.expire_messages, interval=EXPIRY_SWEEP_INTERVAL,
+                                          job_id=EXPIRY_JOB_ID, misfire=MisfirePolicy.skip)
+
+    async def unload_service(self):
+        if EXPIRY_JOB_ID in self.bot.scheduler:
+            self.bot.scheduler.cancel(EXPIRY_JOB_ID)
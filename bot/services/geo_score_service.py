@@ -0,0 +1,39 @@
+import logging
+
+from bot.data.geo_repository import GeoRepository
+from bot.services.base_service import BaseService
+from bot.utils.scheduler import MisfirePolicy
+
+log = logging.getLogger(__name__)
+
+# how often the buffered geoguessr score increments are written to the database, in seconds
+FLUSH_INTERVAL = 30
+FLUSH_JOB_ID = 'geo_score_flush'
+
+
+class GeoScoreService(BaseService):
+    """
+    This service turns on write-behind buffering of geoguessr scores, the buffered score
+    increments are flushed in a single transaction on an interval and when the bot shuts down
+    """
+
+    def __init__(self, *, bot):
+        super().__init__(bot)
+        self.repo = GeoRepository()
+
+    async def flush(self) -> None:
+        try:
+            await self.repo.flush_scores()
+        except Exception as e:
+            log.error(f'Flushing buffered geoguessr scores failed with error {e}')
+
+    async def load_service(self):
+        GeoRepository.buffer_scores = True
+        self.bot.scheduler.schedule_every(self.flush, interval=FLUSH_INTERVAL, job_id=FLUSH_JOB_ID,
+                                          misfire=MisfirePolicy.coalesce)
+
+    async def unload_service(self):
+        if FLUSH_JOB_ID in self.bot.scheduler:
+            self.bot.scheduler.cancel(FLUSH_JOB_ID)
+        GeoRepository.buffer_scores = False
+        await self.repo.flush_scores()
@@ -0,0 +1,52 @@
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+import bot.bot_secrets as bot_secrets
+from bot.services.base_service import BaseService
+from bot.utils.scheduler import MisfirePolicy
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_JOB_ID = 'event_metrics_snapshot'
+
+
+class MetricsService(BaseService):
+    """
+    This service periodically writes a json snapshot of the messenger event metrics
+    to the Logs directory, if a snapshot interval has been configured
+    """
+
+    def __init__(self, *, bot):
+        super().__init__(bot)
+        self.snapshot_path = Path(f'Logs/{datetime.now().strftime("%Y-%m-%d-%H.%M.%S")}_event_metrics.json')
+
+    def write_snapshot(self) -> None:
+        snapshot = {
+            'time': datetime.utcnow().isoformat(),
+            'events': self.bot.messenger.metrics.snapshot(),
+            'queues': self.bot.messenger.queue_stats(),
+        }
+        with open(self.snapshot_path, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+
+    async def _snapshot_job(self) -> None:
+        try:
+            self.write_snapshot()
+        except OSError as e:
+            log.error(f'Writing event metrics snapshot to {self.snapshot_path} failed with error {e}')
+
+    async def load_service(self):
+        if not (interval := bot_secrets.secrets.event_metrics_snapshot_interval):
+            return
+        log.info(f'Writing event metrics snapshots to {self.snapshot_path} every {interval} seconds')
+        # a snapshot overwrites the previous one, so there is no point writing the ones that were missed
+        self.bot.scheduler.schedule_every(self._snapshot_job, interval=interval, job_id=SNAPSHOT_JOB_ID,
+                                          misfire=MisfirePolicy.skip)
+
+    async def unload_service(self):
+        if SNAPSHOT_JOB_ID in self.bot.scheduler:
+            self.bot.scheduler.cancel(SNAPSHOT_JOB_ID)
+        if bot_secrets.secrets.event_metrics_snapshot_interval:
+            self.write_snapshot()
@@ -1,21 +1,35 @@
-import asyncio
 import logging
 import typing as t
 from dataclasses import dataclass
+from datetime import datetime
 
 import discord
 from discord.ext.commands.errors import BadArgument
 
+import bot.bot_secrets as bot_secrets
 from bot.consts import Colors
+from bot.data.interactive_message_repository import InteractiveMessageRepository
 from bot.messaging.events import Events
 from bot.services.base_service import BaseService
+from bot.utils.message_store import PersistentMessageStore
+from bot.utils.paginator import PageSource, PaginatorView
+from bot.utils.scheduler import MisfirePolicy
+from bot.utils.timer_wheel import TimerWheel
+from bot.utils.worker_pool import map_concurrently
 
 log = logging.getLogger(__name__)
 
+MESSAGE_KIND = 'pageable'
+EXPIRY_JOB_ID = 'pageable_message_expiry'
+# how often timed out messages are swept in seconds, and how many have their reactions cleared at once
+EXPIRY_SWEEP_INTERVAL = 1
+EXPIRY_CONCURRENCY = 5
+
 
 @dataclass
 class Message:
-    pages: t.Union[t.List[discord.Embed], t.List[str]]
+    # embed pages are kept as dicts and only the page being shown is rendered into an embed
+    pages: t.Union[t.List[t.Dict[str, t.Any]], t.List[str]]
     _curr_page_num: int
     author: int
     embed_name: str = None
@@ -30,16 +44,17 @@ class Message:
         self._curr_page_num = page_num
 
     @property
-    def curr_page(self) -> t.Union[discord.Embed, str]:
+    def curr_page(self) -> t.Union[t.Dict[str, t.Any], str]:
         return self.pages[self._curr_page_num]
 
     @property
     def curr_content(self) -> discord.Embed:
 
         page = self.curr_page
-        if isinstance(page, discord.Embed):
-            page.set_footer(text=f'Page {self.curr_page_num + 1} of {len(self.pages)}')
-            return page
+        if isinstance(page, dict):
+            embed = discord.Embed.from_dict(page)
+            embed.set_footer(text=f'Page {self.curr_page_num + 1} of {len(self.pages)}')
+            return embed
         elif not isinstance(page, str):
             raise BadArgument(f'Embed or string expected in the paginator service: {type(page)} found')
 
@@ -48,6 +63,15 @@ class Message:
         embed.set_footer(text=f'Page {self.curr_page_num + 1} of {len(self.pages)}')
         return embed
 
+    def to_state(self) -> t.Dict[str, t.Any]:
+        return {'pages': self.pages, 'page': self._curr_page_num, 'author': self.author,
+                'embed_name': self.embed_name, 'field_title': self.field_title}
+
+    @classmethod
+    def from_state(cls, state: t.Dict[str, t.Any]) -> 'Message':
+        return cls(state['pages'], state['page'], state['author'],
+                   embed_name=state['embed_name'], field_title=state['field_title'])
+
 
 class PaginateService(BaseService):
     """
@@ -56,8 +80,12 @@ class PaginateService(BaseService):
 
     def __init__(self, *, bot):
         super().__init__(bot)
-        self.messages = {}
+        repository = InteractiveMessageRepository() if bot_secrets.secrets.persist_interactive_messages else None
+        self.messages: PersistentMessageStore[Message] = PersistentMessageStore(
+            MESSAGE_KIND, Message, bot.reaction_filter, repository=repository)
         self.reactions = ["⏮️", "⬅️", "➡️", "⏭️"]
+        # the channel id of each pageable message with a timeout, by message id
+        self.expiries: TimerWheel[int, int] = TimerWheel()
 
     # Called When a cog would like to be able to paginate a message
     @BaseService.listener(Events.on_set_pageable_text)
@@ -83,7 +111,7 @@ class PaginateService(BaseService):
 
         # stores the message info
         message = Message(pages, 0, author.id if author else None, embed_name=embed_name, field_title=field_title)
-        self.messages[msg.id] = message
+        await self.messages.put(msg.id, msg.channel.id, message, timeout=timeout)
         await self.send_scroll_reactions(msg, author, timeout)
 
     @BaseService.listener(Events.on_set_pageable_embed)
@@ -104,57 +132,102 @@ class PaginateService(BaseService):
         msg = await channel.send(embed=pages[0])
         await self.bot.messenger.publish(Events.on_set_deletable, msg=msg, author=msg.author)
 
-        # stores the message info
-        message = Message(pages, 0, author.id if author else None)
-        self.messages[msg.id] = message
+        # stores the message info, the embeds are kept as dicts until their page is shown
+        message = Message([page.to_dict() for page in pages], 0, author.id if author else None)
+        await self.messages.put(msg.id, msg.channel.id, message, timeout=timeout)
         await self.send_scroll_reactions(msg, author, timeout)
 
+    @BaseService.listener(Events.on_set_pageable_source)
+    async def set_source_pageable(self, *,
+                                  source: PageSource,
+                                  page_count: int = None,
+                                  embed_name: str = None,
+                                  field_title: str = None,
+                                  author: discord.Member = None,
+                                  channel: discord.TextChannel,
+                                  timeout: int = 60):
+
+        # the pages are turned with buttons, so the view keeps the state instead of the message store
+        view = PaginatorView(source, page_count=page_count, author_id=author.id if author else None,
+                             embed_name=embed_name, field_title=field_title, timeout=timeout or None)
+        msg = await view.start(channel)
+        await self.bot.messenger.publish(Events.on_set_deletable, msg=msg, author=author)
+
     async def send_scroll_reactions(self, msg: discord.Message, author: discord.Member, timeout: int):
-        # add every emoji from the reaction list
-        for reaction in self.reactions:
-            await msg.add_reaction(reaction)
+        # add every emoji from the reaction list, without waiting for them to be added
+        self.bot.reaction_adder.add(msg, *self.reactions)
 
         await self.bot.messenger.publish(Events.on_set_deletable, msg=msg, author=author)
 
+        # the message is expired by the next sweep after the timeout, instead of a coroutine sleeping until then
         if timeout:
-            await asyncio.sleep(timeout)
-            try:
-                for reaction in self.reactions:
-                    await msg.clear_reaction(reaction)
-                del self.messages[msg.id]
-            except:
-                pass
-            finally:
-                log.info(f'Message: {msg.id} timed out as pageable')
-
-    @BaseService.listener(Events.on_reaction_add)
-    async def change_page(self, reaction: discord.Reaction, user: t.Union[discord.User, discord.Member]):
-
-        # check if emoji matches and user has perm to change page
-        if reaction.emoji not in self.reactions or reaction.message.id not in self.messages.keys():
+            self.expiries.add(msg.id, msg.channel.id, timeout)
+
+    async def expire_messages(self):
+        """
+        Removes the scroll reactions from every message whose timeout has passed since the last sweep
+        """
+        await self.messages.evict_expired()
+        if not (expired := self.expiries.expire()):
+            return
+        await self.messages.pop(message_id for message_id, _ in expired)
+
+        async def clear_scroll_reactions(msg: discord.PartialMessage):
+            for reaction in self.reactions:
+                await msg.clear_reaction(reaction)
+
+        # the message may have been deleted in the meantime, so failures are ignored
+        await map_concurrently(clear_scroll_reactions,
+                               [self.bot.get_partial_messageable(channel_id).get_partial_message(message_id)
+                                for message_id, channel_id in expired],
+                               concurrency=EXPIRY_CONCURRENCY)
+        log.info(f'{len(expired)} messages timed out as pageable')
+
+    @BaseService.listener(Events.on_raw_reaction_add)
+    async def change_page(self, payload: discord.RawReactionActionEvent):
+        # the raw event is used because on_reaction_add only fires for messages in discord.py's message cache,
+        # which is empty after a restart even though the state of the message is read back from the database
+        emoji = str(payload.emoji)
+        if payload.user_id == self.bot.user.id or emoji not in self.reactions:
+            return
+        if not (msg := await self.messages.get(payload.message_id)):
             return
 
-        msg = self.messages[reaction.message.id]
-
-        if not user.guild_permissions.administrator and not user.id == msg.author:
+        # check if the user has perm to change page, the member is only given for reactions in a guild
+        member = payload.member
+        if not (member and member.guild_permissions.administrator) and not payload.user_id == msg.author:
             return
 
         # check what emoji the user used
-        if reaction.emoji == "⏮️":
+        if emoji == "⏮️":
             if msg.curr_page_num != 0:
                 msg.curr_page_num = 0
-        elif reaction.emoji == "⬅️":
+        elif emoji == "⬅️":
             if msg.curr_page_num != 0:
                 msg.curr_page_num -= 1
-        elif reaction.emoji == "➡️":
+        elif emoji == "➡️":
             if msg.curr_page_num < len(msg.pages) - 1:
                 msg.curr_page_num += 1
-        elif reaction.emoji == "⏭️":
+        elif emoji == "⏭️":
             if msg.curr_page_num != len(msg.pages) - 1:
                 msg.curr_page_num = len(msg.pages) - 1
 
-        await reaction.message.edit(embed=msg.curr_content)
-        await reaction.message.remove_reaction(reaction.emoji, user)
+        message = self.bot.get_partial_messageable(payload.channel_id).get_partial_message(payload.message_id)
+        await message.edit(embed=msg.curr_content)
+        await self.messages.save(payload.message_id, msg)
+        await message.remove_reaction(payload.emoji, discord.Object(payload.user_id))
 
     async def load_service(self):
-        pass
+        # the timeouts of the messages persisted before a restart carry on, or expire on the first sweep
+        now = datetime.utcnow()
+        for message in await self.messages.load():
+            if expires := message.expires_date:
+                self.expiries.add(message.message_id, message.channel_id, max((expires - now).total_seconds(), 0))
+        # the sweep also evicts the state of messages without a timeout that have not been used for a long time
+        # a sweep that is still running when the next is due has already expired everything that was due
+        self.bot.scheduler.schedule_every(self.expire_messages, interval=EXPIRY_SWEEP_INTERVAL,
+                                          job_id=EXPIRY_JOB_ID, misfire=MisfirePolicy.skip)
+
+    async def unload_service(self):
+        if EXPIRY_JOB_ID in self.bot.scheduler:
+            self.bot.scheduler.cancel(EXPIRY_JOB_ID)
@@ -1,3 +1,6 @@
+import logging
+from collections import defaultdict
+
 import discord
 from discord import RawMessageDeleteEvent, RawReactionActionEvent
 
@@ -5,13 +8,27 @@ from bot.consts import Staff
 from bot.data.class_repository import ClassRepository
 from bot.data.pin_repository import PinRepository
 from bot.messaging.events import Events
+from bot.models.class_models import ClassPin
 from bot.services.base_service import BaseService
 from bot.sock_bot import SockBot
 from bot.utils.helpers import fetch_optional_message
+from bot.utils.scheduler import MisfirePolicy
+from bot.utils.worker_pool import map_concurrently
 
 PIN_REACTION = '📌'
 MIN_PIN_REACTIONS = 5
 MAX_PINS_PER_CHANNEL = 50
+# the json error code discord responds with when a channel already has the maximum number of pins
+MAX_PINS_ERROR_CODE = 30003
+# how many channels have their open pins checked at once on startup
+RECONCILE_CONCURRENCY = 5
+VOTE_RESYNC_JOB_ID = 'pin_vote_resync'
+# how often the votes counted in memory are recounted from the pin request messages in seconds
+VOTE_RESYNC_INTERVAL = 5 * 60
+# only requests this many votes or fewer away from being pinned are recounted
+VOTE_RESYNC_MARGIN = 1
+
+log = logging.getLogger(__name__)
 
 
 class PinService(BaseService):
@@ -20,6 +37,15 @@ class PinService(BaseService):
         super().__init__(bot)
         self.pin_repo = PinRepository()
         self.class_repo = ClassRepository()
+        self._reconcile_task = None
+        # the number of pin reactions on each pin request message voted on since startup
+        self.votes: dict[int, int] = {}
+        # the number of pinned messages in each channel a message was pinned in since startup
+        self.pin_counts: dict[int, int] = {}
+        # the sockbot and user message ids of every open pin request, reactions on other messages are ignored
+        self.open_pins = bot.reaction_filter.watched_set()
+        # the sockbot message ids of the pin requests being pinned, so a vote and a recount can not both pin one
+        self._pinning: set[int] = set()
 
     @BaseService.listener(Events.on_raw_reaction_add)
     async def on_raw_reaction(self, event: RawReactionActionEvent):
@@ -27,50 +53,151 @@ class PinService(BaseService):
         # which ends up missing a lot of reactions for messages that are not cached
         if event.member.bot or event.emoji.name != PIN_REACTION or event.event_type != 'REACTION_ADD':
             return
+        if event.message_id not in self.open_pins:
+            return
         if not (class_pin := await self.pin_repo.get_open_pin_from_message(event.message_id)):
             return
-
-        # fetch the channel, message, reaction
         if not (channel := self.bot.guild.get_channel(event.channel_id)):
             return
+
+        # check if one of our conditions is met to pin the message, votes are counted in memory so a vote
+        # only fetches the message once the count says it could be pinned
+        privileged = await self._is_privileged(event.channel_id, event.user_id)
+        if await self._count_vote(channel, event.message_id) < MIN_PIN_REACTIONS and not privileged:
+            return
         message = await channel.fetch_message(event.message_id)
-        react: discord.Reaction | None = None
-        for reaction in message.reactions:
-            if reaction.emoji == PIN_REACTION:
-                react = reaction
-                break
-        assert react is not None
-
-        # check if one of our conditions is met to pin the message
-        if react.count >= MIN_PIN_REACTIONS or await self._is_privileged(event.channel_id, event.user_id):
-            if not (to_pin := await fetch_optional_message(channel, class_pin.user_message_id)):
-                await message.delete()
-                await self.pin_repo.delete_pin(class_pin)
-                return
-            # check if we have enough space to pin
-            pinned_messages = await channel.pins()
-            # unpin the oldest pin if there is no room
-            if len(pinned_messages) == MAX_PINS_PER_CHANNEL:
-                await pinned_messages[-1].unpin(reason='Unpinned to make room.')
-            # pin the message, update the pin in the db, and delete sockbot's pin request embed
-            user = self.bot.get_user(class_pin.pin_requester)
-            reason = f'Pinned by vote, started by {str(user) if user else f"user with ID {class_pin.pin_requester}"}'
-            await to_pin.pin(reason=reason)
-            await self.pin_repo.set_pinned(class_pin)
-            await message.delete()
+        # the fetched message has the real count, which corrects any vote counted twice while it was seeded
+        self.votes[event.message_id] = votes = self._pin_reactions(message)
+        if votes < MIN_PIN_REACTIONS and not privileged:
+            return
+        await self._pin_request(channel, class_pin, message)
+
+    @BaseService.listener(Events.on_raw_reaction_remove)
+    async def on_raw_reaction_remove(self, event: RawReactionActionEvent):
+        # a request that has not been voted on since startup is counted from its message on the next vote
+        if event.emoji.name == PIN_REACTION and event.message_id in self.votes:
+            self.votes[event.message_id] -= 1
+
+    @BaseService.listener(Events.on_pin_request)
+    async def on_pin_request(self, class_pin: ClassPin):
+        self._open_request(class_pin)
 
     @BaseService.listener(Events.on_raw_message_delete)
     async def on_message_delete(self, payload: RawMessageDeleteEvent):
         # using the on_raw_message_delete event because on_message_delete ignores SockBot's messages being deleted
         # check if the message was in our db (either sockbot's embed or to-be-pinned message)
+        if payload.message_id not in self.open_pins:
+            return
         if not (class_pin := await self.pin_repo.get_open_pin_from_message(payload.message_id)):
             return
         await self.pin_repo.delete_pin(class_pin)
+        self._close_request(class_pin)
 
     @BaseService.listener(Events.on_guild_channel_delete)
     async def on_channel_delete(self, channel: discord.TextChannel):
-        for pin in await self.pin_repo.get_pins_from_channel(channel):
-            await self.pin_repo.delete_pin(pin)
+        pins = await self.pin_repo.get_pins_from_channel(channel)
+        await self.pin_repo.delete_pins(pins)
+        for class_pin in pins:
+            self._close_request(class_pin)
+        self.pin_counts.pop(channel.id, None)
+
+    async def resync_votes(self):
+        """
+        Recounts the votes of the pin requests that are close to being pinned from their messages, and pins the
+        requests that have enough votes. Raw reactions are queued in order, but reactions dropped from a full queue
+        are never counted, which could leave a request a vote short of being pinned until someone votes again
+        """
+        voted = [message_id for message_id, votes in self.votes.items()
+                 if MIN_PIN_REACTIONS - VOTE_RESYNC_MARGIN <= votes < MIN_PIN_REACTIONS]
+
+        async def resync(message_id: int):
+            if not (class_pin := await self.pin_repo.get_open_pin_from_message(message_id)):
+                self.votes.pop(message_id, None)
+                return
+            if not (channel := self.bot.guild.get_channel(class_pin.channel_id)):
+                return
+            if not (message := await fetch_optional_message(channel, message_id)):
+                return
+            self.votes[message_id] = self._pin_reactions(message)
+            if self.votes[message_id] >= MIN_PIN_REACTIONS:
+                await self._pin_request(channel, class_pin, message)
+
+        results = await map_concurrently(resync, voted, concurrency=RECONCILE_CONCURRENCY)
+        for message_id, result in zip(voted, results):
+            if isinstance(result, Exception):
+                log.error(f'Failed to recount the votes on pin request message {message_id}', exc_info=result)
+
+    async def _pin_request(self, channel: discord.TextChannel, class_pin: ClassPin, message: discord.Message) -> None:
+        """
+        Pins the message of a pin request that was voted on. The request is only closed once the message is
+        pinned and the pin is updated in the db, so a request that fails to pin is still voted on and recounted
+        """
+        if class_pin.sockbot_message_id not in self.open_pins or class_pin.sockbot_message_id in self._pinning:
+            return
+        self._pinning.add(class_pin.sockbot_message_id)
+        try:
+            if not (to_pin := await fetch_optional_message(channel, class_pin.user_message_id)):
+                await self.pin_repo.delete_pin(class_pin)
+                self._close_request(class_pin)
+                await message.delete()
+                return
+            # pin the message, update the pin in the db, and delete sockbot's pin request embed
+            user = self.bot.get_user(class_pin.pin_requester)
+            reason = f'Pinned by vote, started by {str(user) if user else f"user with ID {class_pin.pin_requester}"}'
+            await self._pin(channel, to_pin, reason)
+            await self.pin_repo.set_pinned(class_pin)
+            self._close_request(class_pin)
+            await message.delete()
+        finally:
+            self._pinning.discard(class_pin.sockbot_message_id)
+
+    async def _count_vote(self, channel: discord.TextChannel, message_id: int) -> int:
+        """
+        Counts a vote on a pin request and returns the number of votes it has.
+        The first vote on a request since startup seeds the count from the message, which already includes the vote.
+        """
+        if message_id in self.votes:
+            self.votes[message_id] += 1
+        else:
+            self.votes[message_id] = self._pin_reactions(await channel.fetch_message(message_id))
+        return self.votes[message_id]
+
+    def _open_request(self, class_pin: ClassPin) -> None:
+        self.open_pins.add(class_pin.sockbot_message_id)
+        self.open_pins.add(class_pin.user_message_id)
+
+    def _close_request(self, class_pin: ClassPin) -> None:
+        for message_id in (class_pin.sockbot_message_id, class_pin.user_message_id):
+            self.votes.pop(message_id, None)
+            self.open_pins.discard(message_id)
+
+    @staticmethod
+    def _pin_reactions(message: discord.Message) -> int:
+        return next((reaction.count for reaction in message.reactions if reaction.emoji == PIN_REACTION), 0)
+
+    async def _pin(self, channel: discord.TextChannel, message: discord.Message, reason: str) -> None:
+        """
+        Pins the given message, unpinning the oldest pin in the channel if there is no room.
+        The number of pins in each channel is cached, it is only read from discord once it might be full.
+        """
+        if self.pin_counts.get(channel.id, MAX_PINS_PER_CHANNEL) >= MAX_PINS_PER_CHANNEL:
+            await self._make_room(channel)
+        try:
+            await message.pin(reason=reason)
+        except discord.HTTPException as e:
+            # the channel was filled by pins made outside of the bot since the count was read
+            if e.code != MAX_PINS_ERROR_CODE:
+                raise
+            await self._make_room(channel)
+            await message.pin(reason=reason)
+        self.pin_counts[channel.id] += 1
+
+    async def _make_room(self, channel: discord.TextChannel) -> None:
+        pinned_messages = await channel.pins()
+        # unpin the oldest pin if there is no room
+        if len(pinned_messages) >= MAX_PINS_PER_CHANNEL:
+            await pinned_messages[-1].unpin(reason='Unpinned to make room.')
+        self.pin_counts[channel.id] = min(len(pinned_messages), MAX_PINS_PER_CHANNEL - 1)
 
     async def _is_privileged(self, channel: int, user: int) -> bool:
         """
@@ -87,19 +214,53 @@ class PinService(BaseService):
         return await self.class_repo.get_ta(user, channel) is not None
 
     async def load_service(self):
-        for class_pin in await self.pin_repo.get_open_pin_requests():
+        open_pins = await self.pin_repo.get_open_pin_requests()
+        for class_pin in open_pins:
+            self._open_request(class_pin)
+        # checking the open pins makes requests for every pin, so it runs in the background instead of blocking startup
+        self._reconcile_task = self.bot.scheduler.schedule_in(self.reconcile_pins(open_pins), time=0)
+        # a recount that is still running when the next is due already has the latest votes
+        self.bot.scheduler.schedule_every(self.resync_votes, interval=VOTE_RESYNC_INTERVAL,
+                                          job_id=VOTE_RESYNC_JOB_ID, misfire=MisfirePolicy.skip)
+
+    async def unload_service(self):
+        if self._reconcile_task in self.bot.scheduler:
+            self.bot.scheduler.cancel(self._reconcile_task)
+        if VOTE_RESYNC_JOB_ID in self.bot.scheduler:
+            self.bot.scheduler.cancel(VOTE_RESYNC_JOB_ID)
+
+    async def reconcile_pins(self, open_pins: list[ClassPin]):
+        """
+        Brings the given open pin requests up to date with the messages that changed while the bot was offline.
+        Messages are fetched for several channels at once, since each channel has its own rate limit,
+        and every change is committed in a single transaction at the end.
+        """
+        pins_by_channel: defaultdict[int, list[ClassPin]] = defaultdict(list)
+        for class_pin in open_pins:
+            pins_by_channel[class_pin.channel_id].append(class_pin)
+        deleted: list[ClassPin] = []
+        pinned: list[ClassPin] = []
+
+        async def reconcile_channel(channel_id: int):
             # make sure channel still exists
-            if not (channel := self.bot.guild.get_channel(class_pin.channel_id)):
-                await self.pin_repo.delete_pin(class_pin)
-                continue
-            # make sure that the embed sent by SockBot still exists
-            if not await fetch_optional_message(channel, class_pin.sockbot_message_id):
-                await self.pin_repo.delete_pin(class_pin)
-                continue
-            # make sure the message to-be-pinned still exists
-            if not (message := await fetch_optional_message(channel, class_pin.user_message_id)):
-                await self.pin_repo.delete_pin(class_pin)
-                continue
-            # if the message was pinned while we were offline, set it as pinned in the db
-            if message.pinned:
-                await self.pin_repo.set_pinned(class_pin)
+            if not (channel := self.bot.guild.get_channel(channel_id)):
+                deleted.extend(pins_by_channel[channel_id])
+                return
+            for class_pin in pins_by_channel[channel_id]:
+                # make sure that the embed sent by SockBot and the message to-be-pinned still exist
+                if not await fetch_optional_message(channel, class_pin.sockbot_message_id) \
+                        or not (message := await fetch_optional_message(channel, class_pin.user_message_id)):
+                    deleted.append(class_pin)
+                # if the message was pinned while we were offline, set it as pinned in the db
+                elif message.pinned:
+                    pinned.append(class_pin)
+
+        results = await map_concurrently(reconcile_channel, pins_by_channel, concurrency=RECONCILE_CONCURRENCY)
+        for channel_id, result in zip(pins_by_channel, results):
+            # pins that could not be checked are left open and checked again on the next start
+            if isinstance(result, Exception):
+                log.error(f'Failed to reconcile the pins in channel {channel_id}', exc_info=result)
+        await self.pin_repo.reconcile_pins(deleted, pinned)
+        for class_pin in deleted + pinned:
+            self._close_request(class_pin)
+        log.info(f'Reconciled open pins: {len(deleted)} deleted, {len(pinned)} pinned')
@@ -14,8 +14,13 @@ import bot.bot_secrets as bot_secrets
 import bot.cogs as cogs
 import bot.services as services
 from bot.consts import Colors
+from bot.data.base_repository import BaseRepository
 from bot.data.database import Database
 from bot.messaging.events import Events
+from bot.utils.loop_watchdog import LoopWatchdog
+from bot.utils.reaction_adder import ReactionAdder
+from bot.utils.reaction_filter import ReactionFilter
+from bot.utils.request_scheduler import RequestScheduler
 
 log = logging.getLogger(__name__)
 
@@ -33,7 +38,15 @@ class SockBot(commands.Bot):
         super().__init__(**kwargs)
 
         self.messenger = messenger
+        self.messenger.error_handler = self.on_listener_error
         self.scheduler = scheduler
+        self.watchdog = LoopWatchdog()
+        # discord REST requests of bulk guild changes, queued by rate limit bucket
+        self.requests = RequestScheduler()
+        # the reactions the bot adds to its messages, queued per channel through the request scheduler
+        self.reaction_adder = ReactionAdder(self.requests)
+        # the messages that services handle reactions on, reactions on every other message are not published
+        self.reaction_filter = ReactionFilter()
         self.guild: discord.Guild | None = None
         self.active_services = {}
 
@@ -42,15 +55,24 @@ class SockBot(commands.Bot):
         This is the entry point of the bot that is run after discord.py has finished its startup procedures.
         This is where services are loaded and the startup procedures for each service is run
         """
+        self.watchdog.start()
+        self.requests.start()
+
         await self.load_cogs()
 
         await Database().create_database()
+        # open the connection pool shared by every repository once the database exists
+        await BaseRepository.open_pool()
 
     async def on_ready(self) -> None:
         self.guild = self.guilds[0]
 
         await self.load_services()
 
+        # persisted jobs are loaded once every service has registered its job callbacks,
+        # missed jobs are caught up in the background so they do not hold up the slash command sync
+        await self.scheduler.load_jobs()
+
         # Sync slash commands - this does not sync commands GLOBALLY - just to self.guilds[0]
         log.info('Syncing slash commands...')
         self.tree.error(self.on_app_command_error)
@@ -86,6 +108,13 @@ class SockBot(commands.Bot):
             log.error(f'Logout error embed failed with error {e}')
 
         log.info('Shutdown started: logging close time')
+        await self.unload_services()
+        await self.reaction_adder.close()
+        await self.requests.close()
+        await self.messenger.close()
+        # services can write to the database while unloading, so the pool is closed after them
+        await BaseRepository.close_pool()
+        self.watchdog.stop()
         await super().close()
 
     async def on_message(self, message) -> None:
@@ -148,23 +177,29 @@ class SockBot(commands.Bot):
         await self.publish_with_error(Events.on_message_delete, message)
 
     async def on_raw_message_delete(self, payload):
+        self.reaction_adder.cancel(payload.message_id)
         if payload.cached_message is None:
             await self.publish_with_error(Events.on_raw_message_delete, payload)
 
     async def on_reaction_add(self, reaction: discord.Reaction, user: t.Union[discord.User, discord.Member]):
-        if user.id != self.user.id:
+        if user.id != self.user.id and self.reaction_filter.wants(reaction.message.id):
             await self.publish_with_error(Events.on_reaction_add, reaction, user)
 
     async def on_raw_reaction_add(self, reaction) -> None:
-        log.info(f'Reaction by {reaction.user_id} on message: {reaction.message_id}')
+        if not self.reaction_filter.wants(reaction.message_id):
+            return
+        log.debug(f'Reaction by {reaction.user_id} on message: {reaction.message_id}')
         await self.publish_with_error(Events.on_raw_reaction_add, reaction)
 
     async def on_reaction_remove(self, reaction: discord.Reaction, user: t.Union[discord.User, discord.Member]):
-        if user.id != self.user.id:
+        if user.id != self.user.id and self.reaction_filter.wants(reaction.message.id):
             await self.publish_with_error(Events.on_reaction_remove, reaction, user)
 
     async def on_raw_reaction_remove(self, reaction) -> None:
-        log.info(f'Reaction by {reaction.user_id} on message: {reaction.message_id}')
+        if not self.reaction_filter.wants(reaction.message_id):
+            return
+        log.debug(f'Reaction removed by {reaction.user_id} on message: {reaction.message_id}')
+        await self.publish_with_error(Events.on_raw_reaction_remove, reaction)
 
     async def on_member_update(self, before, after):
         await self.publish_with_error(Events.on_member_update, before, after)
@@ -176,6 +211,19 @@ class SockBot(commands.Bot):
             tb = traceback.format_exc()
             await self.global_error_handler(e, trace=tb)
 
+    async def on_listener_error(self, event: str, error: Exception):
+        """
+        Handler for messenger listener errors that could not be raised to the publisher,
+        such as errors from background listeners or from all but the first failed listener of an event
+
+        Args:
+            event (str): The event the failed listener was subscribed to
+            error (Exception): The unhandled exception
+        """
+        log.error(f'Listener for event: {event} failed')
+        tb = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+        await self.global_error_handler(error, trace=tb)
+
     async def on_command_error(self, ctx, error):
         """
         Handler for cog level errors, if a command throws and isnt handled
@@ -286,6 +334,14 @@ class SockBot(commands.Bot):
             await self.global_error_handler(e)
         self.active_services[service.__name__] = s
 
+    async def unload_services(self) -> None:
+        log.info('Unloading Services')
+        for name, s in self.active_services.items():
+            try:
+                await s.unload_service()
+            except Exception as e:
+                log.error(f'Unloading service: {name} failed with error {e}')
+
     async def load_services(self) -> None:
         log.info('Loading Services')
         # self.load_extension("Cogs.manage_classes")
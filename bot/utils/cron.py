@@ -0,0 +1,119 @@
+import bisect
+import typing as t
+from datetime import datetime, timedelta
+
+# the name, minimum and maximum value of each field of a cron expression in order
+FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 6),
+)
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+}
+
+# an expression that matches no date within this many days, like '0 0 30 2 *', is rejected
+MAX_SEARCH_DAYS = 366 * 5
+
+
+class CronExpression:
+    """
+    A standard five field cron expression, `minute hour day month weekday`, evaluated in UTC
+
+    Each field accepts `*`, single values, ranges `a-b`, steps `*/n` or `a-b/n` and comma separated lists
+    of those. Weekdays run from 0 for Sunday to 6 for Saturday, 7 is also accepted for Sunday. If both the day
+    and weekday fields are restricted a date matches when either of them does, like in cron
+    """
+
+    __slots__ = ('expression', 'minutes', 'hours', 'days', 'months', 'weekdays', '_day_or_weekday')
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        parts = ALIASES.get(expression.strip(), expression).split()
+        if len(parts) != len(FIELDS):
+            raise ValueError(f'Cron expression: {expression} must have {len(FIELDS)} fields')
+
+        fields = []
+        for part, (name, low, high) in zip(parts, FIELDS):
+            # sunday can be written as 7, it is folded into 0 after parsing
+            fields.append(_parse_field(part, name, low, 7 if name == 'weekday' else high))
+
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = tuple(sorted({w % 7 for w in weekdays}))
+        self._day_or_weekday = parts[2] != '*' and parts[4] != '*'
+
+    def __repr__(self) -> str:
+        return f'<CronExpression {self.expression}>'
+
+    def matches_day(self, date: datetime) -> bool:
+        if date.month not in self.months:
+            return False
+        day = date.day in self.days
+        # python weekdays start at monday, cron weekdays start at sunday
+        weekday = (date.weekday() + 1) % 7 in self.weekdays
+        return (day or weekday) if self._day_or_weekday else (day and weekday)
+
+    def next_after(self, time: datetime) -> datetime:
+        """Returns the first time matching the expression that is strictly after the given time"""
+        time = time.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = time.replace(hour=0, minute=0)
+
+        for _ in range(MAX_SEARCH_DAYS):
+            if self.matches_day(day):
+                # only the first day searched starts part way through, every later day starts at midnight
+                hour, minute = (time.hour, time.minute) if day < time else (0, 0)
+                if found := self._next_time_of_day(hour, minute):
+                    return day.replace(hour=found[0], minute=found[1])
+            day += timedelta(days=1)
+
+        raise ValueError(f'Cron expression: {self.expression} does not match any date')
+
+    def _next_time_of_day(self, hour: int, minute: int) -> t.Tuple[int, int] | None:
+        """Returns the first hour and minute matching the expression at or after the given hour and minute"""
+        i = bisect.bisect_left(self.hours, hour)
+        if i < len(self.hours) and self.hours[i] == hour:
+            j = bisect.bisect_left(self.minutes, minute)
+            if j < len(self.minutes):
+                return hour, self.minutes[j]
+            i += 1
+        if i < len(self.hours):
+            return self.hours[i], self.minutes[0]
+        return None
+
+
+def _parse_field(field: str, name: str, low: int, high: int) -> t.Tuple[int, ...]:
+    values = set()
+    for part in field.split(','):
+        value_range, _, step = part.partition('/')
+        if value_range == '*':
+            start, end = low, high
+        elif '-' in value_range:
+            start, _, end = value_range.partition('-')
+            start, end = _parse_int(start, name), _parse_int(end, name)
+        else:
+            start = end = _parse_int(value_range, name)
+            # a step on a single value, like 5/15, runs from that value to the end of the range
+            if step:
+                end = high
+
+        step = _parse_int(step, name) if step else 1
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f'Invalid {name} field in cron expression: {field}')
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+def _parse_int(value: str, name: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'Invalid {name} value in cron expression: {value}') from None
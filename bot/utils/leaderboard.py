@@ -0,0 +1,51 @@
+import bisect
+import typing as t
+
+
+class Leaderboard:
+    """
+    An in memory ranking of scores by user id
+
+    The entries are kept in a sorted array of (-score, user_id) so the highest score comes first and ties are
+    ordered by user id. Finding a rank is a binary search, reading the top n is a slice, and updating a score
+    is a binary search plus an insert into the array, whose memmove is negligible next to a database query
+    even for hundreds of thousands of users
+    """
+
+    __slots__ = ('_scores', '_ranked')
+
+    def __init__(self, scores: t.Iterable[t.Tuple[int, int]] = ()) -> None:
+        self._scores: t.Dict[int, int] = dict(scores)
+        self._ranked: t.List[t.Tuple[int, int]] = sorted((-score, user_id) for user_id, score in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._scores
+
+    def score(self, user_id: int) -> int | None:
+        return self._scores.get(user_id)
+
+    def set(self, user_id: int, score: int) -> None:
+        """Sets the score of a user, adding them to the leaderboard if they are not on it"""
+        if (old := self._scores.get(user_id)) is not None:
+            del self._ranked[bisect.bisect_left(self._ranked, (-old, user_id))]
+        self._scores[user_id] = score
+        bisect.insort(self._ranked, (-score, user_id))
+
+    def add(self, user_id: int, score: int) -> int:
+        """Adds to the score of a user and returns their new score"""
+        total = self._scores.get(user_id, 0) + score
+        self.set(user_id, total)
+        return total
+
+    def rank(self, user_id: int) -> int | None:
+        """Returns the 1 based rank of a user, or None if they are not on the leaderboard"""
+        if (score := self._scores.get(user_id)) is None:
+            return None
+        return bisect.bisect_left(self._ranked, (-score, user_id)) + 1
+
+    def top(self, n: int) -> t.List[t.Tuple[int, int]]:
+        """Returns the (user_id, score) of the n highest ranked users, highest first"""
+        return [(user_id, -score) for score, user_id in self._ranked[:n]]
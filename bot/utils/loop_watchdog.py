@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import typing as t
+
+from bot.messaging.metrics import LatencyHistogram
+
+log = logging.getLogger(__name__)
+
+# how often the event loop heartbeat runs and the monitor thread checks it, in seconds
+CHECK_INTERVAL = 0.25
+# how long the loop can go without a heartbeat before the blocking stack is captured, in seconds
+STALL_THRESHOLD = 0.5
+# the number of frames kept from a captured stack
+MAX_STACK_DEPTH = 15
+
+BOT_PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StallOffender:
+    """The aggregated stalls that were captured blocking the loop at the same line of code"""
+
+    __slots__ = ('location', 'stalls', 'total', 'longest', 'stack')
+
+    def __init__(self, location: str, stack: str) -> None:
+        self.location = location
+        self.stack = stack
+        self.stalls = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    def record(self, duration: float) -> None:
+        self.stalls += 1
+        self.total += duration
+        self.longest = max(self.longest, duration)
+
+    def snapshot(self) -> t.Dict[str, t.Any]:
+        return {
+            'location': self.location,
+            'stalls': self.stalls,
+            'total_ms': self.total * 1000,
+            'longest_ms': self.longest * 1000,
+            'stack': self.stack,
+        }
+
+
+class LoopWatchdog:
+    """
+    Measures event loop lag and finds the code that blocks the loop
+
+    A heartbeat task on the loop records how late each of its wake ups is, while a daemon
+    thread watches the heartbeat. If the heartbeat stops for longer than the stall threshold the
+    thread captures the stack of the loop thread, which is the code that is blocking it, and the
+    stall is aggregated against the innermost frame of the bot package in that stack
+    """
+
+    def __init__(self, *, interval: float = CHECK_INTERVAL, threshold: float = STALL_THRESHOLD) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = LatencyHistogram()
+
+        self._offenders: t.Dict[str, StallOffender] = {}
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        # the offender captured by the monitor thread for the stall that is currently in progress
+        self._stalled_on: StallOffender | None = None
+
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Starts watching the running event loop, this must be called from the loop thread"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        log.info(f'Loop watchdog started with a stall threshold of {self.threshold * 1000:.0f}ms')
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._task.cancel()
+        self._task = None
+        self._thread = None
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        """Returns the loop lag percentiles and the stall offenders, longest total stall time first"""
+        with self._lock:
+            offenders = sorted(self._offenders.values(), key=lambda o: o.total, reverse=True)
+            return {
+                'lag': self.lag.snapshot(),
+                'offenders': [o.snapshot() for o in offenders],
+            }
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lag.record(lag)
+
+            with self._lock:
+                self._last_beat = time.monotonic()
+                offender, self._stalled_on = self._stalled_on, None
+                if offender:
+                    offender.record(lag)
+
+            if offender:
+                log.warning(f'Event loop was blocked for {lag * 1000:.0f}ms at {offender.location}')
+
+    def _monitor(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                if self._stalled_on or time.monotonic() - self._last_beat < self.threshold:
+                    continue
+
+            if not (frame := sys._current_frames().get(self._loop_thread_id)):
+                continue
+            location, stack = self._describe(frame)
+            del frame
+
+            with self._lock:
+                if not (offender := self._offenders.get(location)):
+                    offender = self._offenders[location] = StallOffender(location, stack)
+                offender.stack = stack
+                self._stalled_on = offender
+
+    @staticmethod
+    def _describe(frame) -> t.Tuple[str, str]:
+        """
+        Formats the captured stack and picks the location it is aggregated by, which is the
+        innermost frame from the bot package, or the innermost frame if the bot is not on the stack
+        """
+        summary = traceback.extract_stack(frame, limit=MAX_STACK_DEPTH)
+        culprit = summary[-1]
+        for entry in reversed(summary):
+            if entry.filename.startswith(BOT_PACKAGE_PATH):
+                culprit = entry
+                break
+        location = f'{os.path.relpath(culprit.filename)}:{culprit.lineno} in {culprit.name}'
+        return location, ''.join(traceback.format_list(summary))
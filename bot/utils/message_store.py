@@ -0,0 +1,229 @@
+import json
+import time
+import typing as t
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from bot.models.interactive_message_models import InteractiveMessage
+from bot.utils.reaction_filter import ReactionFilter
+
+if t.TYPE_CHECKING:
+    from bot.data.interactive_message_repository import InteractiveMessageRepository
+
+V = t.TypeVar('V')
+P = t.TypeVar('P', bound='PersistableState')
+
+# the most entries a store holds before the least recently used are evicted
+DEFAULT_MAX_ENTRIES = 5000
+# how long an entry is kept without being used in seconds
+DEFAULT_TTL = 60 * 60 * 24
+# how long the persisted state of a message without a timeout is kept after it was last used
+PERSISTED_RETENTION = timedelta(days=7)
+# how often persisted state that is past its retention is deleted in seconds
+RETENTION_SWEEP_INTERVAL = 60 * 60
+
+
+class PersistableState(t.Protocol):
+    """State that can be converted to and from a json object, so it can be persisted"""
+
+    def to_state(self) -> t.Dict[str, t.Any]:
+        ...
+
+    @classmethod
+    def from_state(cls, state: t.Dict[str, t.Any]) -> 'PersistableState':
+        ...
+
+
+class MessageStateStore(t.Generic[V]):
+    """
+    The state of interactive messages by message id, bounded in size and in how long unused state is kept
+
+    Using an entry moves it to the back of the store and pushes its expiry back by the ttl, so the store
+    is ordered both by least recent use and by expiry, and both kinds of eviction only ever remove entries
+    from the front. The state should hold ids rather than discord models so an entry stays small, and every
+    message in the store is watched by the reaction filter it is given
+    """
+
+    def __init__(self, reaction_filter: ReactionFilter | None = None, *,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL) -> None:
+        if max_entries < 1 or ttl <= 0:
+            raise ValueError('A message state store needs room for an entry and a positive ttl')
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._filter = reaction_filter
+        # the state of each message with the monotonic time it expires at, least recently used first
+        self._entries: OrderedDict[int, t.Tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, message_id: int) -> bool:
+        return self.get(message_id, touch=False) is not None
+
+    def get(self, message_id: int, *, touch: bool = True) -> V | None:
+        """Returns the state of a message, and marks it as used unless touch is False"""
+        if (entry := self._entries.get(message_id)) is None:
+            self.misses += 1
+            return None
+        now = time.monotonic()
+        if entry[0] <= now:
+            self.evict_expired(now=now)
+            self.misses += 1
+            return None
+        self.hits += 1
+        if touch:
+            self._entries[message_id] = (now + self.ttl, entry[1])
+            self._entries.move_to_end(message_id)
+        return entry[1]
+
+    def put(self, message_id: int, state: V) -> None:
+        now = time.monotonic()
+        if message_id not in self._entries and self._filter is not None:
+            self._filter.watch(message_id)
+        self._entries[message_id] = (now + self.ttl, state)
+        self._entries.move_to_end(message_id)
+        self.evict_expired(now=now)
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+            self.evicted_lru += 1
+
+    def pop(self, message_id: int) -> V | None:
+        if (entry := self._entries.pop(message_id, None)) is None:
+            return None
+        if self._filter is not None:
+            self._filter.unwatch(message_id)
+        return entry[1]
+
+    def evict_expired(self, *, now: float | None = None) -> int:
+        """Evicts every entry that has not been used for longer than the ttl and returns how many were evicted"""
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        while self._entries and next(iter(self._entries.values()))[0] <= now:
+            self._evict_oldest()
+            evicted += 1
+        self.evicted_ttl += evicted
+        return evicted
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        return {
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evicted_lru': self.evicted_lru,
+            'evicted_ttl': self.evicted_ttl,
+        }
+
+    def _evict_oldest(self) -> None:
+        message_id, _ = self._entries.popitem(last=False)
+        if self._filter is not None:
+            self._filter.unwatch(message_id)
+
+
+class PersistentMessageStore(t.Generic[P]):
+    """
+    A message state store that also keeps the state of its messages in the database, so it survives a restart
+
+    The state of recently used messages is kept in memory in a `MessageStateStore`, and the state of every other
+    persisted message is only read back from the database when the message is used again. Every persisted message
+    stays watched by the reaction filter until its state is removed. Without a repository the store only keeps
+    state in memory
+    """
+
+    def __init__(self, kind: str, model: t.Type[P], reaction_filter: ReactionFilter | None = None, *,
+                 repository: t.Optional['InteractiveMessageRepository'] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL) -> None:
+        self.kind = kind
+        self.model = model
+        self.repository = repository
+        self.cache: MessageStateStore[P] = MessageStateStore(reaction_filter, max_entries=max_entries, ttl=ttl)
+        # the ids of every message with persisted state, whether or not it is in memory
+        self._persisted: t.MutableSet[int] = reaction_filter.watched_set() if reaction_filter is not None else set()
+        self._next_retention_sweep = 0.0
+        self.loaded = 0
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._persisted or message_id in self.cache
+
+    async def get(self, message_id: int) -> P | None:
+        """Returns the state of a message, reading it from the database if it is persisted but not in memory"""
+        if (state := self.cache.get(message_id)) is not None or message_id not in self._persisted:
+            return state
+        if (message := await self.repository.get_message(message_id, self.kind)) is None:
+            self._persisted.discard(message_id)
+            return None
+        state = self.model.from_state(message.state)
+        self.cache.put(message_id, state)
+        self.loaded += 1
+        return state
+
+    async def put(self, message_id: int, channel_id: int, state: P, *, timeout: float | None = None) -> None:
+        """Stores the state of a message, along with the time its reactions time out if it has a timeout"""
+        self.cache.put(message_id, state)
+        if self.repository is None:
+            return
+        now = datetime.utcnow()
+        expires_at = _format(now + timedelta(seconds=timeout)) if timeout else None
+        self._persisted.add(message_id)
+        await self.repository.upsert_message(InteractiveMessage(message_id, channel_id, self.kind,
+                                                                json.dumps(state.to_state()), expires_at,
+                                                                _format(now)))
+
+    async def save(self, message_id: int, state: P) -> None:
+        """Persists a change to the state of a message"""
+        if self.repository is not None and message_id in self._persisted:
+            await self.repository.update_state(message_id, self.kind, json.dumps(state.to_state()),
+                                               _format(datetime.utcnow()))
+
+    async def pop(self, message_ids: t.Iterable[int]) -> None:
+        """Removes the state of the messages from memory and from the database"""
+        persisted = []
+        for message_id in message_ids:
+            self.cache.pop(message_id)
+            if message_id in self._persisted:
+                self._persisted.discard(message_id)
+                persisted.append(message_id)
+        if persisted:
+            await self.repository.delete_messages(persisted, self.kind)
+
+    async def load(self) -> t.List[InteractiveMessage]:
+        """
+        Watches every persisted message, this should be called on startup. The messages are returned without
+        their state, so the timeouts of the messages can be restarted without reading every state
+        """
+        if self.repository is None:
+            return []
+        await self.evict_expired()
+        messages = await self.repository.get_messages(self.kind)
+        for message in messages:
+            self._persisted.add(message.message_id)
+        return messages
+
+    async def evict_expired(self) -> None:
+        """
+        Evicts the state that has not been used for longer than the ttl from memory, and at most once every
+        `RETENTION_SWEEP_INTERVAL` deletes the persisted state that has not been used for `PERSISTED_RETENTION`
+        """
+        self.cache.evict_expired()
+        if self.repository is None or time.monotonic() < self._next_retention_sweep:
+            return
+        self._next_retention_sweep = time.monotonic() + RETENTION_SWEEP_INTERVAL
+        used_before = _format(datetime.utcnow() - PERSISTED_RETENTION)
+        for message_id in await self.repository.delete_unused_messages(self.kind, used_before):
+            self._persisted.discard(message_id)
+            self.cache.pop(message_id)
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        return self.cache.stats() | {'persisted': len(self._persisted), 'loaded': self.loaded}
+
+
+def _format(time: datetime) -> str:
+    return time.isoformat(sep=' ', timespec='seconds')
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import typing as t
+from collections import OrderedDict
+
+import discord
+from discord.ext.commands.errors import BadArgument
+
+from bot.consts import Colors
+
+log = logging.getLogger(__name__)
+
+# an async callable that renders the page at an index, or returns None if there is no page at the index
+PageSource = t.Callable[[int], t.Awaitable[t.Union[discord.Embed, str, None]]]
+
+# how many rendered pages a paginator keeps, so turning back and forth does not render them again
+DEFAULT_CACHE_SIZE = 5
+# discord fails an interaction that is not answered within 3 seconds, so slower pages are deferred
+RESPONSE_DEADLINE = 2.5
+
+
+class PaginatorView(discord.ui.View):
+    """
+    A paginator that turns pages with buttons and renders each page only when it is shown
+
+    Pages come from an async source called with the index of the page, so they can be built or fetched on demand
+    instead of all up front, and the last few rendered pages are cached. A turn edits the message through the
+    interaction response in a single request, where a reaction paginator also has to remove the reaction. Without
+    a page count the paginator turns pages until the source returns None, and the last page button is disabled
+    """
+
+    def __init__(self, source: PageSource, *,
+                 page_count: int | None = None,
+                 author_id: int | None = None,
+                 embed_name: str | None = None,
+                 field_title: str | None = None,
+                 timeout: float | None = 60,
+                 cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        super().__init__(timeout=timeout)
+        self.source = source
+        self.page_count = page_count
+        self.author_id = author_id
+        self.embed_name = embed_name
+        self.field_title = field_title
+        self.page = 0
+        self.message: discord.Message | None = None
+        self.cache_size = cache_size
+        # the rendered pages by index, least recently shown first
+        self._cache: OrderedDict[int, t.Union[discord.Embed, str]] = OrderedDict()
+
+    async def start(self, channel: discord.abc.Messageable) -> discord.Message:
+        """Renders the first page and sends it with the page buttons"""
+        if (page := await self._render(0)) is None:
+            raise BadArgument('A paginator needs at least one page')
+        self._update_buttons()
+        self.message = await channel.send(embed=self._content(0, page), view=self)
+        return self.message
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        user = interaction.user
+        if self.author_id is None or user.id == self.author_id or \
+                isinstance(user, discord.Member) and user.guild_permissions.administrator:
+            return True
+        # the interaction is still acknowledged so the user is not shown an error
+        await interaction.response.defer()
+        return False
+
+    async def on_timeout(self) -> None:
+        if self.message is None:
+            return
+        try:
+            await self.message.edit(view=None)
+        except discord.HTTPException as e:
+            log.info(f'Failed to remove the buttons of timed out paginator {self.message.id}: {e}')
+
+    @discord.ui.button(emoji='⏮️', style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, 0)
+
+    @discord.ui.button(emoji='⬅️', style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, self.page - 1)
+
+    @discord.ui.button(emoji='➡️', style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, self.page + 1)
+
+    @discord.ui.button(emoji='⏭️', style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.page_count is not None:
+            await self.turn(interaction, self.page_count - 1)
+
+    async def turn(self, interaction: discord.Interaction, page: int) -> None:
+        """Shows the page at the index, answering the interaction with the edit"""
+        render = asyncio.ensure_future(self._render(page))
+        try:
+            rendered = await asyncio.wait_for(asyncio.shield(render), RESPONSE_DEADLINE)
+        except asyncio.TimeoutError:
+            await interaction.response.defer()
+            rendered = await render
+
+        if rendered is None:
+            # the source ran out of pages, so the page before is the last one
+            if self.page_count is None and page > self.page:
+                self.page_count = page
+            self._update_buttons()
+            await self._respond(interaction, view=self)
+            return
+
+        self.page = page
+        self._update_buttons()
+        await self._respond(interaction, embed=self._content(page, rendered), view=self)
+
+    async def _respond(self, interaction: discord.Interaction, **kwargs: t.Any) -> None:
+        if interaction.response.is_done():
+            await interaction.edit_original_response(**kwargs)
+        else:
+            await interaction.response.edit_message(**kwargs)
+
+    async def _render(self, page: int) -> t.Union[discord.Embed, str, None]:
+        if page < 0 or self.page_count is not None and page >= self.page_count:
+            return None
+        if (rendered := self._cache.get(page)) is not None:
+            self._cache.move_to_end(page)
+            return rendered
+        if (rendered := await self.source(page)) is None:
+            return None
+        self._cache[page] = rendered
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return rendered
+
+    def _content(self, page: int, rendered: t.Union[discord.Embed, str]) -> discord.Embed:
+        if isinstance(rendered, discord.Embed):
+            embed = rendered
+        else:
+            embed = discord.Embed(title=self.embed_name, color=Colors.Purple)
+            embed.add_field(name=self.field_title, value=rendered)
+        total = f' of {self.page_count}' if self.page_count is not None else ''
+        embed.set_footer(text=f'Page {page + 1}{total}')
+        return embed
+
+    def _update_buttons(self) -> None:
+        is_last = self.page_count is not None and self.page >= self.page_count - 1
+        self.first_page.disabled = self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = is_last
+        self.last_page.disabled = self.page_count is None or is_last
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+import typing as t
+from functools import partial
+
+import discord
+
+from bot.messaging.metrics import LatencyHistogram
+from bot.utils.request_scheduler import RequestScheduler
+
+log = logging.getLogger(__name__)
+
+# the discord error code of a request on a message that was deleted
+UNKNOWN_MESSAGE_ERROR_CODE = 10008
+
+Emoji = t.Union[discord.Emoji, discord.PartialEmoji, discord.Reaction, str]
+
+
+def reaction_bucket(channel: discord.abc.Messageable | int) -> t.Tuple[str, int]:
+    """The bucket of the reactions the bot adds in a channel, discord rate limits them per channel"""
+    return 'reactions', channel if isinstance(channel, int) else channel.id
+
+
+class ReactionAdder:
+    """
+    Adds the reactions of messages in the background through the request scheduler
+
+    Every reaction of a message is queued at once in the reaction bucket of its channel, so they are added back
+    to back and in order while the reactions of messages in other channels are added at the same time. Callers
+    only wait for the reactions if they await the returned task, the pending reactions of a message are cancelled
+    when it is deleted, and the time from queueing to the last reaction being added is recorded per message
+    """
+
+    def __init__(self, requests: RequestScheduler) -> None:
+        self._requests = requests
+        # the queued reaction requests of each message, until they are added or cancelled
+        self._pending: t.Dict[int, t.List[asyncio.Future]] = {}
+        self._tasks: t.Set[asyncio.Task] = set()
+        self.timings = LatencyHistogram()
+        self.added = 0
+        self.cancelled = 0
+
+    @property
+    def pending(self) -> int:
+        """The number of messages with reactions waiting to be added"""
+        return len(self._pending)
+
+    def add(self, message: discord.Message | discord.PartialMessage, *emojis: Emoji) -> asyncio.Task:
+        """
+        Queues reactions to be added to a message in the given order
+
+        Returns:
+            asyncio.Task: The task adding the reactions, it can be awaited to wait until they are added
+        """
+        bucket = reaction_bucket(message.channel)
+        # every reaction is queued before the first one is added, the bucket adds them in order
+        requests = [self._requests.enqueue(bucket, partial(message.add_reaction, emoji)) for emoji in emojis]
+        self._pending.setdefault(message.id, []).extend(requests)
+        task = asyncio.create_task(self._wait(message, requests))
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: self._done(message.id, requests, done))
+        return task
+
+    def cancel(self, message_id: int) -> None:
+        """Cancels the reactions of a message that were not added yet"""
+        self._cancel_requests(self._pending.pop(message_id, []))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pending.clear()
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        timings = self.timings.snapshot()
+        return {
+            'pending': self.pending,
+            'added': self.added,
+            'cancelled': self.cancelled,
+            'messages': timings['calls'],
+            'failed': timings['errors'],
+            'p50_ms': timings['p50_ms'],
+            'p95_ms': timings['p95_ms'],
+            'p99_ms': timings['p99_ms'],
+        }
+
+    async def _wait(self, message: discord.Message | discord.PartialMessage, requests: t.List[asyncio.Future]) -> None:
+        start = time.perf_counter()
+        failed = False
+        try:
+            for request in requests:
+                try:
+                    await request
+                    self.added += 1
+                except discord.HTTPException as e:
+                    failed = True
+                    if e.code == UNKNOWN_MESSAGE_ERROR_CODE:
+                        # the message was deleted, so none of the reactions left can be added
+                        self._cancel_requests(requests)
+                        break
+                    log.warning(f'Failed to add a reaction to message {message.id}: {e}')
+        except asyncio.CancelledError:
+            self._cancel_requests(requests)
+            raise
+        self.timings.record(time.perf_counter() - start, failed)
+
+    def _cancel_requests(self, requests: t.List[asyncio.Future]) -> None:
+        # a reaction that is already being added can not be stopped and is still added
+        self.cancelled += sum(request.cancel() for request in requests)
+
+    def _done(self, message_id: int, requests: t.List[asyncio.Future], task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if (pending := self._pending.get(message_id)) is not None:
+            pending[:] = [request for request in pending if request not in requests]
+            if not pending:
+                del self._pending[message_id]
+        if not task.cancelled() and (e := task.exception()):
+            log.error(f'Adding the reactions of message {message_id} raised an exception', exc_info=e)
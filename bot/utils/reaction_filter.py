@@ -0,0 +1,81 @@
+import typing as t
+from collections.abc import MutableSet
+
+
+class ReactionFilter:
+    """
+    The ids of the messages that a service reacts to reactions on
+
+    Every reaction in the guild is checked against the filter before it is published, so the listeners and
+    the queries they make only run for the few messages that have open pin requests, delete or page reactions
+    or class role reactions. Services keep their messages in a `watched_set` of the filter, or a store that
+    watches its messages, which keep the filter up to date as messages are added and removed. A message watched
+    by more than one service stays in the filter until every one of them stops watching it
+    """
+
+    def __init__(self) -> None:
+        self._watchers: t.Dict[int, int] = {}
+        self.passed = 0
+        self.filtered = 0
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._watchers
+
+    def __len__(self) -> int:
+        return len(self._watchers)
+
+    def watch(self, message_id: int) -> None:
+        self._watchers[message_id] = self._watchers.get(message_id, 0) + 1
+
+    def unwatch(self, message_id: int) -> None:
+        if (watchers := self._watchers.get(message_id, 0)) <= 1:
+            self._watchers.pop(message_id, None)
+        else:
+            self._watchers[message_id] = watchers - 1
+
+    def wants(self, message_id: int) -> bool:
+        """Returns whether a reaction on the message should be published, and counts the result"""
+        if message_id in self._watchers:
+            self.passed += 1
+            return True
+        self.filtered += 1
+        return False
+
+    def watched_set(self) -> 'WatchedSet':
+        return WatchedSet(self)
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        total = self.passed + self.filtered
+        return {
+            'watched': len(self._watchers),
+            'passed': self.passed,
+            'filtered': self.filtered,
+            'filter_rate': self.filtered / total if total else 0.0,
+        }
+
+
+class WatchedSet(MutableSet):
+    """A set of message ids that are watched by a reaction filter while they are in the set"""
+
+    def __init__(self, reaction_filter: ReactionFilter) -> None:
+        self._filter = reaction_filter
+        self._ids: t.Set[int] = set()
+
+    def __contains__(self, message_id: object) -> bool:
+        return message_id in self._ids
+
+    def __iter__(self) -> t.Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, message_id: int) -> None:
+        if message_id not in self._ids:
+            self._ids.add(message_id)
+            self._filter.watch(message_id)
+
+    def discard(self, message_id: int) -> None:
+        if message_id in self._ids:
+            self._ids.remove(message_id)
+            self._filter.unwatch(message_id)
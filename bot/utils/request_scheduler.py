@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import typing as t
+from collections import deque
+
+import discord
+
+log = logging.getLogger(__name__)
+
+T = t.TypeVar('T')
+
+# the number of requests running at once across every bucket
+DEFAULT_CONCURRENCY = 8
+# how many times a request that raised discord.RateLimited is retried before the exception is raised,
+# discord.py only raises it for rate limits longer than the client's max_ratelimit_timeout
+MAX_RATE_LIMIT_RETRIES = 3
+# discord.py logs every 429 it receives to this logger before it retries the request itself
+DISCORD_HTTP_LOGGER = 'discord.http'
+
+
+def guild_bucket(guild: discord.Guild | int, resource: str) -> t.Tuple[str, int, str]:
+    """The bucket of requests that mutate a resource of a guild, like creating or editing its roles"""
+    return 'guild', guild if isinstance(guild, int) else guild.id, resource
+
+
+def channel_bucket(channel: discord.abc.GuildChannel | int) -> t.Tuple[str, int]:
+    """The bucket of requests that mutate a single channel, like moving it or editing its permissions"""
+    return 'channel', channel if isinstance(channel, int) else channel.id
+
+
+class _RateLimitCounter(logging.Filter):
+    """Counts the 429 responses discord.py logs without changing what is logged"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith('We are being rate limited'):
+            self.count += 1
+        return True
+
+
+class RequestScheduler:
+    """
+    Runs discord REST requests in order within a bucket and in parallel across buckets
+
+    Discord rate limits requests per route and major parameter, like the guild of a role or the channel being
+    edited, so requests that share a bucket are queued and run one at a time in the order they were submitted,
+    while requests in different buckets run at the same time up to a concurrency limit. A bulk operation can
+    submit every request up front and finish in the time the busiest bucket allows, instead of waiting out the
+    rate limit of each route in turn
+    """
+
+    def __init__(self, *, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        if concurrency < 1:
+            raise ValueError('Concurrency must be at least one')
+
+        self._queues: t.Dict[t.Hashable, t.Deque[t.Tuple[t.Callable[[], t.Awaitable], asyncio.Future]]] = {}
+        self._drains: t.Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._rate_limits = _RateLimitCounter()
+        self.concurrency = concurrency
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self) -> None:
+        """Starts counting the rate limits discord.py handles on its own"""
+        logging.getLogger(DISCORD_HTTP_LOGGER).addFilter(self._rate_limits)
+
+    async def close(self) -> None:
+        """Cancels every queued request and stops counting rate limits"""
+        logging.getLogger(DISCORD_HTTP_LOGGER).removeFilter(self._rate_limits)
+        # the queued requests are cancelled first, a cancelled drain removes its queue
+        for queue in self._queues.values():
+            for _, future in queue:
+                future.cancel()
+        self._queues.clear()
+        for drain in self._drains:
+            drain.cancel()
+        await asyncio.gather(*self._drains, return_exceptions=True)
+
+    @property
+    def depth(self) -> int:
+        """The number of requests waiting to run"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def submit(self, bucket: t.Hashable, request: t.Callable[[], t.Awaitable[T]]) -> T:
+        """
+        Queues a request in a bucket and waits for its result
+
+        Args:
+            bucket (Hashable): The rate limit bucket of the request, see `guild_bucket` and `channel_bucket`
+
+            request (Callable): A function returning the coroutine that makes the request, it is called
+            when the request reaches the front of its bucket
+
+        Returns:
+            The result of the request, if the request raises the exception is raised here
+        """
+        return await self.enqueue(bucket, request)
+
+    def enqueue(self, bucket: t.Hashable, request: t.Callable[[], t.Awaitable[T]]) -> asyncio.Future:
+        """
+        Queues a request in a bucket without waiting for it, see `submit`
+
+        Returns:
+            asyncio.Future: The future of the result of the request, cancelling it before the request reaches
+            the front of its bucket drops the request
+        """
+        future = asyncio.get_running_loop().create_future()
+        if (queue := self._queues.get(bucket)) is None:
+            queue = self._queues[bucket] = deque()
+            drain = asyncio.create_task(self._drain(bucket, queue))
+            self._drains.add(drain)
+            drain.add_done_callback(self._drains.discard)
+        queue.append((request, future))
+        return future
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        return {
+            'depth': self.depth,
+            'buckets': len(self._queues),
+            'running': self.running,
+            'concurrency': self.concurrency,
+            'completed': self.completed,
+            'failed': self.failed,
+            'retried': self.retried,
+            'rate_limited': self._rate_limits.count,
+        }
+
+    async def _drain(self, bucket: t.Hashable, queue: t.Deque) -> None:
+        """Runs the requests of a bucket in order until it is empty"""
+        try:
+            while queue:
+                request, future = queue.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    async with self._semaphore:
+                        result = await self._run(request)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    self.failed += 1
+                    if not future.cancelled():
+                        future.set_exception(e)
+                    continue
+                self.completed += 1
+                if not future.cancelled():
+                    future.set_result(result)
+        finally:
+            self._queues.pop(bucket, None)
+
+    async def _run(self, request: t.Callable[[], t.Awaitable[T]]) -> T:
+        self.running += 1
+        try:
+            return await self._call(request)
+        finally:
+            self.running -= 1
+
+    async def _call(self, request: t.Callable[[], t.Awaitable[T]]) -> T:
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            try:
+                return await request()
+            except discord.RateLimited as e:
+                if attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                # the rest of the bucket waits behind this request, so its order is kept
+                self.retried += 1
+                log.warning(f'Request was rate limited, retrying in {e.retry_after:.2f}s')
+                await asyncio.sleep(e.retry_after)
@@ -1,24 +1,132 @@
 import asyncio
-import contextlib
+import heapq
 import inspect
+import itertools
+import json
 import logging
+import random
 import typing as t
 import uuid
 from datetime import datetime
+from enum import Enum, auto
 from functools import partial
 from uuid import uuid4
 
 from discord.ext.commands.errors import BadArgument
 
-log = logging.getLogger(__name__)
+from bot.models.scheduler_models import ScheduledJob
+from bot.utils.cron import CronExpression
 
+if t.TYPE_CHECKING:
+    from bot.data.scheduler_repository import SchedulerRepository
 
-class Scheduler:
+log = logging.getLogger(__name__)
 
-    def __init__(self) -> None:
-        self._scheduled_tasks: t.Dict[t.Hashable, asyncio.Task] = {}
+# the heap is only rebuilt once cancelled entries make up more than half of it,
+# and never for small heaps where lazily skipping them is cheaper
+COMPACT_MIN_SIZE = 1024
+# the most missed runs of a recurring job that are caught up at once
+MAX_CATCH_UP_RUNS = 100
+
+
+class MisfirePolicy(Enum):
+    """
+    Defines what happens to the runs of a recurring job that are missed, either because the loop was late by
+    more than a whole period or because the job was already running at its maximum concurrency
+    """
+
+    # missed runs are dropped, the job only runs at its next due time that it is free for
+    skip = auto()
+    # all missed runs are merged into a single run, started as soon as the job is free
+    coalesce = auto()
+    # every missed run is started as soon as the job is free, up to MAX_CATCH_UP_RUNS at once
+    catch_up = auto()
+
+
+class ScheduledTask:
+    """A coroutine waiting in the scheduler heap for its due time"""
+
+    __slots__ = ('task_id', 'when', 'coro', 'cancelled')
+
+    def __init__(self, task_id: t.Hashable, when: float, coro: t.Awaitable) -> None:
+        self.task_id = task_id
+        # the due time in event loop time
+        self.when = when
+        self.coro = coro
+        self.cancelled = False
+
+    def __repr__(self) -> str:
+        return f'<ScheduledTask id={self.task_id} when={self.when} cancelled={self.cancelled}>'
+
+
+class RecurringJob:
+    """A coroutine function that the scheduler runs on an interval or a cron expression until it is cancelled"""
+
+    __slots__ = ('task_id', 'when', 'callback', 'interval', 'cron', 'due', 'misfire', 'jitter',
+                 'max_concurrency', 'running', 'pending', 'cancelled')
+
+    def __init__(self,
+                 task_id: t.Hashable,
+                 callback: t.Callable[[], t.Awaitable],
+                 *,
+                 interval: float | None,
+                 cron: CronExpression | None,
+                 misfire: MisfirePolicy,
+                 jitter: float,
+                 max_concurrency: int) -> None:
+        self.task_id = task_id
+        # the nominal due time of the next run in event loop time, jitter is never added to it so it does not drift
+        self.when = 0.0
+        self.callback = callback
+        self.interval = interval
+        self.cron = cron
+        # the nominal due time of the next run of a cron job in UTC
+        self.due: datetime | None = None
+        self.misfire = misfire
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        # the number of runs that are due but waiting for the job to be free
+        self.pending = 0
+        self.cancelled = False
+
+    def __repr__(self) -> str:
+        trigger = self.cron or f'every {self.interval}s'
+        return f'<RecurringJob id={self.task_id} trigger={trigger} running={self.running} cancelled={self.cancelled}>'
 
-    def schedule_at(self, callback: t.Awaitable, *, time: datetime) -> uuid4:
+
+class Scheduler:
+    """
+    Schedules coroutines to be run at a later time
+
+    Pending coroutines are kept in a min heap ordered by due time and a single event loop timer
+    is armed for the earliest one, so scheduling and cancelling are O(log n) and O(1) and no task
+    exists for a coroutine until it is due
+
+    If the scheduler is given a job store, jobs scheduled by the name of a registered callback are also
+    persisted to the database so they survive a restart, see `schedule_job_at` and `load_jobs`
+    """
+
+    def __init__(self, store: t.Optional['SchedulerRepository'] = None) -> None:
+        self._scheduled_tasks: t.Dict[t.Hashable, ScheduledTask | RecurringJob] = {}
+        # a recurring job has a single entry in the heap at a time, for its next run
+        self._heap: t.List[t.Tuple[float, int, ScheduledTask | RecurringJob]] = []
+        # breaks ties between tasks due at the same time so they run in the order they were scheduled
+        self._counter = itertools.count()
+        self._cancelled = 0
+
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: t.Set[asyncio.Task] = set()
+        # scheduled tasks that have started by id, until they finish so they can still be cancelled
+        self._started: t.Dict[t.Hashable, asyncio.Task] = {}
+
+        self.store = store
+        # the coroutine functions persisted jobs are run with, by job name
+        self._job_callbacks: t.Dict[str, t.Callable[..., t.Awaitable]] = {}
+        # the ids of jobs persisted by `persist_job` whose work is still running, until they are cancelled
+        self._in_progress: t.Set[str] = set()
+
+    def schedule_at(self, callback: t.Awaitable, *, time: datetime, task_id: t.Hashable | None = None) -> uuid4:
         """Schedules a callback for execution at a given datetime object
 
         Args:
@@ -28,13 +136,15 @@ class Scheduler:
             time (datetime): The datetime object that specifies the date to execute the given
             callback
 
+            task_id (t.Hashable, optional): Id of the task, a task already scheduled with the id is replaced
+
         Raises:
 
             BadArgument:
 
         Returns:
 
-            uuid: Unique Identifier for the scheduled task 
+            uuid: Unique Identifier for the scheduled task
         """
 
         delay_time = (time - datetime.utcnow()).total_seconds()
@@ -44,9 +154,13 @@ class Scheduler:
         if callback is None:
             raise BadArgument('Scheduled callback was none')
 
-        return self._schedule(delay_time, callback)
+        return self._schedule(delay_time, callback, task_id)
 
-    def schedule_in(self, callback: t.Awaitable, *, time: t.Union[int, float]) -> uuid:
+    def schedule_in(self,
+                    callback: t.Awaitable,
+                    *,
+                    time: t.Union[int, float],
+                    task_id: t.Hashable | None = None) -> uuid:
         """Schedules a callback for exection in a given number of seconds
 
         Args:
@@ -56,13 +170,15 @@ class Scheduler:
             time (t.Union[int, float]): Time in seconds to wait before executing
             the given callback
 
+            task_id (t.Hashable, optional): Id of the task, a task already scheduled with the id is replaced
+
         Raises:
 
             BadArgument:
 
         Returns:
 
-            uuid: Unique Identifier for the scheduled task 
+            uuid: Unique Identifier for the scheduled task
         """
 
         if callback is None:
@@ -71,66 +187,421 @@ class Scheduler:
         if time < 0:
             raise BadArgument('Scheduled task contained invalid negative time')
 
-        return self._schedule(time, callback)
+        return self._schedule(time, callback, task_id)
 
-    def get_task(self, task_id: int) -> t.Union[None, uuid.uuid4]:
-        if task_id in self._scheduled_tasks.keys():
-            return self._scheduled_tasks[task_id]
-        return None
+    def schedule_every(self,
+                       callback: t.Callable[[], t.Awaitable],
+                       *,
+                       interval: t.Union[int, float],
+                       job_id: t.Hashable | None = None,
+                       misfire: MisfirePolicy = MisfirePolicy.coalesce,
+                       jitter: t.Union[int, float] = 0,
+                       max_concurrency: int = 1) -> t.Hashable:
+        """Schedules a coroutine function to be run every given number of seconds until it is cancelled
 
-    def __contains__(self, task_id: t.Hashable) -> bool:
-        """Return True if a task with the given `task_id` is currently scheduled."""
-        return task_id in self._scheduled_tasks
+        Args:
 
-    def cancel(self, task_id):
+            callback (t.Callable[[], t.Awaitable]): The coroutine function called for every run
+
+            interval (t.Union[int, float]): Time in seconds between runs, the first run is one interval from now
+
+            job_id (t.Hashable, optional): Id of the job, a job already scheduled with the id is replaced
+
+            misfire (MisfirePolicy): What to do with runs that are missed
+
+            jitter (t.Union[int, float]): The maximum random delay in seconds added to each run so that
+            jobs with the same interval do not all run at once
+
+            max_concurrency (int): The maximum number of runs of the job that can be running at once
+
+        Raises:
+
+            BadArgument:
+
+        Returns:
+
+            t.Hashable: The id of the job
+        """
+        if interval <= 0:
+            raise BadArgument('Recurring task interval must be positive')
+
+        job = self._recurring_job(callback, job_id, interval=interval, cron=None, misfire=misfire,
+                                  jitter=jitter, max_concurrency=max_concurrency)
+        job.when = asyncio.get_running_loop().time() + interval
+        return self._schedule_recurring(job)
+
+    def schedule_cron(self,
+                      callback: t.Callable[[], t.Awaitable],
+                      *,
+                      cron: str,
+                      job_id: t.Hashable | None = None,
+                      misfire: MisfirePolicy = MisfirePolicy.coalesce,
+                      jitter: t.Union[int, float] = 0,
+                      max_concurrency: int = 1) -> t.Hashable:
+        """Schedules a coroutine function to be run at every UTC time matching a cron expression until it is cancelled
+
+        Args:
+
+            callback (t.Callable[[], t.Awaitable]): The coroutine function called for every run
+
+            cron (str): The five field cron expression, see CronExpression
+
+            job_id (t.Hashable, optional): Id of the job, a job already scheduled with the id is replaced
+
+            misfire (MisfirePolicy): What to do with runs that are missed
+
+            jitter (t.Union[int, float]): The maximum random delay in seconds added to each run
+
+            max_concurrency (int): The maximum number of runs of the job that can be running at once
+
+        Raises:
+
+            BadArgument:
+
+        Returns:
+
+            t.Hashable: The id of the job
+        """
         try:
-            self._scheduled_tasks[task_id].cancel()
-        except KeyError:
-            log.error(f'Tried to cancel non existant task - Id: {task_id}')
-            raise
+            expression = CronExpression(cron)
+        except ValueError as e:
+            raise BadArgument(str(e)) from e
+
+        job = self._recurring_job(callback, job_id, interval=None, cron=expression, misfire=misfire,
+                                  jitter=jitter, max_concurrency=max_concurrency)
+        now = datetime.utcnow()
+        job.due = expression.next_after(now)
+        job.when = asyncio.get_running_loop().time() + (job.due - now).total_seconds()
+        return self._schedule_recurring(job)
+
+    def register_job(self, name: str, callback: t.Callable[..., t.Awaitable]) -> None:
+        """Registers the coroutine function that persisted jobs with the given name are run with
+
+        Registering the same name again replaces the callback, so a reloaded service can register itself again
+
+        Args:
+
+            name (str): The name jobs are persisted with
+
+            callback (t.Callable[..., t.Awaitable]): The coroutine function called with the
+            keyword arguments of the job when it is due
+        """
+        self._job_callbacks[name] = callback
+
+    async def schedule_job_at(self, name: str, /, *, time: datetime, job_id: str, **kwargs) -> str:
+        """Schedules and persists a job that runs the callback registered under a name at a given datetime
+
+        Scheduling a job with the id of a job that is already scheduled replaces it
+
+        Args:
+
+            name (str): The name of the registered callback to run
+
+            time (datetime): The UTC datetime to run the job at
+
+            job_id (str): Deterministic id of the job, so the same job is not persisted twice
+
+            kwargs: The json serializable keyword arguments the callback is called with
+
+        Raises:
+
+            BadArgument:
+
+        Returns:
+
+            str: The id of the job
+        """
+        if self.store is None:
+            raise RuntimeError('Persisted jobs require the scheduler to have a job store')
+
+        if name not in self._job_callbacks:
+            raise BadArgument(f'No job callback is registered with the name: {name}')
+
+        delay_time = (time - datetime.utcnow()).total_seconds()
+        if delay_time < 0:
+            raise BadArgument('Scheduled task contained invalid negative time')
+
+        job = ScheduledJob(job_id, name, time.isoformat(sep=' ', timespec='seconds'), json.dumps(kwargs))
+        await self.store.upsert_job(job)
+        return self._schedule(delay_time, self._run_job(job), job_id)
 
-        del self._scheduled_tasks[task_id]
+    async def persist_job(self, name: str, /, *, job_id: str, **kwargs: t.Any) -> None:
+        """
+        Persists a job as due now without scheduling it, for work that is already running. If the bot restarts
+        before the work is done the job is run again by `load_jobs`, so the work should be removed with
+        `cancel_job` once it is done
+        """
+        if self.store is None:
+            raise RuntimeError('Persisted jobs require the scheduler to have a job store')
+
+        if name not in self._job_callbacks:
+            raise BadArgument(f'No job callback is registered with the name: {name}')
+
+        now = datetime.utcnow().isoformat(sep=' ', timespec='seconds')
+        await self.store.upsert_job(ScheduledJob(job_id, name, now, json.dumps(kwargs)))
+        self._in_progress.add(job_id)
+
+    async def cancel_job(self, job_id: str) -> None:
+        """Cancels a persisted job and removes it from the job store"""
+        if self.store is None:
+            raise RuntimeError('Persisted jobs require the scheduler to have a job store')
+
+        # a job that is running is left to finish, since a job removes itself from the store once it is done
+        if job_id in self._scheduled_tasks:
+            self._cancel_scheduled(job_id)
+        self._in_progress.discard(job_id)
+        await self.store.delete_jobs([job_id])
 
-    def _schedule(self, time, coro: t.Awaitable):
+    async def load_jobs(self) -> None:
+        """
+        Loads every persisted job from the job store in a single query, this should be called on startup
+        once the job callbacks have been registered
+
+        Jobs that became due while the bot was offline are started together in the background, so loading
+        does not wait for them, and are removed from the store in a single batch once they have all finished.
+        The rest are scheduled for their due time. Jobs without a registered callback are left in the store, and
+        jobs that are already scheduled, running or in progress are skipped so loading again does not repeat them
+        """
+        if self.store is None:
+            return
+
+        now = datetime.utcnow()
+        missed: t.List[ScheduledJob] = []
+        for job in await self.store.get_all_jobs():
+            if job.job_name not in self._job_callbacks:
+                log.warning(f'No job callback is registered for persisted job: {job.job_id} '
+                            f'with name: {job.job_name}')
+                continue
+            # on_ready fires again on a reconnect, so a job loaded before that is still scheduled
+            # or running is not started a second time
+            if job.job_id in self or job.job_id in self._in_progress:
+                continue
+
+            due_date = job.due_date
+            if due_date <= now:
+                missed.append(job)
+            else:
+                self._schedule((due_date - now).total_seconds(), self._run_job(job), job.job_id)
+
+        if not missed:
+            return
 
-        task_id = uuid.uuid4()
+        log.info(f'Catching up on {len(missed)} missed scheduled jobs')
+        loop = asyncio.get_running_loop()
+        runs = [self._start(job.job_id, self._call_job(job), loop) for job in missed]
+        catch_up = loop.create_task(self._catch_up(missed, runs))
+        self._running.add(catch_up)
+        catch_up.add_done_callback(self._running.discard)
 
-        log.info(f'Scheduling coroutine - Id: {task_id} for exectution in {time} seconds')
+    async def _catch_up(self, missed: t.List[ScheduledJob], runs: t.List[asyncio.Task]) -> None:
+        """Waits for the missed jobs started by `load_jobs` and removes them from the job store in a single batch"""
+        results = await asyncio.gather(*runs, return_exceptions=True)
+        for job, result in zip(missed, results):
+            if isinstance(result, Exception):
+                log.error(f'Missed scheduled job: {job.job_id} raised an exception', exc_info=result)
+        await self.store.delete_jobs([job.job_id for job in missed])
 
-        del_coro = self._delayed_coro(time, coro, task_id)
-        # creates a non blocking task that elides the await
-        task = asyncio.create_task(del_coro)
+    def get_task(self, task_id: int) -> t.Union[None, ScheduledTask]:
+        return self._scheduled_tasks.get(task_id)
 
-        # add the callback so the task can be closed and removed from the internal list
-        task.add_done_callback(partial(self._end_scheduled_task, task_id))
+    def __contains__(self, task_id: t.Hashable) -> bool:
+        """Return True if a task with the given `task_id` is currently scheduled or running."""
+        return task_id in self._scheduled_tasks or task_id in self._started
 
+    def __len__(self) -> int:
+        return len(self._scheduled_tasks) + len(self._started)
+
+    def cancel(self, task_id):
+        started = self._started.pop(task_id, None)
+        if started is not None:
+            started.cancel()
+        if task_id not in self._scheduled_tasks:
+            if started is None:
+                log.error(f'Tried to cancel non existant task - Id: {task_id}')
+                raise KeyError(task_id)
+            return
+        self._cancel_scheduled(task_id)
+
+    def _cancel_scheduled(self, task_id: t.Hashable) -> None:
+        """Cancels a task that has not started yet or a recurring job"""
+        task = self._scheduled_tasks.pop(task_id)
+        # the heap entry is skipped when it reaches the top instead of being searched for,
+        # runs of a recurring job that are already started are left to finish
+        task.cancelled = True
+        self._cancelled += 1
+        if isinstance(task, ScheduledTask):
+            self._close(task)
+
+        if len(self._heap) > COMPACT_MIN_SIZE and self._cancelled > len(self._heap) // 2:
+            self._compact()
+
+    def _schedule(self, time, coro: t.Awaitable, task_id: t.Hashable | None = None):
+
+        loop = asyncio.get_running_loop()
+        task_id = task_id or uuid.uuid4()
+        # only a task that has not started is replaced, one that is running is left to finish
+        if task_id in self._scheduled_tasks:
+            self._cancel_scheduled(task_id)
+
+        task = ScheduledTask(task_id, loop.time() + time, coro)
+        heapq.heappush(self._heap, (task.when, next(self._counter), task))
         self._scheduled_tasks[task_id] = task
+
+        # only re-arm the timer if the new task is due before the one it is armed for
+        if self._timer is None or task.when < self._timer.when():
+            self._arm(loop)
         return task_id
 
-    async def _delayed_coro(self, delay: t.Union[float, int], coro: t.Awaitable, task_id):
+    def _recurring_job(self, callback, job_id, *, misfire, jitter, max_concurrency, **trigger) -> RecurringJob:
+        if callback is None or not asyncio.iscoroutinefunction(callback):
+            raise BadArgument('Recurring task callback must be a coroutine function')
+        if jitter < 0:
+            raise BadArgument('Recurring task jitter cannot be negative')
+        if max_concurrency < 1:
+            raise BadArgument('Recurring task max concurrency must be at least 1')
+
+        return RecurringJob(job_id or uuid.uuid4(), callback, misfire=misfire, jitter=jitter,
+                            max_concurrency=max_concurrency, **trigger)
+
+    def _schedule_recurring(self, job: RecurringJob) -> t.Hashable:
+        if job.task_id in self._scheduled_tasks:
+            self._cancel_scheduled(job.task_id)
+        self._scheduled_tasks[job.task_id] = job
+        self._push_recurring(job, asyncio.get_running_loop())
+        return job.task_id
+
+    def _push_recurring(self, job: RecurringJob, loop: asyncio.AbstractEventLoop) -> None:
+        when = job.when + random.uniform(0, job.jitter) if job.jitter else job.when
+        heapq.heappush(self._heap, (when, next(self._counter), job))
+        if self._timer is None or when < self._timer.when():
+            self._arm(loop)
+
+    def _advance(self, job: RecurringJob, now: float) -> int:
+        """Moves a recurring job to its next due time after now, returning how many runs were due"""
+        if job.interval:
+            runs = int((now - job.when) // job.interval) + 1
+            job.when += runs * job.interval
+            return runs
+
+        utcnow = datetime.utcnow()
+        runs = 0
+        while job.due <= utcnow and runs < MAX_CATCH_UP_RUNS:
+            job.due = job.cron.next_after(job.due)
+            runs += 1
+        if job.due <= utcnow:
+            job.due = job.cron.next_after(utcnow)
+        job.when = now + (job.due - utcnow).total_seconds()
+        return runs
+
+    def _fire(self, job: RecurringJob, loop: asyncio.AbstractEventLoop) -> None:
+        """Called when a recurring job is due, applies the misfire policy and starts the due runs"""
+        runs = self._advance(job, loop.time())
+        # the next run is scheduled before this one starts so a slow run does not delay it
+        self._push_recurring(job, loop)
+        if not runs:
+            return
+
+        if job.misfire is MisfirePolicy.catch_up:
+            job.pending = min(job.pending + runs, MAX_CATCH_UP_RUNS)
+        elif job.misfire is MisfirePolicy.coalesce:
+            job.pending = 1
+        else:
+            job.pending = 1 if job.running < job.max_concurrency else 0
+
+        if runs > 1 or not job.pending:
+            log.debug(f'Recurring task {job.task_id} missed {runs - job.pending} runs, misfire: {job.misfire.name}')
+        self._start_runs(job, loop)
+
+    def _start_runs(self, job: RecurringJob, loop: asyncio.AbstractEventLoop) -> None:
+        while job.pending and job.running < job.max_concurrency and not job.cancelled:
+            job.pending -= 1
+            job.running += 1
+            running = loop.create_task(self._run_recurring(job, loop))
+            self._running.add(running)
+            running.add_done_callback(self._running.discard)
+
+    async def _run_recurring(self, job: RecurringJob, loop: asyncio.AbstractEventLoop) -> None:
         try:
-            # await the timed delay
-            log.debug(f'Waiting {delay} seconds before executing coroutine with Id: {task_id}')
-            await asyncio.sleep(delay)
-
-            # time is up, execute the callback
-            log.debug(f'Delay complete for coroutine {task_id}; executing coroutine')
-            await asyncio.shield(coro)
+            await job.callback()
+        except Exception:
+            log.exception(f'Recurring task #{job.task_id} raised an exception')
+        finally:
+            job.running -= 1
+            self._start_runs(job, loop)
+
+    def _arm(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Arms the timer for the earliest task that has not been cancelled"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+        if self._heap:
+            self._timer = loop.call_at(self._heap[0][0], self._run_due, loop)
+
+    def _run_due(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Timer callback that starts every task that is due and re-arms the timer for the next one"""
+        self._timer = None
+        now = loop.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, task = heapq.heappop(self._heap)
+            if task.cancelled:
+                self._cancelled -= 1
+                continue
+            if isinstance(task, RecurringJob):
+                self._fire(task, loop)
+                continue
+            del self._scheduled_tasks[task.task_id]
+            log.debug(f'Delay complete for coroutine {task.task_id}; executing coroutine')
+            self._start(task.task_id, self._run(task), loop)
+        self._arm(loop)
+
+    def _start(self, task_id: t.Hashable, coro: t.Coroutine, loop: asyncio.AbstractEventLoop) -> asyncio.Task:
+        """Runs a coroutine as a task that is tracked by id until it finishes"""
+        running = loop.create_task(coro)
+        self._running.add(running)
+        self._started[task_id] = running
+        running.add_done_callback(partial(self._finish, task_id))
+        return running
+
+    def _finish(self, task_id: t.Hashable, running: asyncio.Task) -> None:
+        self._running.discard(running)
+        # the id may have been scheduled again and started since, in which case it is left tracked
+        if self._started.get(task_id) is running:
+            del self._started[task_id]
+
+    async def _run(self, task: ScheduledTask):
+        try:
+            await task.coro
+        except Exception:
+            log.exception(f'Scheduled coroutine #{task.task_id} raised an exception')
         # use a finally so that the coro is closed even if it throws
         finally:
-            if inspect.getcoroutinestate(coro) == 'CORO_CREATED':
-                log.debug(f'Explicitly closing the coroutine for #{task_id}.')
-                coro.close()
-            else:
-                log.debug(f'Finally block reached for #{task_id}')
-
-    def _end_scheduled_task(self, task_id, coro):
-        finished_task = self._scheduled_tasks.get(task_id)
-        if finished_task:
-            del self._scheduled_tasks[task_id]
-
-        with contextlib.suppress(asyncio.CancelledError):
-            exception = coro.exception()
-            # Log the exception if one exists.
-            if exception:
-                raise exception
+            self._close(task)
+
+    async def _call_job(self, job: ScheduledJob) -> None:
+        await self._job_callbacks[job.job_name](**job.kwargs)
+
+    async def _run_job(self, job: ScheduledJob) -> None:
+        """Runs a persisted job that is due and removes it from the job store"""
+        try:
+            await self._call_job(job)
+        finally:
+            # a job that raised is not retried, otherwise it would be run again on every restart
+            await self.store.delete_jobs([job.job_id])
+
+    def _compact(self) -> None:
+        """Rebuilds the heap without the cancelled tasks"""
+        log.debug(f'Compacting scheduler heap with {self._cancelled} cancelled tasks')
+        self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    @staticmethod
+    def _close(task: ScheduledTask) -> None:
+        # closing an unstarted coroutine stops python warning that it was never awaited
+        if inspect.iscoroutine(task.coro) and inspect.getcoroutinestate(task.coro) == 'CORO_CREATED':
+            task.coro.close()
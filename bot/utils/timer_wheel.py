@@ -0,0 +1,70 @@
+import math
+import time
+import typing as t
+
+K = t.TypeVar('K', bound=t.Hashable)
+V = t.TypeVar('V')
+
+# the length of a tick of the wheel in seconds, an entry expires at most this long after its timeout
+DEFAULT_RESOLUTION = 1.0
+# the number of slots in the wheel, timeouts longer than a turn of the wheel wait in their slot for more turns
+DEFAULT_SLOTS = 512
+
+
+class TimerWheel(t.Generic[K, V]):
+    """
+    A hashed timing wheel of entries that expire after a timeout
+
+    Time is split into ticks and every entry is put in the slot of the tick it expires at, so adding and
+    removing an entry is a dict operation no matter how many entries there are. Calling `expire` visits
+    only the slots of the ticks that passed since the last call and returns every entry that expired,
+    so one periodic job can expire all of the entries in bulk instead of a coroutine sleeping for each
+    """
+
+    def __init__(self, *, resolution: float = DEFAULT_RESOLUTION, slots: int = DEFAULT_SLOTS) -> None:
+        if resolution <= 0 or slots < 1:
+            raise ValueError('A timer wheel needs a positive resolution and at least one slot')
+
+        self.resolution = resolution
+        # the entries of each slot by key, with the tick they expire at
+        self._slots: t.List[t.Dict[K, t.Tuple[int, V]]] = [{} for _ in range(slots)]
+        self._slot_of: t.Dict[K, int] = {}
+        self._tick = self._to_tick(time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._slot_of
+
+    def add(self, key: K, value: V, timeout: float, *, now: float | None = None) -> None:
+        """Adds an entry that expires after the timeout in seconds, replacing any entry with the same key"""
+        now = time.monotonic() if now is None else now
+        # an entry can not expire in a tick that was already visited
+        expires = max(math.ceil((now + timeout) / self.resolution), self._tick + 1)
+        self.discard(key)
+        slot = expires % len(self._slots)
+        self._slots[slot][key] = (expires, value)
+        self._slot_of[key] = slot
+
+    def discard(self, key: K) -> None:
+        if (slot := self._slot_of.pop(key, None)) is not None:
+            del self._slots[slot][key]
+
+    def expire(self, *, now: float | None = None) -> t.List[t.Tuple[K, V]]:
+        """Removes and returns the key and value of every entry whose timeout has passed"""
+        current = self._to_tick(time.monotonic() if now is None else now)
+        expired = []
+        # every slot is visited at most once, even if more than a turn of the wheel has passed
+        for tick in range(self._tick + 1, min(current, self._tick + len(self._slots)) + 1):
+            slot = self._slots[tick % len(self._slots)]
+            for key, (expires, value) in list(slot.items()):
+                if expires <= current:
+                    del slot[key]
+                    del self._slot_of[key]
+                    expired.append((key, value))
+        self._tick = max(self._tick, current)
+        return expired
+
+    def _to_tick(self, seconds: float) -> int:
+        return math.floor(seconds / self.resolution)
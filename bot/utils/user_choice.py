@@ -39,8 +39,9 @@ class UserChoice:
         # users emoji choice
         ret_dict = dict((v, k) for k, v in choices.items())
 
-        for e in choices.values():
-            await msg.add_reaction(e)
+        bot = self.ctx.cog.bot
+        # the user can choose as soon as the reaction is added, before the rest of the choices are
+        bot.reaction_adder.add(msg, *choices.values())
 
         def check(reaction, user) -> bool:
             return (
@@ -50,11 +51,12 @@ class UserChoice:
             )
 
         try:
-            reaction, _ = await self.ctx.cog.bot.wait_for('reaction_add', timeout=self.timeout, check=check)
+            reaction, _ = await bot.wait_for('reaction_add', timeout=self.timeout, check=check)
             return ret_dict[reaction.emoji]
         except asyncio.TimeoutError:
             embed.add_field(name='Request Timeout:', value='User failed to respond in the alloted time', inline='false')
             await msg.edit(embed=embed)
             raise
         finally:
+            bot.reaction_adder.cancel(msg.id)
             await msg.delete()
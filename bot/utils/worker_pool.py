@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import typing as t
+
+log = logging.getLogger(__name__)
+
+T = t.TypeVar('T')
+R = t.TypeVar('R')
+
+
+async def map_concurrently(func: t.Callable[[T], t.Awaitable[R]],
+                           items: t.Iterable[T],
+                           *,
+                           concurrency: int,
+                           on_done: t.Callable[[T, R | BaseException], t.Awaitable[None]] | None = None
+                           ) -> t.List[R | Exception]:
+    """
+    Calls a coroutine function on every item with at most `concurrency` calls running at once
+
+    Items are not retried, discord requests that should be retried when they are rate limited are submitted
+    through the bot's RequestScheduler
+
+    Args:
+        func (Callable): The coroutine function to call with each item
+
+        items (Iterable): The items to call the function with
+
+        concurrency (int): The maximum number of calls running at once
+
+        on_done (Callable): An optional coroutine function called with each item and its result as it finishes
+
+    Returns:
+        A list with the result of each item in the order of the items, items that raised have their exception
+        in place of the result
+    """
+    if concurrency < 1:
+        raise ValueError('Concurrency must be at least one')
+
+    items = list(items)
+    results: t.List[R | Exception | None] = [None] * len(items)
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(len(items)):
+        queue.put_nowait(i)
+
+    async def worker() -> None:
+        while not queue.empty():
+            i = queue.get_nowait()
+            try:
+                results[i] = await func(items[i])
+            except Exception as e:
+                results[i] = e
+            if not on_done:
+                continue
+            try:
+                await on_done(items[i], results[i])
+            except Exception:
+                log.exception('Failed to report the result of a worker')
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(items)))))
+    return results